@@ -0,0 +1,84 @@
+"""
+Bulk edit cost: per-call tree scans vs the graph's persistent GraphLocator.
+
+    PYTHONPATH=.:src python benchmarks/bench_bulk.py [--nodes 5000] [--upserts 500]
+
+Builds a graph of --nodes goals nested three levels deep (plus a root edge per
+node), then applies --upserts node upserts (half replacing existing nested
+nodes, half inserting under existing parents), as many root edge upserts and
+--upserts / 4 nested node deletes. "scan" uses a fresh mutator for every call,
+so each edit pays a full O(N) rebuild (slower than the plain tree walk the
+pre-locator code did, so read it as an upper bound); "locator" keeps it, so each
+edit is O(1) plus what it moves.
+"""
+import argparse
+import random
+import sys
+import time
+
+from src.services.graph_mutations import GraphMutator
+from tests.factories import dep, goal, graph
+
+
+def _graph(n: int):
+    roots = []
+    for i in range(0, n, 10):
+        kids = [goal(f"n{j}", parent=f"n{i}", nodes=[goal(f"n{j}x", parent=f"n{j}")]) for j in range(i + 1, min(n, i + 5))]
+        roots.append(goal(f"n{i}", nodes=kids))
+    edges = [dep(f"e{i}", f"n{i}", f"n{i + 10}") for i in range(0, n - 10, 10)]
+    return graph("bench", nodes=roots, edges=edges)
+
+
+def _workload(n: int, k: int, seed: int = 1):
+    rnd = random.Random(seed)
+    nodes, edges = [], []
+    for i in range(k):
+        if i % 2:
+            j = rnd.randrange(0, n - 10, 10) + rnd.randint(1, 4)
+            nodes.append(goal(f"n{j}x", parent=f"n{j}"))                    # replace a nested node
+        else:
+            nodes.append(goal(f"new{i}", parent=f"n{rnd.randrange(0, n, 10)}"))  # insert under a root
+        eid = f"e{rnd.randrange(0, n - 10, 10)}" if i % 2 else f"new-e{i}"
+        edges.append(dep(eid, "n0", "n10"))
+    deletes = sorted({f"n{rnd.randrange(0, n - 10, 10) + rnd.randint(1, 4)}x" for _ in range(k // 4)})
+    return nodes, edges, deletes
+
+
+def _timed(label: str, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    print(f"{label:>10}: {(time.perf_counter() - t0) * 1e3:9.1f}ms")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=5_000)
+    ap.add_argument("--upserts", type=int, default=500)
+    args = ap.parse_args()
+    nodes, edges, deletes = _workload(args.nodes, args.upserts)
+
+    def run(m, cold: bool):
+        g = m.graph
+        # cold: a fresh mutator (and locator) per edit, as without one kept by the store
+        edit = (lambda: GraphMutator(g)) if cold else (lambda: m)
+        for n in nodes:
+            edit().upsert_node(n)
+        for e in edges:
+            edit().upsert_edge(e)
+        for nid in deletes:
+            edit().delete_node(nid)
+
+    results = []
+    for label, cold in (("scan", True), ("locator", False)):
+        m = GraphMutator(_graph(args.nodes))
+        m.locator()   # built once up front in both runs
+        _timed(label, lambda: run(m, cold))
+        results.append(m.graph.model_dump())
+    if results[0] != results[1]:
+        print("MISMATCH: scanning and locator edits produced different graphs")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Response size and latency of single-node writes: full Graph vs negotiated delta.
+
+    PYTHONPATH=.:src python benchmarks/bench_delta.py [--nodes 5000] [--edits 50]
+
+Seeds one graph of --nodes goals (plus a dependency chain) through the shared
+store, then upserts --edits goals via POST /graphs/{id}/nodes: with the default
+full-graph body, with `Prefer: return=minimal` (GraphDelta), and with a delta
+while a reader holds a snapshot of the current version ("pinned"). A pinned
+graph cannot be edited in place, so that run pays the copy-on-write cost: a deep
+copy of the graph and a fresh index on every write.
+"""
+import argparse
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+
+from fastapi.testclient import TestClient
+
+from src.api.deps import get_graph_store
+from src.main import app
+from tests.factories import dep, goal, graph
+
+
+def _timed_edits(client: TestClient, prefix: str, edits: int, headers: dict, store=None) -> tuple:
+    times, sizes = [], []
+    for i in range(edits):
+        body = goal(f"{prefix}-{i}", parent="n0").model_dump(mode="json", by_alias=True)
+        with store.read("bench") if store is not None else nullcontext():   # pin the current version
+            t0 = time.perf_counter()
+            r = client.post("/api/v1/graphs/bench/nodes", json=body, headers=headers)
+            times.append((time.perf_counter() - t0) * 1e3)
+        sizes.append(len(r.content))
+    return statistics.median(times), statistics.median(sizes)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=5000)
+    ap.add_argument("--edits", type=int, default=50)
+    args = ap.parse_args()
+
+    nodes = [goal(f"n{i}") for i in range(args.nodes)]
+    edges = [dep(f"e{i}", f"n{i}", f"n{i + 1}") for i in range(args.nodes - 1)]
+    store = get_graph_store()
+    store.create(graph("bench", nodes=nodes, edges=edges))
+
+    client = TestClient(app)
+    minimal = {"Prefer": "return=minimal"}
+    for label, prefix, headers, pin in (("full", "f", {}, None), ("delta", "d", minimal, None), ("pinned", "p", minimal, store)):
+        ms, size = _timed_edits(client, prefix, args.edits, headers, pin)
+        print(f"{label:>6}: p50={ms:8.1f}ms  body={size / 1e3:9.1f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Benchmark + regression guard for the iterative SCC/topological engine.
+
+    PYTHONPATH=.:src python benchmarks/bench_scc.py [--nodes 1000000] [--max-seconds 30]
+
+Runs `condense` on a 1M-node dependency chain (the case that used to blow the
+recursion limit) and on a random DAG with ~3 edges per node, checks the
+results and fails if any run exceeds --max-seconds.
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+
+from src.services.graph_csr import CompactAdjacency, condense
+
+
+def _fixture(n: int, pairs) -> tuple:
+    adj = [[] for _ in range(n)]
+    for u, v in pairs:
+        adj[u].append(v)
+    offsets, targets = array("i", [0]), array("i")
+    for u in range(n):
+        targets.extend(adj[u])
+        offsets.append(len(targets))
+    csr = CompactAdjacency(ids=[f"n{i}" for i in range(n)], n_nodes=n)
+    return csr, (offsets, targets)
+
+
+def chain(n: int) -> tuple:
+    return _fixture(n, ((i, i + 1) for i in range(n - 1)))
+
+
+def random_dag(n: int, degree: int = 3, seed: int = 1) -> tuple:
+    rnd = random.Random(seed)
+    perm = list(range(n))
+    rnd.shuffle(perm)  # hide the topological order behind a random labelling
+    pairs = []
+    for _ in range(n * degree):
+        a = rnd.randrange(n - 1)
+        b = rnd.randrange(a + 1, min(n, a + 1000))
+        pairs.append((perm[a], perm[b]))
+    return _fixture(n, pairs)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=1_000_000)
+    ap.add_argument("--max-seconds", type=float, default=30.0)
+    args = ap.parse_args()
+
+    failed = False
+    for name, build in (("chain", chain), ("random-dag", random_dag)):
+        csr, plane = build(args.nodes)
+        offsets, targets = plane
+        t0 = time.perf_counter()
+        cond = condense(csr, plane)
+        elapsed = time.perf_counter() - t0
+
+        ok = not cond.has_cycles and len(cond.members) == args.nodes
+        ok = ok and all(
+            cond.comp_of[u] < cond.comp_of[targets[i]]
+            for u in range(args.nodes)
+            for i in range(offsets[u], offsets[u + 1])
+        )
+        slow = elapsed > args.max_seconds
+        failed |= (not ok) or slow
+        print(f"{name:>10}: n={args.nodes} e={len(targets)} {elapsed:.2f}s ok={ok}{' SLOW' if slow else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
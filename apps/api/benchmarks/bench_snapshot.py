@@ -0,0 +1,71 @@
+"""
+Cold-start cost of answering an analysis query: JSON body vs mapped binary snapshot.
+
+    PYTHONPATH=.:src python benchmarks/bench_snapshot.py [--nodes 20000]
+
+Builds one graph of --nodes goals with ~2 dependency edges per node, then times
+"open + topological order" two ways: parsing the JSON body through Pydantic and
+building a GraphIndex (what a cold SqliteGraphStore load does), and opening the
+binary snapshot with mmap (graph_snapshot.open_snapshot). Also reports the cost
+of materializing one node from the mapped snapshot.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.services.graph_codec import decode_graph, encode_graph
+from src.services.graph_index import GraphIndex
+from src.services.graph_ops import GraphOps
+from src.services.graph_snapshot import open_snapshot, write_snapshot
+from tests.factories import dep, goal, graph
+
+
+def _graph(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    nodes = [goal(f"n{i}", hours=rnd.randint(1, 8), metrics=[{"metric_id": "m", "value": i, "target": n}])
+             for i in range(n)]
+    edges = []
+    for i in range(2 * n):
+        a = rnd.randrange(n - 1)
+        b = rnd.randrange(a + 1, min(n, a + 100))
+        edges.append(dep(f"e{i}", f"n{a}", f"n{b}", lag_hours=rnd.randint(0, 4)))
+    return graph("bench", nodes=nodes, edges=edges)
+
+
+def _timed(label: str, fn):
+    t0 = time.perf_counter()
+    out = fn()
+    print(f"{label:>28}: {(time.perf_counter() - t0) * 1e3:9.1f}ms")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=20_000)
+    args = ap.parse_args()
+
+    g = _graph(args.nodes)
+    body = encode_graph(g)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.lhgs")
+        _timed("write binary snapshot", lambda: write_snapshot(GraphIndex.from_graph(g), "bench", path))
+        print(f"{'sizes':>28}: json={len(body) / 1e6:.1f}MB binary={os.path.getsize(path) / 1e6:.1f}MB")
+
+        json_order = _timed(
+            "json: decode + index + topo",
+            lambda: GraphOps(GraphIndex.from_graph(decode_graph(body))).topological_order(),
+        )
+        mapped = _timed("mmap: open", lambda: open_snapshot(path))
+        mmap_order = _timed("mmap: topo", lambda: GraphOps(mapped).topological_order())
+        _timed("mmap: materialize one node", lambda: mapped.id_to_node[f"n{args.nodes // 2}"])
+        if json_order != mmap_order:
+            print("MISMATCH: topological orders differ")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
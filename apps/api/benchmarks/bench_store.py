@@ -0,0 +1,93 @@
+"""
+Load/save latency of the SQLite-backed GraphStore.
+
+    PYTHONPATH=.:src python benchmarks/bench_store.py [--graphs 200] [--nodes 200]
+
+Writes --graphs graphs of --nodes goals (plus a dependency chain) through one
+store, reopens the file and reports p50/p99 load latency for cold graphs (first
+load: read + decode) and hot graphs (cache hit: one rev lookup), next to the
+in-memory GraphStore, plus save throughput with batched writes and the cost of
+one persisted edit to a --nodes graph, logged as an op vs rewritten as a snapshot.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from src.services.graph_store import GraphStore
+from src.services.graph_store_sqlite import SqliteGraphStore
+from tests.factories import dep, goal, graph
+
+
+def _graph(graph_id: str, n: int):
+    nodes = [goal(f"{graph_id}-{i}", metrics=[{"metric_id": f"m{i}", "value": i, "target": n}]) for i in range(n)]
+    edges = [dep(f"{graph_id}-e{i}", f"{graph_id}-{i}", f"{graph_id}-{i + 1}") for i in range(n - 1)]
+    return graph(graph_id, nodes=nodes, edges=edges)
+
+
+def _timed_loads(store, ids) -> list:
+    out = []
+    for gid in ids:
+        t0 = time.perf_counter()
+        store.load(gid)
+        out.append((time.perf_counter() - t0) * 1e6)
+    return out
+
+
+def _timed_edits(store, graph_id: str, extra_save) -> list:
+    """Upsert one goal and flush it to disk, per sample."""
+    out = []
+    for i in range(200):
+        t0 = time.perf_counter()
+        with store.write(graph_id) as m:
+            m.upsert_node(goal(f"{graph_id}-edit-{i}"))
+        extra_save(m.graph, m)
+        store.flush()
+        out.append((time.perf_counter() - t0) * 1e6)
+    return out
+
+
+def _report(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:>14}: p50={statistics.median(samples):9.1f}us  p99={p99:9.1f}us  n={len(samples)}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--graphs", type=int, default=200)
+    ap.add_argument("--nodes", type=int, default=200)
+    args = ap.parse_args()
+
+    graphs = [_graph(f"g{i}", args.nodes) for i in range(args.graphs)]
+    ids = [g.graph_id for g in graphs]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "graphs.db")
+
+        store = SqliteGraphStore(path, cache_graphs=args.graphs, flush_interval=60)
+        t0 = time.perf_counter()
+        for g in graphs:
+            store.save(g)
+        store.flush()
+        elapsed = time.perf_counter() - t0
+        print(f"{'save+flush':>14}: {args.graphs / elapsed:9.1f} graphs/s ({args.nodes} nodes each)")
+        store.close()
+
+        store = SqliteGraphStore(path, cache_graphs=args.graphs, flush_interval=60)
+        _report("sqlite cold", _timed_loads(store, ids))
+        _report("sqlite hot", _timed_loads(store, ids))
+        _report("edit (op log)", _timed_edits(store, ids[0], lambda g, m: None))
+        _report("edit (rewrite)", _timed_edits(store, ids[0], lambda g, m: store.save(g)))
+        store.close()
+
+    memory = GraphStore()
+    for g in graphs:
+        memory.save(g)
+    _report("memory", _timed_loads(memory, ids))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,84 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Optional, Dict
-from fastapi import APIRouter, HTTPException, Request
+from typing import Any, Callable, Dict
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, TypeAdapter
 
 from src.schemas.graph import Graph                     # Pydantic Graph aggregate
 from src.schemas.node import NodeUnion                  # discriminated union (kind='goal'|...)
 from src.schemas.edge import EdgeUnion                  # discriminated union (kind='dependency'|...)
-from src.services.graph_store import GraphStore         # thin repo: load/save/exists only
+from src.services.graph_topo import CycleError          # dependency edge closing a cycle
+from src.api.deps import GraphSessionDep, cycle_conflict  # request-scoped view of the shared store
 from src.services.decomposer import Decomposer          # simplified below
+from src.services.graph_mutations import GraphMutator
 
 router = APIRouter(prefix="/graph", tags=["graph"])
-_store = GraphStore()
 
 class CreateGraphBody(BaseModel):
     graph_id: str = Field(alias="graphId")
 
 @router.post("", response_model=Graph, summary="Create an empty graph")
-def create_graph(body: CreateGraphBody) -> Graph:
-    if _store.exists(body.graph_id):
-        raise HTTPException(409, f"Graph '{body.graph_id}' already exists")
+def create_graph(body: CreateGraphBody, session: GraphSessionDep) -> Graph:
     g = Graph(graph_id=body.graph_id, nodes=[])  # construct with Python name, not alias
-    _store.save(g)
-    return g
+    if not session.store.create(g):
+        raise HTTPException(409, f"Graph '{body.graph_id}' already exists")
+    return session.read(body.graph_id).graph
 
-@router.get("/{graph_id}", response_model=Graph, summary="Get full graph")
-def get_graph(graph_id: str) -> Graph:
+@router.get(
+    "/{graph_id}",
+    response_model=Graph,
+    summary="Get full graph (ETag / If-None-Match aware)",
+    responses={304: {"description": "Not modified: the If-None-Match ETag is current"}},
+)
+def get_graph(graph_id: str, request: Request, session: GraphSessionDep) -> Response:
     try:
-        return _store.load(graph_id)
+        cached = session.read(graph_id).body()   # bytes cached per version: no dump on repeat polls
     except KeyError:
         raise HTTPException(404, "Graph not found")
+    # the encoding is negotiated per request, so shared caches must key on it either way
+    headers = {"ETag": cached.etag, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    if cached.gzipped is not None and _accepts_gzip(request.headers.get("accept-encoding")):
+        return Response(cached.gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(cached.body, media_type="application/json", headers=headers)
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    # Accept-Encoding (RFC 9110 12.5.3): "coding;q=x" tokens; q=0 refuses, "*" covers unlisted codings
+    if not accept_encoding:
+        return False
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in token.split(";")]
+        q = 1.0
+        for p in params:
+            name, _, value = p.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.lower()] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0
 
 @router.delete("/{graph_id}", summary="Delete a graph")
-def delete_graph(graph_id: str) -> dict[str, Any]:
-    if not _store.exists(graph_id):
+def delete_graph(graph_id: str, session: GraphSessionDep) -> dict[str, Any]:
+    try:
+        session.store.drop(graph_id)
+    except KeyError:
         raise HTTPException(404, "Graph not found")
-    g = _store.load(graph_id)
-    del _store._by_id[g.graph_id]
     return {"deleted": True}
 
 # --------------------- new: bootstrap high-level goals ---------------------
@@ -56,11 +96,9 @@ _EDGE = TypeAdapter(EdgeUnion)
     response_model=Graph,
     summary="LLM: decompose prompt into high-level GOAL nodes in chronological order; insert into graph",
 )
-async def decompose(graph_id: str, body: DecomposeGoalsBody, request: Request) -> Graph:
-    # 0) load
-    try:
-        g = _store.load(graph_id)
-    except KeyError:
+async def decompose(graph_id: str, body: DecomposeGoalsBody, request: Request, session: GraphSessionDep) -> Graph:
+    # 0) 404 early; the graph itself is read when writing, after the LLM call
+    if not await run_in_threadpool(session.store.exists, graph_id):
         raise HTTPException(404, "Graph not found")
 
     # 1) get the LLM client from app state (configure this at startup)
@@ -80,83 +118,27 @@ async def decompose(graph_id: str, body: DecomposeGoalsBody, request: Request) -
     except Exception as e:
         raise HTTPException(502, f"LLM decomposition failed: {e}")
 
-    # 3) insert nodes (upsert if you added Graph.upsert_node)
-    def _nid(n: Any) -> Optional[str]:
-        v = getattr(n, "node_id", None) or getattr(n, "nodeId", None)
-        if v is None and isinstance(n, dict):
-            v = n.get("nodeId") or n.get("node_id")
-        return str(v) if v is not None else None
-
-    inserted_ids: list[str] = []
-    for n in goal_nodes:
-        if hasattr(g, "upsert_node"):
-            g.upsert_node(n)  # aggregate method if you added it
-        else:
-            g.nodes.append(n)  # fallback: append as root
-        nid = _nid(n)
-        if nid:
-            inserted_ids.append(nid)
-
-    # 4) add simple sequential dependency edges (Goal[i] -> Goal[i+1])
-    #    This encodes the chronological order without planning details yet.
-    def _find_node(container: list[Any], node_id: str) -> Optional[Any]:
-        for nn in container:
-            cid = _nid(nn)
-            if cid == node_id:
-                return nn
-            ch = getattr(nn, "nodes", None) or (nn.get("nodes") if isinstance(nn, dict) else None)
-            if isinstance(ch, list):
-                hit = _find_node(ch, node_id)
-                if hit is not None:
-                    return hit
-        return None
-
-    def _edges_of(n: Any) -> list[Any]:
-        ch = getattr(n, "edges", None)
-        if ch is None and isinstance(n, dict):
-            ch = n.get("edges")
-        if not isinstance(ch, list):
-            # materialize edges list
-            try:
-                setattr(n, "edges", [])
-                ch = getattr(n, "edges")
-            except Exception:
-                if isinstance(n, dict):
-                    n["edges"] = []
-                    ch = n["edges"]
-                else:
-                    raise
-        return ch
-
-    for i in range(len(inserted_ids) - 1):
-        src, dst = inserted_ids[i], inserted_ids[i + 1]
-        edge_dict: Dict[str, Any] = {
-            "kind": "dependency",
-            "edgeId": f"E-{graph_id}-{i+1}",
-            "fromNode": src,
-            "toNode": dst,
-            "constraint": "FS",
-            "lagHours": 0,
-            "hard": False,
-        }
-        edge_obj = _EDGE.validate_python(edge_dict)  # strict
-        host = _find_node(g.nodes, src)
-        if host is not None:
-            _edges_of(host).append(edge_obj)
+    # 3) insert nodes and 4) chain them, in a worker thread: the write blocks on the graph's lock
+    try:
+        m = await run_in_threadpool(_insert_goals, session.write, graph_id, goal_nodes)
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    except CycleError as e:
+        raise cycle_conflict(e)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
 
-    # 5) save and return updated graph
-    _store.save(g)
-    return g
+    # 5) return updated graph
+    return m.graph
 
 @router.post(
     "/{graph_id}/llm/decompose:stream",
     summary="Stream text deltas while decomposing goals; then persist nodes"
 )
-async def decompose_stream(graph_id: str, body: DecomposeGoalsBody, request: Request):
-        # 0) load or 404
-        try:
-            g = _store.load(graph_id)
-        except KeyError:
+async def decompose_stream(graph_id: str, body: DecomposeGoalsBody, request: Request, session: GraphSessionDep):
+        # 0) 404 early; the body streams after this request's session is closed, so keep the store
+        store = session.store
+        if not await run_in_threadpool(store.exists, graph_id):
             raise HTTPException(404, "Graph not found")
 
         # 1) get LLM client
@@ -229,73 +211,40 @@ async def decompose_stream(graph_id: str, body: DecomposeGoalsBody, request: Req
                         if len(goals_only) > body.max_goals:
                             goals_only = goals_only[: body.max_goals]
 
-                        # Insert nodes (same as your JSON endpoint)
-                        def _nid(n: Any) -> Optional[str]:
-                            v = getattr(n, "node_id", None) or getattr(n, "nodeId", None)
-                            if v is None and isinstance(n, dict):
-                                v = n.get("nodeId") or n.get("node_id")
-                            return str(v) if v is not None else None
-
-                        inserted_ids: list[str] = []
-                        for n in goals_only:
-                            if hasattr(g, "upsert_node"):
-                                g.upsert_node(n)
-                            else:
-                                g.nodes.append(n)
-                            nid = _nid(n)
-                            if nid:
-                                inserted_ids.append(nid)
-
-                        # Add simple sequential dependency edges Goal[i] -> Goal[i+1]
-                        def _find_node(container: list[Any], node_id: str) -> Optional[Any]:
-                            for nn in container:
-                                cid = _nid(nn)
-                                if cid == node_id:
-                                    return nn
-                                ch = getattr(nn, "nodes", None) or (nn.get("nodes") if isinstance(nn, dict) else None)
-                                if isinstance(ch, list):
-                                    hit = _find_node(ch, node_id)
-                                    if hit is not None:
-                                        return hit
-                            return None
-
-                        def _edges_of(n: Any) -> list[Any]:
-                            ch = getattr(n, "edges", None)
-                            if ch is None and isinstance(n, dict):
-                                ch = n.get("edges")
-                            if not isinstance(ch, list):
-                                try:
-                                    setattr(n, "edges", [])
-                                    ch = getattr(n, "edges")
-                                except Exception:
-                                    if isinstance(n, dict):
-                                        n["edges"] = []
-                                        ch = n["edges"]
-                                    else:
-                                        raise
-                            return ch
-
-                        for i in range(len(inserted_ids) - 1):
-                            src, dst = inserted_ids[i], inserted_ids[i + 1]
-                            edge_dict: Dict[str, Any] = {
-                                "kind": "dependency",
-                                "edgeId": f"E-{graph_id}-{i+1}",
-                                "fromNode": src,
-                                "toNode": dst,
-                                "constraint": "FS",
-                                "lagHours": 0,
-                                "hard": False,
-                            }
-                            edge_obj = _EDGE.validate_python(edge_dict)
-                            host = _find_node(g.nodes, src)
-                            if host is not None:
-                                _edges_of(host).append(edge_obj)
-
-                        _store.save(g)
+                        # Insert nodes (same as your JSON endpoint), off the event loop
+                        await run_in_threadpool(_insert_goals, store.write, graph_id, goals_only)
                     except Exception:
                         # Persisting failed — do not break the stream
                         # (optionally log this)
                         pass
 
        
-        return StreamingResponse(gen(), media_type="text/plain; charset=utf-8")
\ No newline at end of file
+        return StreamingResponse(gen(), media_type="text/plain; charset=utf-8")
+
+def _insert_goals(write: Callable[[str], Any], graph_id: str, goals: list[NodeUnion]) -> GraphMutator:
+    """
+    Upsert `goals` and chain them with dependency edges Goal[i] -> Goal[i+1] in one
+    write (`write`: GraphSession.write or GraphStore.write). It blocks on the graph's
+    lock (and, with SQLite, on disk), so async handlers run it in a worker thread.
+    """
+    with write(graph_id) as m:
+        inserted_ids: list[str] = []
+        for n in goals:
+            m.upsert_node(n)
+            inserted_ids.append(n.node_id)
+
+        # simple sequential dependency edges encode the chronological order without planning details yet
+        for i in range(len(inserted_ids) - 1):
+            src, dst = inserted_ids[i], inserted_ids[i + 1]
+            edge_dict: Dict[str, Any] = {
+                "kind": "dependency",
+                "edgeId": f"E-{graph_id}-{i+1}",
+                "fromNode": src,
+                "toNode": dst,
+                "constraint": "FS",
+                "lagHours": 0,
+                "hard": False,
+            }
+            edge_obj = _EDGE.validate_python(edge_dict)  # strict
+            m.attach_edge(src, edge_obj)
+    return m
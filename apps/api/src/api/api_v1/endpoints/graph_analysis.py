@@ -1,19 +1,19 @@
 from __future__ import annotations
 
-from typing import Optional, Set, List, Dict, Any, Callable
+from typing import Optional, Set, List
 from fastapi import APIRouter, HTTPException, Query
 from src.schemas.api_graph import (
     ValidateIssue, ValidateResponse,
-    TraverseResponse, TopoResponse,
-    CriticalPathResponse, CriticalPathNode, RollupResponse,
+    TraverseResponse, TopoResponse, PathResponse, ReachabilityRequest, ReachabilityResponse,
+    CriticalPathResponse, CriticalPathNode, RollupResponse, RollupAllResponse,
 )
 from src.schemas.enums import EdgeKind
-from src.services.graph_store import GraphStore
-from src.services.graph_index import GraphIndex
+from src.api.deps import GraphSessionDep
 from src.services.graph_ops import GraphOps
+from src.services.graph_store import GraphSession, Snapshot
+from src.services.graph_validation import GraphValidator
 
 router = APIRouter(prefix="/graphs", tags=["graphs"])
-_store = GraphStore()
 
 def _parse_edge_kinds(csv: Optional[str]) -> Set[str]:
     if not csv:
@@ -25,117 +25,148 @@ def _parse_edge_kinds(csv: Optional[str]) -> Set[str]:
         raise HTTPException(422, f"Unknown edgeKinds: {sorted(list(unknown))}")
     return kinds
 
-@router.get("/{graph_id}/validate", response_model=ValidateResponse, summary="Validate graph invariants")
-def validate_graph(graph_id: str) -> ValidateResponse:
+def _load_ops(session: GraphSession, graph_id: str) -> GraphOps:
+    """Return GraphOps over the cached index of a snapshot pinned for the request (mmap-served when cold)."""
     try:
-        g = _store.load(graph_id)
+        return session.read(graph_id, mapped=True).ops
     except KeyError:
         raise HTTPException(404, "Graph not found")
 
-    idx = GraphIndex.from_graph(g)
-    ops = GraphOps(idx)
-
-    issues: List[ValidateIssue] = []
-
-    for i in ops.check_node_id_duplicates():
-        issues.append(ValidateIssue(code="duplicate-node", message=i["message"], path=i.get("path")))
-    for i in ops.check_edge_node_refs():
-        issues.append(ValidateIssue(code="unknown-edge-node", message=i["message"], path=i.get("path")))
-    for i in ops.check_contrib_metrics():
-        issues.append(ValidateIssue(code="missing-contrib-metric", message=i["message"], path=i.get("path")))
-
-    cycles = ops.detect_cycles(dep_kind=EdgeKind.dependency.value)
-    if cycles:
-        for cyc in cycles:
-            issues.append(ValidateIssue(code="cycle-detected", message="Dependency cycle", path=[",".join(cyc)]))
-
-    return ValidateResponse(ok=(len(issues) == 0), issues=issues)
+@router.get("/{graph_id}/validate", response_model=ValidateResponse, summary="Validate graph invariants")
+def validate_graph(
+    graph_id: str,
+    session: GraphSessionDep,
+    max_issues: Optional[int] = Query(None, ge=1, le=10_000, alias="maxIssues"),
+    full: bool = Query(False, description="Audit: re-derive every check from the graph instead of the live validator"),
+) -> ValidateResponse:
+    try:
+        snap = session.read(graph_id)
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    if full:
+        audit = GraphValidator()
+        audit.audit(snap.graph, max_issues)   # one pass over nodes then edges, stops at maxIssues
+        return _validate(audit, snap, max_issues)
+
+    # cached per version; the live validator makes a miss O(issues) plus the cycle pass
+    reports = snap.reports()
+    key = ("validate", max_issues)
+    hit = reports.get(key)
+    if hit is None:
+        hit = reports[key] = _validate(snap.validator(), snap, max_issues)
+    return hit
+
+def _validate(validator: GraphValidator, snap: Snapshot, max_issues: Optional[int]) -> ValidateResponse:
+    violations, truncated = validator.report(snap.ops, max_issues)
+    issues = [ValidateIssue(code=v.code, message=v.message, path=v.extra.get("path")) for v in violations]
+    return ValidateResponse(ok=not issues, issues=issues, truncated=truncated)
 
 @router.get("/{graph_id}/traverse", response_model=TraverseResponse, summary="BFS traversal over selected edge kinds")
 def traverse_graph(
     graph_id: str,
+    session: GraphSessionDep,
     start: str = Query(..., description="Start nodeId"),
     edge_kinds: Optional[str] = Query(None, description="CSV of edge kinds (dependency,contributes_to,relates_to,validates)"),
     # Pydantic v2 uses `pattern` (regex was removed). See migration notes.
     direction: str = Query("out", pattern="^(in|out)$"),
     depth: Optional[int] = Query(None, ge=0),
 ) -> TraverseResponse:
-    try:
-        g = _store.load(graph_id)
-    except KeyError:
-        raise HTTPException(404, "Graph not found")
-
+    ops = _load_ops(session, graph_id)
     kinds = _parse_edge_kinds(edge_kinds) or {EdgeKind.dependency.value}
-    idx = GraphIndex.from_graph(g)
-    ops = GraphOps(idx)
     order = ops.bfs(start=start, kinds=kinds, direction=direction, depth=depth)
     return TraverseResponse(order=order, visited=len(order))
 
 @router.get("/{graph_id}/topo", response_model=TopoResponse, summary="Topological order of dependency DAG")
-def topo_order(graph_id: str) -> TopoResponse:
+def topo_order(graph_id: str, session: GraphSessionDep) -> TopoResponse:
     try:
-        g = _store.load(graph_id)
+        snap = session.read(graph_id, mapped=True)
     except KeyError:
         raise HTTPException(404, "Graph not found")
-
-    idx = GraphIndex.from_graph(g)
-    ops = GraphOps(idx)
-    cycles = ops.detect_cycles(dep_kind=EdgeKind.dependency.value)
-    if cycles:
-        return TopoResponse(order=[], cycles=cycles)
-    return TopoResponse(order=ops.topological_order(dep_kind=EdgeKind.dependency.value))
+    # the order writes maintain (Snapshot.topo); a mapped snapshot or a cyclic graph
+    # falls back to one SCC pass, which yields both the cycles and the order
+    maintained = snap.topo()
+    if maintained is not None and not maintained.cyclic:
+        return TopoResponse(order=maintained.order())
+    cond = snap.ops.condensation(dep_kind=EdgeKind.dependency.value)
+    if cond.has_cycles:
+        return TopoResponse(order=[], cycles=cond.cycles())
+    return TopoResponse(order=cond.order())
+
+@router.get("/{graph_id}/path", response_model=PathResponse, summary="Shortest path by hops or by total lag_hours")
+def shortest_path(
+    graph_id: str,
+    session: GraphSessionDep,
+    src: str = Query(..., alias="from", description="Source nodeId"),
+    dst: str = Query(..., alias="to", description="Target nodeId"),
+    edge_kinds: Optional[str] = Query(None, description="CSV of edge kinds (dependency,contributes_to,relates_to,validates)"),
+    direction: str = Query("out", pattern="^(in|out)$"),
+    weighted: bool = Query(False, description="Minimize total lag_hours instead of hop count"),
+) -> PathResponse:
+    ops = _load_ops(session, graph_id)
+    kinds = _parse_edge_kinds(edge_kinds) or {EdgeKind.dependency.value}
+    if not weighted:
+        path = ops.shortest_hops(src, dst, kinds=kinds, direction=direction)
+        return PathResponse(path=path, hops=len(path) - 1 if path else None)
+    try:
+        path, cost = ops.shortest_path(src, dst, kinds=kinds, direction=direction)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    if not path:
+        return PathResponse(path=[])
+    return PathResponse(path=path, hops=len(path) - 1, cost=cost)
+
+@router.post("/{graph_id}/reachability", response_model=ReachabilityResponse, summary="Batched upstream/downstream queries over dependency edges")
+def reachability(graph_id: str, body: ReachabilityRequest, session: GraphSessionDep) -> ReachabilityResponse:
+    ops = _load_ops(session, graph_id)
+    pairs = [(p.from_node, p.to_node) for p in body.pairs]
+    return ReachabilityResponse(reachable=ops.reachable(pairs, dep_kind=EdgeKind.dependency.value))
 
 @router.get("/{graph_id}/critical-path", response_model=CriticalPathResponse, summary="Critical path over dependency edges")
-def critical_path(graph_id: str) -> CriticalPathResponse:
-    try:
-        g = _store.load(graph_id)
-    except KeyError:
-        raise HTTPException(404, "Graph not found")
+def critical_path(graph_id: str, session: GraphSessionDep) -> CriticalPathResponse:
+    ops = _load_ops(session, graph_id)
 
-    idx = GraphIndex.from_graph(g)
-    ops = GraphOps(idx)
-
-    # Call dynamically so static type checkers don't flag missing attribute
-    func: Optional[Callable[[], Any]] = getattr(ops, "critical_path", None)
-    if not callable(func):
-        # Keep endpoint documented but return 501 until service method exists
-        raise HTTPException(501, "critical_path not implemented in GraphOps")
-
-    cp = func()  # expected to expose `.path` (iterable of nodes) and `.total_lag_hours`
-    nodes_out: List[CriticalPathNode] = []
-
-    for n in getattr(cp, "path", []):
-        node_id: str = getattr(n, "node_id") or getattr(n, "nodeId")
-        nodes_out.append(
-            CriticalPathNode(
-                nodeId=node_id,
-                earliest_start=getattr(n, "earliest_start", None),
-                latest_finish=getattr(n, "latest_finish", None),
-            )
+    try:
+        cp = ops.critical_path(dep_kind=EdgeKind.dependency.value)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
+
+    nodes_out: List[CriticalPathNode] = [
+        CriticalPathNode(
+            nodeId=n.node_id,
+            earliest_start=n.earliest_start,
+            latest_finish=n.latest_finish,
+            slack_hours=n.slack_hours,
         )
+        for n in cp.path
+    ]
 
     return CriticalPathResponse(
         path=nodes_out,
-        total_lag_hours=getattr(cp, "total_lag_hours", None),
+        total_lag_hours=cp.total_lag_hours,
+        project_hours=cp.project_hours,
+        slack={nid: n.slack_hours for nid, n in cp.schedule.items()},
     )
 
 @router.get("/{graph_id}/rollup", response_model=RollupResponse, summary="Roll up metrics to a goal")
-def rollup(graph_id: str, goal: str = Query(..., description="Target goal nodeId")) -> RollupResponse:
+def rollup(graph_id: str, session: GraphSessionDep, goal: str = Query(..., description="Target goal nodeId")) -> RollupResponse:
+    ops = _load_ops(session, graph_id)
+
     try:
-        g = _store.load(graph_id)
+        metrics = ops.rollup_metrics(target_goal=goal)
     except KeyError:
-        raise HTTPException(404, "Graph not found")
+        raise HTTPException(404, f"Goal '{goal}' not found")
+    except ValueError as e:
+        raise HTTPException(409, str(e))
 
-    idx = GraphIndex.from_graph(g)
-    ops = GraphOps(idx)
+    return RollupResponse(metrics=metrics)
 
-    # This endpoint returns a mapping metricId -> rolled value(s)
-    func: Optional[Callable[..., Dict[str, Any]]] = getattr(ops, "rollup_metrics", None)
-    if not callable(func):
-        raise HTTPException(501, "rollup_metrics not implemented in GraphOps")
+@router.get("/{graph_id}/rollup:all", response_model=RollupAllResponse, summary="Roll up metrics for every goal")
+def rollup_all(graph_id: str, session: GraphSessionDep) -> RollupAllResponse:
+    ops = _load_ops(session, graph_id)
 
-    metrics: Dict[str, Any] = func(target_goal=goal)
-    if not isinstance(metrics, dict):
-        raise HTTPException(500, "rollup_metrics must return a dict[str, Any]")
+    try:
+        goals = ops.rollup_all()
+    except ValueError as e:
+        raise HTTPException(409, str(e))
 
-    return RollupResponse(metrics=metrics)
\ No newline at end of file
+    return RollupAllResponse(goals={nid: metrics for nid, metrics in goals.items() if metrics})
@@ -1,161 +1,129 @@
 from __future__ import annotations
 
-from typing import Any, List, Optional
-from fastapi import APIRouter, HTTPException
+from typing import Any, Callable
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import TypeAdapter
-from src.schemas.api_graph import BulkNodesRequest, BulkEdgesRequest, BulkWriteResponse
-from src.schemas.graph import Graph
+from src.schemas.api_graph import (
+    BatchRequest, BatchResponse, BulkNodesRequest, BulkEdgesRequest, BulkWriteResponse, ImportLineError, ImportResponse,
+)
 from src.schemas.node import NodeUnion
 from src.schemas.edge import EdgeUnion
-from src.services.graph_store import GraphStore
+from src.services.graph_topo import CycleError
+from src.api.deps import GraphSessionDep, cycle_conflict
+from src.services import graph_batch, graph_import
+from src.services.graph_mutations import GraphMutator
 
 router = APIRouter(prefix="/graphs", tags=["graphs"])
-_store = GraphStore()
 
 _NODE_LIST = TypeAdapter(list[NodeUnion])  # reuse adapters (pydantic v2 best practice)
 _EDGE_LIST = TypeAdapter(list[EdgeUnion])
-
-def _nid(n: Any) -> Optional[str]:
-    v = getattr(n, "node_id", None) or getattr(n, "nodeId", None)
-    if v is None and isinstance(n, dict):
-        v = n.get("nodeId") or n.get("node_id")
-    return str(v) if v is not None else None
-
-def _children(n: Any) -> list[Any]:
-    ch = getattr(n, "nodes", None)
-    if ch is None and isinstance(n, dict):
-        ch = n.get("nodes")
-    return ch if isinstance(ch, list) else []
-
-def _find_node(container: list[Any], node_id: str) -> Optional[Any]:
-    for n in container:
-        if _nid(n) == node_id:
-            return n
-        ch = _children(n)
-        hit = _find_node(ch, node_id) if ch else None
-        if hit is not None:
-            return hit
-    return None
-
-def _upsert_node(graph: Graph, node: Any) -> None:
-    # Prefer aggregate method if you added it; fall back to local logic
-    if hasattr(graph, "upsert_node"):
-        graph.upsert_node(node)  # type: ignore[attr-defined]
-        return
-
-    # Fallback (replace-in-place or insert under parent or as root)
-    def _parent(n: Any) -> Optional[str]:
-        v = getattr(n, "parent", None)
-        if v is None and isinstance(n, dict):
-            v = n.get("parent")
-        return str(v) if v is not None else None
-
-    target = _nid(node)
-    if target is None:
-        raise ValueError("nodeId is required")
-
-    def _replace(container: list[Any]) -> bool:
-        for i, cur in enumerate(container):
-            if _nid(cur) == target:
-                container[i] = node
-                return True
-            ch = _children(cur)
-            if ch and _replace(ch):
-                return True
-        return False
-
-    roots = graph.nodes
-    if _replace(roots):
-        return
-
-    pid = _parent(node)
-    if pid is not None:
-        host = _find_node(roots, pid)
-        if host is None:
-            raise ValueError(f"Parent node '{pid}' not found")
-        ch = _children(host)
-        if not isinstance(ch, list):
-            setattr(host, "nodes", [])
-            ch = getattr(host, "nodes")
-        ch.append(node)
-        return
-
-    roots.append(node)
-
-def _eid(e: Any) -> Optional[str]:
-    v = getattr(e, "edge_id", None) or getattr(e, "edgeId", None)
-    if v is None and isinstance(e, dict):
-        v = e.get("edgeId") or e.get("edge_id")
-    return str(v) if v is not None else None
-
-def _from_to(e: Any) -> tuple[Optional[str], Optional[str]]:
-    u = getattr(e, "from_node", None) or getattr(e, "fromNode", None)
-    v = getattr(e, "to_node", None) or getattr(e, "toNode", None)
-    if isinstance(e, dict):
-        u = u or e.get("fromNode") or e.get("from_node")
-        v = v or e.get("toNode") or e.get("to_node")
-    return (str(u) if u is not None else None, str(v) if v is not None else None)
-
-def _edges_of(n: Any) -> list[Any]:
-    ch = getattr(n, "edges", None)
-    if ch is None and isinstance(n, dict):
-        ch = n.get("edges")
-    return ch if isinstance(ch, list) else []
-
-def _upsert_edge(graph: Graph, edge: Any) -> None:
-    # Strategy: if graph has a root `edges` list, prefer it.
-    if hasattr(graph, "edges"):
-        root_edges = getattr(graph, "edges")
-        if isinstance(root_edges, list):
-            eid = _eid(edge)
-            for i, e in enumerate(root_edges):
-                if _eid(e) == eid and eid is not None:
-                    root_edges[i] = edge
-                    return
-            root_edges.append(edge)
-            return
-
-    # Else attach to the source node’s `edges`
-    (src, _dst) = _from_to(edge)
-    if src is None:
-        raise ValueError("edge.fromNode is required")
-    host = _find_node(graph.nodes, src)
-    if host is None:
-        # allow dangling; validator endpoint will flag unknown-node
-        return
-    host_edges = _edges_of(host)
-    if not isinstance(host_edges, list):
-        setattr(host, "edges", [])
-        host_edges = getattr(host, "edges")
-    eid = _eid(edge)
-    for i, e in enumerate(host_edges):
-        if _eid(e) == eid and eid is not None:
-            host_edges[i] = edge
-            return
-    host_edges.append(edge)
+_NODE = TypeAdapter(NodeUnion)
+_EDGE = TypeAdapter(EdgeUnion)
+_NDJSON_BODY = {"requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string"}}}}}
 
 @router.post("/{graph_id}/nodes:bulk", response_model=BulkWriteResponse, summary="Bulk upsert nodes")
-def bulk_nodes(graph_id: str, payload: BulkNodesRequest) -> BulkWriteResponse:
+def bulk_nodes(graph_id: str, payload: BulkNodesRequest, session: GraphSessionDep) -> BulkWriteResponse:
+    nodes = _NODE_LIST.validate_python(payload.nodes)  # strict union validation
     try:
-        g = _store.load(graph_id)
+        with session.write(graph_id) as m:
+            for n in nodes:
+                m.upsert_node(n)
     except KeyError:
         raise HTTPException(404, "Graph not found")
-
-    nodes = _NODE_LIST.validate_python(payload.nodes)  # strict union validation
-    for n in nodes:
-        _upsert_node(g, n)
-    _store.save(g)
+    except CycleError as e:
+        raise cycle_conflict(e)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
     return BulkWriteResponse(nodes_upserted=len(nodes), edges_upserted=0)
 
 @router.post("/{graph_id}/edges:bulk", response_model=BulkWriteResponse, summary="Bulk upsert edges")
-def bulk_edges(graph_id: str, payload: BulkEdgesRequest) -> BulkWriteResponse:
+def bulk_edges(graph_id: str, payload: BulkEdgesRequest, session: GraphSessionDep) -> BulkWriteResponse:
+    edges = _EDGE_LIST.validate_python(payload.edges)  # strict union validation
     try:
-        g = _store.load(graph_id)
+        with session.write(graph_id) as m:
+            m.upsert_edges(edges)   # cycle-checked as one unit: all or nothing
     except KeyError:
         raise HTTPException(404, "Graph not found")
-
-    edges = _EDGE_LIST.validate_python(payload.edges)  # strict union validation
-    for e in edges:
-        _upsert_edge(g, e)
-    _store.save(g)
-    return BulkWriteResponse(nodes_upserted=0, edges_upserted=len(edges))
\ No newline at end of file
+    except CycleError as e:
+        raise cycle_conflict(e)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return BulkWriteResponse(nodes_upserted=0, edges_upserted=len(edges))
+
+@router.post(
+    "/{graph_id}:batch",
+    response_model=BatchResponse,
+    summary="Apply ordered node/edge upserts, deletes and reparents in one write, all or none",
+)
+def batch(graph_id: str, payload: BatchRequest, session: GraphSessionDep) -> BatchResponse:
+    try:
+        with session.write(graph_id) as m:
+            results = graph_batch.apply_ops(m, payload.ops)
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    except graph_batch.BatchError as e:
+        if isinstance(e.cause, CycleError):
+            raise HTTPException(409, {**cycle_conflict(e.cause).detail, "index": e.index, "op": e.op})
+        raise HTTPException(422, {"message": str(e.cause), "index": e.index, "op": e.op})
+    return BatchResponse(graph_id=graph_id, base_version=m.base_version, version=m.version, results=results)
+
+@router.post(
+    "/{graph_id}/nodes:import",
+    response_model=ImportResponse,
+    summary="Stream-import nodes from NDJSON, validated and applied in batches",
+    openapi_extra=_NDJSON_BODY,
+)
+async def import_nodes(
+    graph_id: str,
+    request: Request,
+    session: GraphSessionDep,
+    max_errors: int = Query(100, ge=0, le=10_000, alias="maxErrors"),
+) -> ImportResponse:
+    report = await _import(session, graph_id, request, _NODE, GraphMutator.upsert_node, max_errors)
+    return _import_response(report, nodes_upserted=report.applied)
+
+@router.post(
+    "/{graph_id}/edges:import",
+    response_model=ImportResponse,
+    summary="Stream-import edges from NDJSON, validated and applied in batches",
+    openapi_extra=_NDJSON_BODY,
+)
+async def import_edges(
+    graph_id: str,
+    request: Request,
+    session: GraphSessionDep,
+    max_errors: int = Query(100, ge=0, le=10_000, alias="maxErrors"),
+) -> ImportResponse:
+    report = await _import(session, graph_id, request, _EDGE, GraphMutator.upsert_edge, max_errors)
+    return _import_response(report, edges_upserted=report.applied)
+
+async def _import(
+    session: GraphSessionDep,
+    graph_id: str,
+    request: Request,
+    adapter: TypeAdapter,
+    apply: Callable[[GraphMutator, Any], None],
+    max_errors: int,
+) -> graph_import.ImportReport:
+    # batches go straight to the store: session.write would pin every published version
+    store = session.store
+    if not store.exists(graph_id):
+        raise HTTPException(404, "Graph not found")
+    report = graph_import.ImportReport(max_errors=max_errors)
+    try:
+        async for batch in graph_import.ndjson_batches(request.stream()):
+            # the next batch is read only once this one is applied (backpressure)
+            await run_in_threadpool(graph_import.apply_batch, store, graph_id, batch, adapter, apply, report)
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    return report
+
+def _import_response(report: graph_import.ImportReport, **counts: int) -> ImportResponse:
+    return ImportResponse(
+        **counts,
+        lines=report.lines,
+        failed=report.failed,
+        errors=[ImportLineError(line=n, message=msg) for n, msg in report.errors],
+    )
@@ -1,83 +1,121 @@
 from __future__ import annotations
 
-from typing import Any, Optional
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional, Union
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import TypeAdapter
 from src.schemas.node import NodeUnion
 from src.schemas.graph import Graph
-from src.services.graph_store import GraphStore
+from src.schemas.api_graph import CascadeReport, GraphDelta, Page
+from src.services.graph_topo import CycleError
+from src.api.deps import GraphSessionDep, WriteReplyDep, cycle_conflict
+from src.services import graph_export
+from src.services.graph_index import GraphIndex
+from src.services.graph_mutations import plan_cascade
 
 router = APIRouter(prefix="/graphs", tags=["nodes"])
-_store = GraphStore()
 _NODE = TypeAdapter(NodeUnion)
 
-def _nid(n: Any) -> Optional[str]:
-    v = getattr(n, "node_id", None) or getattr(n, "nodeId", None)
-    if v is None and isinstance(n, dict):
-        v = n.get("nodeId") or n.get("node_id")
-    return str(v) if v is not None else None
-
-def _children(n: Any) -> list[Any]:
-    ch = getattr(n, "nodes", None)
-    if ch is None and isinstance(n, dict):
-        ch = n.get("nodes")
-    return ch if isinstance(ch, list) else []
+@router.get("/{graph_id}/nodes", response_model=Page, summary="List nodes in pre-order, cursor-paginated")
+def list_nodes(
+    graph_id: str,
+    session: GraphSessionDep,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    kind: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+) -> Page:
+    try:
+        snap = session.read(graph_id)
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    try:
+        # resume at the cursor through the snapshot's locator rather than re-walking earlier rows
+        rows = graph_export.node_rows(snap.graph, kind, status, graph_export.node_after(cursor), snap.locator)
+        items, next_cursor = graph_export.page(rows, graph_export.node_key, limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return Page(items=[graph_export.node_doc(r) for r in items], next_cursor=next_cursor)
 
-def _find(container: list[Any], node_id: str) -> Optional[Any]:
-    for n in container:
-        if _nid(n) == node_id:
-            return n
-        ch = _children(n)
-        hit = _find(ch, node_id) if ch else None
-        if hit is not None:
-            return hit
-    return None
+@router.get("/{graph_id}/nodes:stream", summary="Stream every node as NDJSON, in pre-order")
+def stream_nodes(
+    graph_id: str,
+    session: GraphSessionDep,
+    kind: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+) -> StreamingResponse:
+    try:
+        chunks = graph_export.ndjson(
+            session.store, graph_id, lambda g: graph_export.node_rows(g, kind, status), graph_export.node_line
+        )
+    except KeyError:
+        raise HTTPException(404, "Graph not found")
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
 
 @router.get("/{graph_id}/nodes/{node_id}", response_model=NodeUnion, summary="Get a node")
-def get_node(graph_id: str, node_id: str) -> NodeUnion:
+def get_node(graph_id: str, node_id: str, session: GraphSessionDep) -> NodeUnion:
     try:
-        g = _store.load(graph_id)
+        n = session.read(graph_id, mapped=True).node(node_id)
     except KeyError:
         raise HTTPException(404, "Graph not found")
-    n = _find(g.nodes, node_id)
     if n is None:
         raise HTTPException(404, "Node not found")
     return n
 
-@router.post("/{graph_id}/nodes", response_model=Graph, summary="Upsert a single node, return full graph")
-def upsert_node(graph_id: str, node: dict) -> Graph:
+@router.post(
+    "/{graph_id}/nodes",
+    response_model=Union[Graph, GraphDelta],
+    summary="Upsert a single node, return full graph (or a delta with Prefer: return=minimal)",
+)
+def upsert_node(graph_id: str, node: dict, session: GraphSessionDep, reply: WriteReplyDep) -> Response | GraphDelta:
     node_obj = _NODE.validate_python(node)
     try:
-        g = _store.load(graph_id)
+        with session.write(graph_id) as m:
+            reply.track(m)
+            m.upsert_node(node_obj)
     except KeyError:
         raise HTTPException(404, "Graph not found")
+    except CycleError as e:
+        raise cycle_conflict(e)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    return reply.body(m, node_obj)
 
-    if hasattr(g, "upsert_node"):
-        g.upsert_node(node_obj)  # aggregate method
-    else:
-        # trivial fallback: append as root
-        g.nodes.append(node_obj)
-    _store.save(g)
-    return g
-
-@router.delete("/{graph_id}/nodes/{node_id}", response_model=Graph, summary="Delete a node (and detach edges)")
-def delete_node(graph_id: str, node_id: str) -> Graph:
+@router.delete(
+    "/{graph_id}/nodes/{node_id}",
+    response_model=Union[Graph, GraphDelta, CascadeReport],
+    summary="Delete a node with its subtree and every edge touching them (dryRun: report only)",
+)
+def delete_node(
+    graph_id: str,
+    node_id: str,
+    session: GraphSessionDep,
+    reply: WriteReplyDep,
+    cascade: bool = Query(True, description="Also remove every edge touching the removed nodes"),
+    dry_run: bool = Query(False, alias="dryRun", description="Report what would be removed; change nothing"),
+) -> Response | GraphDelta | CascadeReport:
+    if dry_run:
+        try:
+            snap = session.read(graph_id)
+        except KeyError:
+            raise HTTPException(404, "Graph not found")
+        idx = snap.ops.idx if isinstance(snap.ops.idx, GraphIndex) else GraphIndex.from_graph(snap.graph)
+        plan = plan_cascade(snap.graph, idx, node_id, snap.locator())
+        if plan is None:
+            raise HTTPException(404, "Node not found")
+        edge_ids = plan.edge_ids if cascade else [e.edge_id for e in plan.owned]
+        return CascadeReport(node_id=node_id, dry_run=True, node_ids=plan.node_ids, edge_ids=edge_ids)
     try:
-        g = _store.load(graph_id)
+        with session.write(graph_id) as m:
+            reply.track(m)
+            if cascade:
+                plan = m.delete_node_cascade(node_id)
+                removed = plan.node if plan is not None else None
+            else:
+                removed = m.delete_node(node_id)
     except KeyError:
         raise HTTPException(404, "Graph not found")
-
-    def _delete(container: list[Any]) -> bool:
-        for i, n in enumerate(container):
-            if _nid(n) == node_id:
-                del container[i]
-                return True
-            ch = _children(n)
-            if ch and _delete(ch):
-                return True
-        return False
-
-    if not _delete(g.nodes):
+    if removed is None:
         raise HTTPException(404, "Node not found")
-    _store.save(g)
-    return g
\ No newline at end of file
+    return reply.body(m, removed)
\ No newline at end of file
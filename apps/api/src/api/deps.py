@@ -1,9 +1,14 @@
-from typing import Annotated, AsyncGenerator, Optional
+from functools import lru_cache
+from typing import Annotated, Any, AsyncGenerator, Iterator, Literal, Optional
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException, Query, Response
 from supabase import AsyncClient, acreate_client, AsyncClientOptions
 
 from src.config import settings
+from src.schemas.api_graph import GraphDelta
+from src.services.graph_topo import CycleError
+from src.services.graph_mutations import GraphMutator
+from src.services.graph_store import GraphSession, GraphStore, open_graph_store
 
 
 async def get_db() -> AsyncGenerator[AsyncClient, None]:
@@ -24,3 +29,77 @@ async def get_db() -> AsyncGenerator[AsyncClient, None]:
 
 
 SessionDep = Annotated[AsyncClient, Depends(get_db)]
+
+
+@lru_cache
+def get_graph_store() -> GraphStore:
+    """The one GraphStore shared by every router (built on first use)."""
+    return open_graph_store()
+
+
+def get_graph_session(store: GraphStore = Depends(get_graph_store)) -> Iterator[GraphSession]:
+    # closed after the response is serialized, so pinned snapshots outlive the handler
+    session = GraphSession(store)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+GraphSessionDep = Annotated[GraphSession, Depends(get_graph_session)]
+
+
+class WriteReply:
+    """
+    Negotiated body of a single-item write: the full Graph by default, or a GraphDelta
+    (changed entity, new version, RFC 6902 patch) when the client sends
+    `Prefer: return=minimal` or `?response=delta`, so the payload scales with the edit.
+
+    The full Graph is sent as the new version's cached body (with its ETag), not
+    re-validated through response_model: that would re-run Graph.check_invariants
+    over the whole graph on every write. Invariants are tracked per edit by the
+    live GraphValidator instead (GET /graphs/{id}/validate).
+    """
+
+    def __init__(self, delta: bool, response: Response, store: GraphStore):
+        self.delta = delta
+        self._response = response
+        self._store = store
+
+    def track(self, m: GraphMutator) -> None:
+        """Call first thing inside session.write: records the patch when a delta was asked for."""
+        if self.delta:
+            m.patch = []
+
+    def body(self, m: GraphMutator, entity: Any = None) -> Response | GraphDelta:
+        if not self.delta:
+            cached = self._store.body_cache.get(m.graph.graph_id, m.version, m.graph)
+            return Response(cached.body, media_type="application/json", headers={"ETag": cached.etag})
+        self._response.headers["Preference-Applied"] = "return=minimal"
+        return GraphDelta(
+            graph_id=m.graph.graph_id,
+            base_version=m.base_version,
+            version=m.version,
+            entity=entity.model_dump(mode="json", by_alias=True) if entity is not None else None,
+            patch=m.patch,
+        )
+
+
+def get_write_reply(
+    response: Response,
+    prefer: Optional[str] = Header(None),
+    mode: Optional[Literal["full", "delta"]] = Query(None, alias="response"),
+    store: GraphStore = Depends(get_graph_store),
+) -> WriteReply:
+    if mode is not None:
+        return WriteReply(mode == "delta", response, store)
+    prefs = {p.split(";")[0].strip().lower() for p in (prefer or "").split(",")}
+    return WriteReply("return=minimal" in prefs, response, store)
+
+
+WriteReplyDep = Annotated[WriteReply, Depends(get_write_reply)]
+
+
+def cycle_conflict(e: CycleError) -> HTTPException:
+    """409 for a dependency edge that would close a cycle: the rejected edge and the cycle path."""
+    return HTTPException(409, {"message": str(e), "edgeId": e.edge_id, "cycle": e.path})
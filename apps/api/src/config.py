@@ -41,6 +41,23 @@ class Settings(BaseSettings):
     DB_EMAIL: str = cast(str, os.getenv("DB_EMAIL"))
     DB_PASSWORD: str = cast(str, os.getenv("DB_PASSWORD"))
 
+    # --- Graph index cache ---
+    INDEX_CACHE_MAX_GRAPHS: int = 16
+    INDEX_CACHE_MAX_ELEMENTS: int = 2_000_000  # nodes + edges across cached indexes
+
+    # --- Serialized graph bodies (GET /graph/{id}, ETag) ---
+    BODY_CACHE_MAX_GRAPHS: int = 32
+    BODY_CACHE_MAX_BYTES: int = 128 << 20    # JSON + gzip bytes across cached bodies
+    BODY_CACHE_GZIP_MIN_BYTES: int = 1024    # smaller bodies are not pre-gzipped; 0 disables gzip
+
+    # --- Graph store ---
+    GRAPH_STORE_PATH: str | None = None     # SQLite file; unset keeps graphs in memory only
+    GRAPH_STORE_CACHE_GRAPHS: int = 64      # hot Graph objects kept in memory
+    GRAPH_STORE_BATCH_SIZE: int = 64        # dirty graphs per write transaction
+    GRAPH_STORE_FLUSH_SECONDS: float = 0.2  # max delay before a save reaches disk
+    GRAPH_STORE_COMPACT_OPS: int = 256      # logged edits per graph before a snapshot is rewritten
+    GRAPH_STORE_SNAPSHOT_DIR: str | None = None  # binary mmap snapshots for cold reads; unset disables
+
     # --- OpenAI fields ---
     OPENAI_API_KEY: str = cast(str, os.getenv("OPENAI_API_KEY", ""))
     OPENAI_MODEL: str = Field(
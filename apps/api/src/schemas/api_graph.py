@@ -1,6 +1,9 @@
-from typing import Literal, Optional, List, Dict, Any
+from typing import Annotated, Literal, Optional, List, Dict, Any, Union
 from pydantic import BaseModel, ConfigDict, Field
 
+from .edge import EdgeUnion
+from .node import NodeUnion
+
 class ApiModel(BaseModel):
     model_config = ConfigDict(
         extra="forbid", 
@@ -22,6 +25,7 @@ class ValidateIssue(ApiModel):
 class ValidateResponse(ApiModel):
     ok: bool
     issues: List[ValidateIssue] = Field(default_factory=list)
+    truncated: bool = False    # stopped at maxIssues: more issues exist
 
 class TraverseResponse(ApiModel):
     order: List[str]           # visited nodeIds in traversal order
@@ -31,20 +35,44 @@ class TopoResponse(ApiModel):
     order: List[str]           # topologically sorted nodeIds (dependency DAG)
     cycles: Optional[List[List[str]]] = None  # present if cycle detection enabled
 
+class PathResponse(ApiModel):
+    path: List[str]            # nodeIds from source to target ([] if unreachable)
+    hops: Optional[int] = None
+    cost: Optional[float] = None  # total lag_hours when weighted
+
+class ReachabilityPair(ApiModel):
+    from_node: str = Field(alias="from")
+    to_node: str = Field(alias="to")
+
+class ReachabilityRequest(ApiModel):
+    pairs: List[ReachabilityPair]
+
+class ReachabilityResponse(ApiModel):
+    # reachable[i]: pairs[i].from is upstream of (reaches) pairs[i].to over dependency edges
+    reachable: List[bool]
+
 class CriticalPathNode(ApiModel):
     node_id: str = Field(alias="nodeId")
     earliest_start: Optional[str] = None
     latest_finish: Optional[str] = None
+    slack_hours: Optional[float] = None
 
 class CriticalPathResponse(ApiModel):
     path: List[CriticalPathNode] = Field(default_factory=list)
     total_lag_hours: Optional[int] = None
+    project_hours: Optional[float] = None
+    slack: Dict[str, float] = Field(default_factory=dict)  # nodeId -> total float (hours)
 
 class RollupResponse(ApiModel):
     # metricId -> rolled-up value (number | string | boolean)
     metrics: Dict[str, Any] = Field(default_factory=dict)
 
 
+class RollupAllResponse(ApiModel):
+    # goal nodeId -> metricId -> rolled-up value (goals without metrics are omitted)
+    goals: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+
+
 class BulkNodesRequest(ApiModel):
     nodes: List[Any]  # accept NodeUnion JSON; validation happens in endpoint (schemas.node.NodeUnion)
 
@@ -53,4 +81,74 @@ class BulkEdgesRequest(ApiModel):
 
 class BulkWriteResponse(ApiModel):
     nodes_upserted: int = 0
-    edges_upserted: int = 0
\ No newline at end of file
+    edges_upserted: int = 0
+
+class GraphDelta(ApiModel):
+    graph_id: str
+    base_version: int          # version the patch applies to
+    version: int               # version after the edit
+    entity: Optional[Dict[str, Any]] = None  # the node/edge written or removed, as in the Graph JSON
+    patch: List[Dict[str, Any]] = Field(default_factory=list)  # RFC 6902 ops, base_version -> version
+
+class CascadeReport(ApiModel):
+    node_id: str
+    dry_run: bool = False
+    node_ids: List[str] = Field(default_factory=list)  # the node and its nested subtree
+    edge_ids: List[str] = Field(default_factory=list)  # every edge held by or touching those nodes
+
+class BatchUpsertNode(ApiModel):
+    op: Literal["upsert_node"]
+    node: NodeUnion
+
+class BatchDeleteNode(ApiModel):
+    op: Literal["delete_node"]
+    node_id: str = Field(alias="nodeId")
+    cascade: bool = True       # also remove every edge touching the removed nodes
+
+class BatchReparent(ApiModel):
+    op: Literal["reparent"]
+    node_id: str = Field(alias="nodeId")
+    parent_id: Optional[str] = Field(None, alias="parentId")   # None: move to the root
+
+class BatchUpsertEdge(ApiModel):
+    op: Literal["upsert_edge"]
+    edge: EdgeUnion
+
+class BatchDeleteEdge(ApiModel):
+    op: Literal["delete_edge"]
+    edge_id: str = Field(alias="edgeId")
+
+BatchOp = Annotated[
+    Union[BatchUpsertNode, BatchDeleteNode, BatchReparent, BatchUpsertEdge, BatchDeleteEdge],
+    Field(discriminator="op"),
+]
+
+class BatchRequest(ApiModel):
+    ops: List[BatchOp] = Field(min_length=1, max_length=10_000)   # applied in order, all or none
+
+class BatchOpResult(ApiModel):
+    index: int                 # position in BatchRequest.ops
+    op: str
+    id: str                    # nodeId or edgeId the op names
+    status: Literal["created", "updated", "deleted", "moved", "not_found"]
+    node_ids: List[str] = Field(default_factory=list)  # nodes removed (deletes)
+    edge_ids: List[str] = Field(default_factory=list)  # edges removed (deletes)
+
+class BatchResponse(ApiModel):
+    graph_id: str
+    base_version: int          # version the batch was applied to
+    version: int               # version after the batch
+    results: List[BatchOpResult] = Field(default_factory=list)
+
+class Page(ApiModel):
+    items: List[Dict[str, Any]] = Field(default_factory=list)  # node/edge rows (see services.graph_export)
+    next_cursor: Optional[str] = None                          # pass back as ?cursor= for the next page
+
+class ImportLineError(ApiModel):
+    line: int                  # 1-based line number in the NDJSON body
+    message: str
+
+class ImportResponse(BulkWriteResponse):
+    lines: int = 0             # non-blank lines read
+    failed: int = 0            # lines rejected (invalid JSON/schema, or the edit failed)
+    errors: List[ImportLineError] = Field(default_factory=list)  # first maxErrors failures
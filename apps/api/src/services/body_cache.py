@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from src.schemas.graph import Graph
+
+
+@dataclass(slots=True)
+class CachedBody:
+    """The serialized Graph response of one version of one graph."""
+    graph_id: str
+    version: int
+    etag: str                       # strong: quoted digest of `body`
+    body: bytes                     # what GET /graph/{id} sends (response_model=Graph)
+    gzipped: Optional[bytes] = None
+
+    @property
+    def weight(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+
+class BodyCache:
+    """
+    LRU cache of serialized graph bodies, keyed by graph id and tagged with the
+    graph version, so an unchanged poll skips model_dump_json entirely.
+
+    Like IndexCache, only the newest version of a graph is kept and eviction is
+    bounded by entry count and total bytes. The ETag is a digest of the bytes, not
+    the version number: versions are process-local and reassigned when a backend
+    reloads a graph, while equal bytes are equal content in any process.
+    Bodies of at least `gzip_min_bytes` are also kept gzipped (0 disables).
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 128 << 20, gzip_min_bytes: int = 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.gzip_min_bytes = gzip_min_bytes
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, graph_id: str, version: int, graph: Graph) -> CachedBody:
+        """Return the cached body for `version`, serializing `graph` on a miss."""
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(graph_id)
+                return entry
+
+        # Serialize outside the lock; concurrent misses may do it twice, last one wins.
+        # Declared-type dump, like FastAPI's response_model=Graph (node-owned edges as EdgeBase).
+        body = graph.model_dump_json(by_alias=True).encode()
+        entry = CachedBody(
+            graph_id=graph_id,
+            version=version,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            body=body,
+        )
+        if self.gzip_min_bytes and len(body) >= self.gzip_min_bytes:
+            entry.gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        self._put(entry)
+        return entry
+
+    def invalidate(self, graph_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(graph_id, None)
+            if entry is not None:
+                self._bytes -= entry.weight
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def weight(self) -> int:
+        return self._bytes
+
+    # ----------------------------- private --------------------------------
+    def _put(self, entry: CachedBody) -> None:
+        if entry.weight > self.max_bytes:
+            self.invalidate(entry.graph_id)
+            return
+        with self._lock:
+            old = self._entries.pop(entry.graph_id, None)
+            if old is not None:
+                if old.version > entry.version:
+                    # a newer version raced us in; keep it
+                    self._entries[old.graph_id] = old
+                    return
+                self._bytes -= old.weight
+            self._entries[entry.graph_id] = entry
+            self._bytes += entry.weight
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.weight
@@ -0,0 +1,73 @@
+"""
+Mixed-operation batches (POST /graphs/{id}:batch): an ordered list of node and
+edge upserts, deletes and reparents applied in one GraphStore.write, so the whole
+batch costs one lock, one published version and one response.
+
+The payload is validated as a whole before anything is applied. The ops then run
+in order inside GraphMutator.atomic(): if one fails, the ones before it are undone
+and the batch fails with the index of the op at fault. Deleting something that is
+already gone is not a failure; its result says "not_found".
+"""
+from __future__ import annotations
+
+from typing import Any, List
+
+from src.schemas.api_graph import BatchOpResult
+from src.services.graph_mutations import GraphMutator, _ids, _owned
+
+
+class BatchError(ValueError):
+    """Op `index` of a batch failed with `cause`; nothing of the batch was applied."""
+
+    def __init__(self, index: int, op: str, cause: ValueError):
+        self.index = index
+        self.op = op
+        self.cause = cause
+        super().__init__(f"ops[{index}] ({op}): {cause}")
+
+
+def apply_ops(m: GraphMutator, ops: List[Any]) -> List[BatchOpResult]:
+    """Apply validated batch ops in order, all or none. BatchError names the op that failed."""
+    results: List[BatchOpResult] = []
+    with m.atomic():
+        for i, op in enumerate(ops):
+            try:
+                results.append(_apply(m, i, op))
+            except ValueError as e:
+                raise BatchError(i, op.op, e) from e
+    return results
+
+
+def _apply(m: GraphMutator, i: int, op: Any) -> BatchOpResult:
+    loc = m.locator()
+    if op.op == "upsert_node":
+        nid = op.node.node_id
+        existed = loc.node(nid) is not None
+        m.upsert_node(op.node)
+        return BatchOpResult(index=i, op=op.op, id=nid, status="updated" if existed else "created")
+    if op.op == "delete_node":
+        if op.cascade:
+            plan = m.delete_node_cascade(op.node_id)
+            if plan is None:
+                return BatchOpResult(index=i, op=op.op, id=op.node_id, status="not_found")
+            node_ids, edge_ids = plan.node_ids, plan.edge_ids
+        else:
+            removed = m.delete_node(op.node_id)
+            if removed is None:
+                return BatchOpResult(index=i, op=op.op, id=op.node_id, status="not_found")
+            node_ids, edge_ids = _ids(removed), [e.edge_id for e in _owned(removed)]
+        return BatchOpResult(index=i, op=op.op, id=op.node_id, status="deleted", node_ids=node_ids, edge_ids=edge_ids)
+    if op.op == "reparent":
+        m.reparent(op.node_id, op.parent_id)
+        return BatchOpResult(index=i, op=op.op, id=op.node_id, status="moved")
+    if op.op == "upsert_edge":
+        eid = op.edge.edge_id
+        existed = loc.root_edge(eid) is not None
+        m.upsert_edge(op.edge)
+        return BatchOpResult(index=i, op=op.op, id=eid, status="updated" if existed else "created")
+    if op.op == "delete_edge":
+        removed = m.delete_edge(op.edge_id)
+        if not removed:
+            return BatchOpResult(index=i, op=op.op, id=op.edge_id, status="not_found")
+        return BatchOpResult(index=i, op=op.op, id=op.edge_id, status="deleted", edge_ids=[e.edge_id for e in removed])
+    raise ValueError(f"Unknown batch op: {op.op}")
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+from typing import Annotated, Any, Dict, List, Union
+
+from pydantic import Field, TypeAdapter
+
+from src.schemas.edge import ContributesToEdge, DependencyEdge, EdgeBase, RelatesToEdge, ValidatesEdge
+from src.schemas.graph import Graph
+from src.schemas.node import NodeUnion
+
+# node.edges is typed EdgeBase, so nested edges are re-typed by their `kind` on load
+_ANY_EDGE = TypeAdapter(
+    Annotated[
+        Union[DependencyEdge, ContributesToEdge, RelatesToEdge, ValidatesEdge],
+        Field(discriminator="kind"),
+    ]
+)
+_NODE = TypeAdapter(NodeUnion)
+
+
+def encode_graph(graph: Graph) -> bytes:
+    """Lossless JSON for a Graph, including subclass fields of node-owned edges."""
+    return graph.model_dump_json(by_alias=True, serialize_as_any=True).encode()
+
+
+def decode_graph(body: bytes | str) -> Graph:
+    data = json.loads(body)
+    _retype_edges(data.get("nodes") or [])
+    return Graph.model_validate(data)
+
+
+def decode_op(body: bytes | str) -> Dict[str, Any]:
+    """A journaled GraphMutator op with its node/edge payload validated back to models."""
+    op = json.loads(body)
+    if "node" in op:
+        op["node"] = decode_node(op["node"])
+    if "edge" in op:
+        op["edge"] = decode_edge(op["edge"])
+    return op
+
+
+def decode_node(data: Dict[str, Any]) -> NodeUnion:
+    """A node dict (with its nested nodes and edges) validated back to a model."""
+    _retype_edges([data])
+    return _NODE.validate_python(data)
+
+
+def decode_edge(data: Dict[str, Any]) -> EdgeBase:
+    return _ANY_EDGE.validate_python(data) if "kind" in data else EdgeBase.model_validate(data)
+
+
+def _retype_edges(nodes: List[dict]) -> None:
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        node["edges"] = [e if isinstance(e, EdgeBase) else decode_edge(e) for e in node.get("edges") or []]
+        stack.extend(node.get("nodes") or [])
+
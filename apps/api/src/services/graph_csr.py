@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from src.services.graph_index import GraphIndex
+
+# (offsets, targets): neighbors of u are targets[offsets[u]:offsets[u + 1]]
+Plane = Tuple[array, array]
+
+
+@dataclass(slots=True)
+class CompactAdjacency:
+    """
+    Integer-interned CSR adjacency built from a GraphIndex.
+
+    Node ids are interned to ints: [0, n_nodes) are the indexed nodes in index
+    order, [n_nodes, size) are ids that only appear as dangling edge endpoints.
+    Adjacency is stored per edge kind as two flat `array('i')` columns (offsets
+    and targets) in both directions, so traversals touch only machine ints and
+    never the Pydantic edge objects. Edges without a `kind` are filed under None.
+    It is laid out straight from GraphIndex's kind partitions, so building it does
+    not read edge attributes either.
+
+    Immutable: GraphIndex drops its cached instance on any delta.
+    """
+    ids: List[str] = field(default_factory=list)
+    index_of: Dict[str, int] = field(default_factory=dict)
+    n_nodes: int = 0
+    out_planes: Dict[Optional[str], Plane] = field(default_factory=dict)
+    in_planes: Dict[Optional[str], Plane] = field(default_factory=dict)
+    # Per-kind in-degree of every interned id, precomputed at build time
+    in_degrees: Dict[Optional[str], array] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_index(cls, idx: "GraphIndex") -> "CompactAdjacency":
+        ids: List[str] = list(idx.id_to_node)
+        index_of: Dict[str, int] = {nid: i for i, nid in enumerate(ids)}
+        n_nodes = len(ids)
+        # every edge endpoint is a key of out_edges_of or in_edges_of; intern the dangling ones
+        for edges_of in (idx.out_edges_of, idx.in_edges_of):
+            for nid in edges_of:
+                if nid not in index_of:
+                    index_of[nid] = len(ids)
+                    ids.append(nid)
+
+        out_planes = {k: _plane(ids, index_of, part) for k, part in idx.out_ids_by_kind.items() if part}
+        in_planes = {k: _plane(ids, index_of, part) for k, part in idx.in_ids_by_kind.items() if part}
+        in_degrees = {k: _degrees(offsets) for k, (offsets, _t) in in_planes.items()}
+        return cls(
+            ids=ids,
+            index_of=index_of,
+            n_nodes=n_nodes,
+            out_planes=out_planes,
+            in_planes=in_planes,
+            in_degrees=in_degrees,
+        )
+
+    def planes(self, kinds: Set[str] | None = None, direction: str = "out") -> List[Plane]:
+        """CSR planes for the requested edge kinds (all kinds when None/empty)."""
+        source = self.out_planes if direction == "out" else self.in_planes
+        if not kinds:
+            return list(source.values())
+        return [source[k] for k in kinds if k in source]
+
+    def in_degree(self, kind: Optional[str]) -> array:
+        """Shared per-kind in-degree array; copy before mutating."""
+        degrees = self.in_degrees.get(kind)
+        if degrees is None:
+            degrees = array("i", bytes(4 * self.size))
+        return degrees
+
+    def to_ids(self, nodes: Iterable[int]) -> List[str]:
+        ids = self.ids
+        return [ids[i] for i in nodes]
+
+
+def _plane(ids: List[str], index_of: Dict[str, int], neighbors_of: Dict[str, List[str]]) -> Plane:
+    """
+    Lay out one kind-partition (nodeId -> neighbor ids) as CSR in interned order,
+    keeping neighbor order. O(N + E_kind); no edge objects are touched.
+    """
+    offsets = array("i", [0])
+    targets = array("i")
+    lookup = index_of.__getitem__
+    empty: tuple = ()
+    for nid in ids:
+        items = neighbors_of.get(nid, empty)
+        if items:
+            targets.extend(map(lookup, items))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def _degrees(offsets: array) -> array:
+    return array("i", [offsets[i + 1] - offsets[i] for i in range(len(offsets) - 1)])
+
+
+@dataclass(slots=True)
+class Condensation:
+    """
+    Strongly connected components of one CSR plane.
+
+    Components are numbered in topological order of the condensation DAG
+    (every edge between components goes from a lower to a higher number).
+    """
+    csr: CompactAdjacency
+    comp_of: array                 # interned id -> component number
+    members: List[List[int]]       # component number -> interned ids
+    cyclic: bytearray              # component number -> 1 if size > 1 or self-loop
+
+    @property
+    def has_cycles(self) -> bool:
+        return any(self.cyclic)
+
+    def cycles(self) -> List[List[str]]:
+        """Cyclic components as lists of nodeIds."""
+        return [self.csr.to_ids(self.members[c]) for c in range(len(self.members)) if self.cyclic[c]]
+
+    def order(self) -> List[str]:
+        """Indexed nodeIds in topological order of their components."""
+        n_nodes = self.csr.n_nodes
+        return self.csr.to_ids(u for comp in self.members for u in comp if u < n_nodes)
+
+
+def condense(csr: CompactAdjacency, plane: Plane | None) -> Condensation:
+    """
+    Iterative Tarjan SCC over one plane: a single O(N+E) pass with an explicit
+    call stack (no recursion limit), yielding components in reverse topological
+    order, which are then renumbered topologically.
+    """
+    n = csr.size
+    if plane is None:
+        plane = (array("i", bytes(4 * (n + 1))), array("i"))
+    offsets, targets = plane
+
+    index = array("i", [-1]) * n
+    low = array("i", [0]) * n
+    pos = array("i", [0]) * n       # next edge to scan, per vertex on the call stack
+    onstack = bytearray(n)
+    stack: List[int] = []
+    emitted: List[List[int]] = []   # SCCs in emission (reverse topological) order
+    counter = 0
+
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        onstack[root] = 1
+        pos[root] = offsets[root]
+        call = [root]
+
+        while call:
+            v = call[-1]
+            p, end = pos[v], offsets[v + 1]
+            descended = False
+            while p < end:
+                w = targets[p]
+                p += 1
+                if index[w] < 0:
+                    pos[v] = p
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onstack[w] = 1
+                    pos[w] = offsets[w]
+                    call.append(w)
+                    descended = True
+                    break
+                if onstack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            if descended:
+                continue
+
+            call.pop()
+            if call:
+                parent = call[-1]
+                if low[v] < low[parent]:
+                    low[parent] = low[v]
+            if low[v] == index[v]:
+                comp: List[int] = []
+                while True:
+                    w = stack.pop()
+                    onstack[w] = 0
+                    comp.append(w)
+                    if w == v:
+                        break
+                emitted.append(comp)
+
+    total = len(emitted)
+    members = emitted[::-1]
+    comp_of = array("i", bytes(4 * n))
+    cyclic = bytearray(total)
+    for c, comp in enumerate(members):
+        for u in comp:
+            comp_of[u] = c
+        if len(comp) > 1:
+            cyclic[c] = 1
+        else:
+            u = comp[0]
+            for i in range(offsets[u], offsets[u + 1]):
+                if targets[i] == u:
+                    cyclic[c] = 1
+                    break
+    return Condensation(csr=csr, comp_of=comp_of, members=members, cyclic=cyclic)
@@ -0,0 +1,242 @@
+"""
+Flat, bounded-memory views of a Graph: nodes in pre-order and edges, as NDJSON
+streams or cursor-paginated pages.
+
+A node row is the node's Graph JSON without its nested `nodes` (children are rows
+of their own) and with `parent` set to the node it is nested under, so the tree can
+be rebuilt from the rows. Node-owned edges stay on their node, as in GET /graph.
+The edge view lists every edge: root `Graph.edges` first, then node-owned edges in
+node pre-order, with their subclass fields (kind, ...).
+
+Pages resume where the cursor points through a GraphLocator, so each page costs
+O(depth + limit) rather than a re-scan from the first row. Node cursors name the
+last node id; edge cursors name (owner, edge id), owner None for a root edge,
+since root and node-owned edges may share an id.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple
+
+from src.schemas.graph import Graph
+from src.schemas.node import NodeUnion
+from src.services.graph_locator import GraphLocator
+
+CHUNK_ROWS = 256   # NDJSON lines per streamed chunk
+
+EdgeKey = Tuple[Optional[str], str]   # (owner node id or None for Graph.edges, edge id)
+
+
+def node_rows(
+    graph: Graph,
+    kinds: Collection[str] | None = None,
+    statuses: Collection[str] | None = None,
+    after: Optional[str] = None,
+    locate: Callable[[], GraphLocator] | None = None,
+) -> Iterator[Tuple[NodeUnion, Optional[str]]]:
+    """
+    (node, nesting parent id) in pre-order, like Graph._iter_nodes_preorder; optionally
+    filtered. With `after`, resume just past that node, found through `locate()` (a
+    fresh GraphLocator if None); ValueError, when iterated, if the node is gone.
+    """
+    if after is None:
+        stack: List[Tuple[Iterator[NodeUnion], Optional[str]]] = [(iter(graph.nodes), None)]
+    else:
+        stack = _resume(_locator(graph, locate), after)
+    while stack:
+        it, parent = stack[-1]
+        n = next(it, None)
+        if n is None:
+            stack.pop()
+            continue
+        if _keep(n, kinds, statuses):
+            yield n, parent
+        if n.nodes:
+            stack.append((iter(n.nodes), n.node_id))
+
+
+def edge_rows(
+    graph: Graph,
+    kinds: Collection[str] | None = None,
+    statuses: Collection[str] | None = None,
+    after: Optional[EdgeKey] = None,
+    locate: Callable[[], GraphLocator] | None = None,
+) -> Iterator[Tuple[Any, Optional[str]]]:
+    """
+    (edge, owner): root edges (owner None), then node-owned edges in node pre-order;
+    optionally filtered. With `after`, resume just past that (owner, edge id), as
+    node_rows does; ValueError, when iterated, if the edge is gone.
+    """
+    first, owner = 0, None
+    if after is not None:
+        owner, edge_id = after
+        loc = _locator(graph, locate)
+        if owner is None:
+            i = loc.root_edge(edge_id)
+            if i is None:
+                raise _stale()
+            first = i + 1
+        else:
+            first = len(graph.edges)
+            node = loc.node(owner)
+            pos = next((i for i, e in enumerate(node.edges) if e.edge_id == edge_id), None) if node is not None else None
+            if pos is None:
+                raise _stale()
+    for i in range(first, len(graph.edges)):
+        e = graph.edges[i]
+        if _keep(e, kinds, statuses):
+            yield e, None
+    if owner is None:
+        nodes = node_rows(graph)
+    else:
+        for e in node.edges[pos + 1:]:
+            if _keep(e, kinds, statuses):
+                yield e, owner
+        nodes = node_rows(graph, after=owner, locate=lambda: loc)
+    for n, _ in nodes:
+        for e in n.edges:
+            if _keep(e, kinds, statuses):
+                yield e, n.node_id
+
+
+def node_key(row: Tuple[NodeUnion, Optional[str]]) -> str:
+    return row[0].node_id
+
+
+def edge_key(row: Tuple[Any, Optional[str]]) -> EdgeKey:
+    edge, owner = row
+    return owner, edge.edge_id
+
+
+def node_doc(row: Tuple[NodeUnion, Optional[str]]) -> Dict[str, Any]:
+    node, parent = row
+    doc = node.model_dump(mode="json", by_alias=True, exclude={"nodes"})
+    doc["parent"] = parent
+    return doc
+
+
+def node_line(row: Tuple[NodeUnion, Optional[str]]) -> bytes:
+    node, parent = row
+    if node.parent == parent:   # common case: serialize straight to bytes
+        return node.model_dump_json(by_alias=True, exclude={"nodes"}).encode() + b"\n"
+    return json.dumps(node_doc(row), separators=(",", ":")).encode() + b"\n"
+
+
+def edge_doc(row: Tuple[Any, Optional[str]]) -> Dict[str, Any]:
+    return row[0].model_dump(mode="json", by_alias=True, serialize_as_any=True)
+
+
+def edge_line(row: Tuple[Any, Optional[str]]) -> bytes:
+    return row[0].model_dump_json(by_alias=True, serialize_as_any=True).encode() + b"\n"
+
+
+def ndjson(store: Any, graph_id: str, rows: Callable[[Graph], Iterator[Any]], line: Callable[[Any], bytes]) -> Iterator[bytes]:
+    """
+    NDJSON chunks of `line(row)` for `rows(graph)` over one pinned version of the graph.
+    The snapshot is opened before this returns (KeyError if absent, so callers can 404
+    before any byte is sent) and released when the iterator is exhausted or closed.
+    """
+    chunks = _chunks(store, graph_id, rows, line)
+    next(chunks)
+    return chunks
+
+
+def page(rows: Iterator[Any], key: Callable[[Any], Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Up to `limit` of `rows` (already resumed past the cursor, see node_rows/edge_rows)
+    and the cursor of the next page (None at the end). Cursors name the last row
+    returned, so they survive edits elsewhere in the graph; ValueError if its row no
+    longer exists.
+    """
+    items: List[Any] = []
+    for row in rows:
+        if len(items) == limit:
+            return items, encode_cursor(key(items[-1]))
+        items.append(row)
+    return items, None
+
+
+def encode_cursor(after: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": after}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Malformed cursor")
+
+
+def node_after(cursor: Optional[str]) -> Optional[str]:
+    """The node id a node-page cursor resumes after (None for the first page); ValueError if malformed."""
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if not isinstance(after, str):
+        raise ValueError("Malformed cursor")
+    return after
+
+
+def edge_after(cursor: Optional[str]) -> Optional[EdgeKey]:
+    """The (owner, edge id) an edge-page cursor resumes after (None for the first page); ValueError if malformed."""
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if not (isinstance(after, list) and len(after) == 2 and isinstance(after[1], str)
+            and (after[0] is None or isinstance(after[0], str))):
+        raise ValueError("Malformed cursor")
+    return after[0], after[1]
+
+
+# ----------------------------- private --------------------------------
+
+def _locator(graph: Graph, locate: Callable[[], GraphLocator] | None) -> GraphLocator:
+    return locate() if locate is not None else GraphLocator(graph)
+
+
+def _resume(loc: GraphLocator, after: str) -> List[Tuple[Iterator[NodeUnion], Optional[str]]]:
+    """The pre-order walk's stack just past node `after`: its children, then the later siblings up its path."""
+    slots = []
+    nid: Optional[str] = after
+    while nid is not None:
+        hit = loc.slot(nid)
+        if hit is None:
+            raise _stale()
+        slots.append(hit)
+        nid = hit[0]
+    stack = [(_tail(container, i + 1), parent) for parent, container, i in reversed(slots)]
+    _, container, i = slots[0]
+    stack.append((iter(container[i].nodes), after))
+    return stack
+
+
+def _tail(items: List[Any], start: int) -> Iterator[Any]:
+    return (items[i] for i in range(start, len(items)))
+
+
+def _stale() -> ValueError:
+    return ValueError("Cursor no longer matches an item in this graph")
+
+
+def _keep(item: Any, kinds: Collection[str] | None, statuses: Collection[str] | None) -> bool:
+    if kinds and getattr(item, "kind", None) not in kinds:
+        return False
+    if statuses:
+        status = getattr(item, "status", None)
+        return getattr(status, "value", status) in statuses
+    return True
+
+
+def _chunks(store: Any, graph_id: str, rows, line) -> Iterator[bytes]:
+    with store.read(graph_id) as snap:
+        yield b""   # primed by ndjson(): the graph is pinned from here on
+        buf: List[bytes] = []
+        for row in rows(snap.graph):
+            buf.append(line(row))
+            if len(buf) >= CHUNK_ROWS:
+                yield b"".join(buf)
+                buf.clear()
+        if buf:
+            yield b"".join(buf)
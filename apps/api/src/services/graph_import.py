@@ -0,0 +1,94 @@
+"""
+Streaming NDJSON import: one node or edge per line, validated and applied in
+fixed-size batches so memory stays flat however large the upload is.
+
+Each batch is applied in one GraphStore.write (one published version), and the
+next batch is not read from the request until the previous one is applied, so a
+fast client is throttled by TCP flow control rather than buffered in memory.
+Batches are not one transaction: lines that fail are reported and skipped, and
+lines before them stay applied. Nodes are upserted in file order, so a child's
+parent must appear on an earlier line (or already be in the graph).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from src.services.graph_mutations import GraphMutator
+
+BATCH_LINES = 500   # lines validated and applied per store write
+
+
+@dataclass
+class ImportReport:
+    lines: int = 0
+    applied: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)   # (1-based line, message), capped
+    max_errors: int = 100
+
+    def fail(self, line_no: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_no, message))
+
+
+async def ndjson_batches(chunks: AsyncIterator[bytes], size: int = BATCH_LINES) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    """Group a byte stream into batches of (line number, line) with blank lines skipped."""
+    batch: List[Tuple[int, bytes]] = []
+    tail = b""
+    line_no = 0
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for raw in lines:
+            line_no += 1
+            if raw.strip():
+                batch.append((line_no, raw))
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+    if tail.strip():
+        batch.append((line_no + 1, tail))
+    if batch:
+        yield batch
+
+
+def apply_batch(
+    store: Any,
+    graph_id: str,
+    batch: List[Tuple[int, bytes]],
+    adapter: TypeAdapter,
+    apply: Callable[[GraphMutator, Any], None],
+    report: ImportReport,
+) -> None:
+    """
+    Validate every line of `batch` with `adapter`, then apply the valid ones through
+    `apply(mutator, item)` in one store write. KeyError if the graph is gone.
+    """
+    report.lines += len(batch)
+    valid = []
+    for line_no, raw in batch:
+        try:
+            valid.append((line_no, adapter.validate_json(raw)))
+        except ValidationError as e:
+            report.fail(line_no, _first_error(e))
+    if not valid:
+        return
+    with store.write(graph_id) as m:
+        for line_no, item in valid:
+            try:
+                apply(m, item)
+            except ValueError as e:
+                report.fail(line_no, str(e))
+            else:
+                report.applied += 1
+
+
+def _first_error(e: ValidationError) -> str:
+    err = e.errors(include_url=False)[0]
+    loc = ".".join(str(p) for p in err.get("loc", ()))
+    more = f" (+{e.error_count() - 1} more)" if e.error_count() > 1 else ""
+    return f"{loc}: {err['msg']}{more}" if loc else f"{err['msg']}{more}"
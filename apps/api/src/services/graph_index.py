@@ -1,18 +1,22 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Iterable
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Set, Iterable
 
 from src.schemas.graph import Graph
 from src.schemas.node import NodeUnion
 from src.schemas.edge import EdgeUnion
+from src.services.graph_csr import CompactAdjacency, Condensation, condense
+from src.services.graph_reach import ReachabilityIndex
 
 @dataclass(slots=True)
 class GraphIndex:
     """
-    A read-only, in-memory index for fast graph operations.
+    An in-memory index for fast graph operations.
     It builds a directed graph index from a Graph schema, allowing efficient
-    traversal and querying of nodes and edges.
+    traversal and querying of nodes and edges. Node/edge deltas can be applied
+    in place so a live index never needs a full rebuild after a small edit.
     """
     id_to_node: Dict[str, NodeUnion] = field(default_factory=dict)
     children_of: Dict[str, List[str]] = field(default_factory=dict)
@@ -22,9 +26,21 @@ class GraphIndex:
     out_edges_of: Dict[str, List[EdgeUnion]] = field(default_factory=dict)
     in_edges_of: Dict[str, List[EdgeUnion]] = field(default_factory=dict)
 
+    # Neighbor ids partitioned by edge kind: kind -> nodeId -> [neighbor ids]
+    # (edges without a `kind` are filed under None)
+    out_ids_by_kind: Dict[Optional[str], Dict[str, List[str]]] = field(default_factory=dict)
+    in_ids_by_kind: Dict[Optional[str], Dict[str, List[str]]] = field(default_factory=dict)
+
     # Metric catalog for rollups: nodeId -> set(metricIds) (typically goals)
     metrics_on: Dict[str, Set[str]] = field(default_factory=dict)
 
+    edge_count: int = 0
+
+    # Lazily built int/CSR view used by GraphOps; dropped on every delta
+    _compact: Optional[CompactAdjacency] = field(default=None, init=False, repr=False, compare=False)
+    # Per-kind reachability indexes; kept across edge inserts, dropped on removals
+    _reach: Dict[Optional[str], ReachabilityIndex] = field(default_factory=dict, init=False, repr=False, compare=False)
+
     @classmethod
     def from_graph(cls, g: Graph) -> "GraphIndex":
         """
@@ -33,75 +49,201 @@ class GraphIndex:
           - g.edges at the root (if present)
         """
         index = cls()
-        # 1) Flatten nodes and collect metrics
+        # 1) Flatten nodes, their nesting, metrics and node-owned edges
         for n in _iter_nodes_recursive(g.nodes):
-            nid = n.node_id
-            index.id_to_node[nid] = n
-            # children/parents from nesting (not from edges)
-            index.children_of.setdefault(nid, [])
-            index.parents_of.setdefault(nid, [])
-            for c in n.nodes:
-                cid = c.node_id
-                index.children_of[nid].append(cid)
-                index.parents_of.setdefault(cid, []).append(nid)
-
-            # measurable metrics on goals
-            if getattr(n, "kind", None) == "goal":
-                # n.smarter.smarter.measurable -> list of Metric(model)
-                metrics = getattr(n.smarter.smarter, "measurable", [])
-                mids = {m.metric_id for m in metrics}
-                if mids:
-                    index.metrics_on[nid] = mids
-
-            # outgoing edges stored on the node (if you keep them here)
-            if getattr(n, "edges", None):
-                for e in n.edges:
-                    index._add_edge(e)
+            index._index_node(n)
 
         # 2) Root-level edges (if you also store them there)
         for e in getattr(g, "edges", []) or []:
             index._add_edge(e)
 
-        # Ensure every node id is present in edge maps
-        for nid in index.id_to_node:
-            index.out_edges_of.setdefault(nid, [])
-            index.in_edges_of.setdefault(nid, [])
-
         return index
 
+    # ---- Delta maintenance (keeps the index equal to from_graph of the edited graph) ----
+
+    def add_node(self, node: NodeUnion, parent_id: str | None = None) -> None:
+        """Index `node` with its nested subtree and node-owned edges, under `parent_id`."""
+        self._compact = None
+        for n in _iter_nodes_recursive([node]):
+            self._index_node(n)
+        if parent_id is not None and parent_id in self.id_to_node:
+            self.children_of[parent_id].append(node.node_id)
+            self.parents_of[node.node_id].append(parent_id)
+
+    def remove_node(self, node_id: str) -> None:
+        """
+        Drop `node_id`, its nested subtree and the edges those nodes own.
+        Edges owned elsewhere that point at removed nodes stay indexed (dangling),
+        exactly as from_graph would see them.
+        """
+        node = self.id_to_node.get(node_id)
+        if node is None:
+            return
+        self._compact = None
+        self._reach.clear()
+        for pid in self.parents_of.get(node_id, []):
+            self.children_of[pid].remove(node_id)
+        removed = [n.node_id for n in _iter_nodes_recursive([node])]
+        for n in _iter_nodes_recursive([node]):
+            for e in n.edges or []:
+                self.remove_edge(e)
+        for nid in removed:
+            del self.id_to_node[nid]
+            self.children_of.pop(nid, None)
+            self.parents_of.pop(nid, None)
+            self.metrics_on.pop(nid, None)
+        for nid in removed:
+            self._drop_if_unused(nid)
+
+    def reparent(self, node_id: str, parent_id: str | None) -> None:
+        """Move `node_id` (and its subtree) under `parent_id`, or to the root when None."""
+        for pid in self.parents_of.get(node_id, []):
+            self.children_of[pid].remove(node_id)
+        self.parents_of[node_id] = []
+        if parent_id is not None:
+            self.children_of[parent_id].append(node_id)
+            self.parents_of[node_id].append(parent_id)
+
+    def add_edge(self, e: EdgeUnion) -> None:
+        self._compact = None
+        self._add_edge(e)
+
+    def remove_edge(self, e: EdgeUnion) -> None:
+        """Remove this exact edge object from the adjacency maps."""
+        self._compact = None
+        self._reach.clear()
+        _remove_identity(self.out_edges_of.get(e.from_node, []), e)
+        _remove_identity(self.in_edges_of.get(e.to_node, []), e)
+        kind = getattr(e, "kind", None)
+        _remove_value(self.out_ids_by_kind.get(kind, {}), e.from_node, e.to_node)
+        _remove_value(self.in_ids_by_kind.get(kind, {}), e.to_node, e.from_node)
+        self.edge_count -= 1
+        self._drop_if_unused(e.from_node)
+        self._drop_if_unused(e.to_node)
+
+    def _index_node(self, n: NodeUnion) -> None:
+        nid = n.node_id
+        self.id_to_node[nid] = n
+        # children/parents from nesting (not from edges)
+        self.children_of.setdefault(nid, [])
+        self.parents_of.setdefault(nid, [])
+        for c in n.nodes:
+            cid = c.node_id
+            self.children_of[nid].append(cid)
+            self.parents_of.setdefault(cid, []).append(nid)
+
+        # measurable metrics on goals
+        if getattr(n, "kind", None) == "goal":
+            # n.smarter.smarter.measurable -> list of Metric(model)
+            metrics = getattr(n.smarter.smarter, "measurable", [])
+            mids = {m.metric_id for m in metrics}
+            if mids:
+                self.metrics_on[nid] = mids
+
+        # outgoing edges stored on the node (if you keep them here)
+        if getattr(n, "edges", None):
+            for e in n.edges:
+                self._add_edge(e)
+
+        # Ensure every node id is present in edge maps
+        self.out_edges_of.setdefault(nid, [])
+        self.in_edges_of.setdefault(nid, [])
+
     def _add_edge(self, e: EdgeUnion) -> None:
         """Add a directed edge to the adjacency maps."""
         self.out_edges_of.setdefault(e.from_node, []).append(e)
         self.in_edges_of.setdefault(e.to_node, []).append(e)
+        kind = getattr(e, "kind", None)
+        self.out_ids_by_kind.setdefault(kind, {}).setdefault(e.from_node, []).append(e.to_node)
+        self.in_ids_by_kind.setdefault(kind, {}).setdefault(e.to_node, []).append(e.from_node)
+        self.edge_count += 1
+        reach = self._reach.get(kind) if self._reach else None
+        if reach is not None:
+            reach.add_edge(e.from_node, e.to_node)
+            if reach.stale:
+                del self._reach[kind]
+
+    def _drop_if_unused(self, nid: str) -> None:
+        """Forget empty adjacency lists of ids that are no longer nodes."""
+        if nid in self.id_to_node:
+            return
+        if not self.out_edges_of.get(nid, True):
+            del self.out_edges_of[nid]
+        if not self.in_edges_of.get(nid, True):
+            del self.in_edges_of[nid]
+
+    def weight(self) -> int:
+        """Approximate memory weight of the index: nodes + edges."""
+        return len(self.id_to_node) + self.edge_count
 
     # ---- Convenience API for algorithms ----
 
-    def out_neighbors(self, node_id: str, kinds: Set[str] | None = None) -> List[str]:
-        edges = self.out_edges_of.get(node_id, [])
-        if kinds:
-            return [e.to_node for e in edges if getattr(e, "kind", None) in kinds]
-        return [e.to_node for e in edges]
+    def compact(self) -> CompactAdjacency:
+        """Integer-interned CSR view of the adjacency, built once per index state."""
+        csr = self._compact
+        if csr is None:
+            csr = self._compact = CompactAdjacency.from_index(self)
+        return csr
+
+    def reachability(self, kind: Optional[str], cond: Condensation | None = None) -> ReachabilityIndex:
+        """
+        Reachability index over `kind` edges, built once from the condensation
+        (`cond` if the caller already has it) and then maintained across edge inserts.
+        """
+        reach = self._reach.get(kind)
+        if reach is None:
+            csr = self.compact()
+            plane = csr.out_planes.get(kind)
+            if cond is None or cond.csr is not csr:
+                cond = condense(csr, plane)
+            reach = self._reach[kind] = ReachabilityIndex(cond, plane)
+        return reach
+
+    def out_neighbors(self, node_id: str, kinds: Set[str] | None = None) -> Iterable[str]:
+        """
+        Outgoing neighbor ids over `kinds` (all kinds when None/empty).
+        For a single kind this is the index's own list: iterate it, don't mutate it.
+        """
+        if not kinds:
+            return (e.to_node for e in self.out_edges_of.get(node_id, ()))
+        return _neighbors(self.out_ids_by_kind, node_id, kinds)
 
-    def in_neighbors(self, node_id: str, kinds: Set[str] | None = None) -> List[str]:
-        edges = self.in_edges_of.get(node_id, [])
-        if kinds:
-            return [e.from_node for e in edges if getattr(e, "kind", None) in kinds]
-        return [e.from_node for e in edges]
+    def in_neighbors(self, node_id: str, kinds: Set[str] | None = None) -> Iterable[str]:
+        """Incoming neighbor ids; same contract as out_neighbors."""
+        if not kinds:
+            return (e.from_node for e in self.in_edges_of.get(node_id, ()))
+        return _neighbors(self.in_ids_by_kind, node_id, kinds)
 
     def in_degree(self, kind: str | None = None) -> Dict[str, int]:
         """
         In-degree over an optional single edge kind (most common: 'dependency').
-        If kind is None, count all incoming edges.
+        If kind is None, count all incoming edges. Reads list lengths, never edges.
         """
+        incoming = self.in_edges_of if kind is None else self.in_ids_by_kind.get(kind, {})
         indeg: Dict[str, int] = {nid: 0 for nid in self.id_to_node}
-        for nid, incoming in self.in_edges_of.items():
-            if kind is None:
-                indeg[nid] = len(incoming)
-            else:
-                indeg[nid] = sum(1 for e in incoming if getattr(e, "kind", None) == kind)
+        for nid, items in incoming.items():
+            indeg[nid] = len(items)
         return indeg
 
 
+_EMPTY: Sequence[str] = ()
+
+
+def _neighbors(by_kind: Dict[Optional[str], Dict[str, List[str]]], node_id: str, kinds: Set[str]) -> Iterable[str]:
+    if len(kinds) == 1:
+        for kind in kinds:
+            return by_kind.get(kind, {}).get(node_id, _EMPTY)
+    return chain.from_iterable(by_kind.get(k, {}).get(node_id, _EMPTY) for k in kinds)
+
+
+def _remove_value(lists: Dict[str, List[str]], key: str, value: str) -> None:
+    items = lists.get(key)
+    if items is not None:
+        items.remove(value)
+        if not items:
+            del lists[key]
+
+
 def _iter_nodes_recursive(nodes: Iterable[NodeUnion]):
     """Yield nodes in a pre-order traversal over the nested 'nodes' tree."""
     stack = list(nodes)[::-1]
@@ -110,4 +252,12 @@ def _iter_nodes_recursive(nodes: Iterable[NodeUnion]):
         yield n
         # push children in reverse to visit left-to-right
         if getattr(n, "nodes", None):
-            stack.extend(list(n.nodes)[::-1])
\ No newline at end of file
+            stack.extend(list(n.nodes)[::-1])
+
+
+def _remove_identity(items: List[EdgeUnion], e: EdgeUnion) -> None:
+    """Remove `e` by identity (equal-but-distinct edges may coexist)."""
+    for i, cur in enumerate(items):
+        if cur is e:
+            del items[i]
+            return
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (nesting parent id or None, container list holding the node, position in it)
+Slot = Tuple[Optional[str], List[Any], int]
+
+
+class GraphLocator:
+    """
+    Where every node and edge of one Graph lives:
+      - nodes:      node id -> (nesting parent id, container list, position)
+      - root_edges: edge id -> position in Graph.edges
+      - owners:     edge id -> owners, None for Graph.edges else the owning node id
+
+    Built in one pass (O(N + E)) and kept in step by GraphMutator; GraphStore keeps
+    it with the stored Graph between writes. Locating, replacing or removing one
+    node then costs O(1) plus the size of what moves (its subtree, its later
+    siblings). First occurrence wins for duplicate ids, as in a pre-order scan.
+    Lookups check that the slot still holds the node and rebuild otherwise; after
+    editing the lists directly, build a new one, since an appended node cannot be
+    detected.
+    """
+
+    def __init__(self, graph: Any):
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.nodes: Dict[str, Slot] = {}
+        self.root_edges: Dict[str, int] = {}
+        self.owners: Dict[str, List[Optional[str]]] = {}
+        for i, e in enumerate(self.graph.edges):
+            self.root_edges.setdefault(e.edge_id, i)
+            self.owners.setdefault(e.edge_id, []).append(None)
+        for i in range(len(self.graph.nodes)):
+            self.place(self.graph.nodes, i, None, keep_first=True)
+
+    # ---- lookups ----
+
+    def slot(self, node_id: str) -> Optional[Slot]:
+        hit = self.nodes.get(node_id)
+        if hit is not None and not _holds(hit, node_id):
+            self.rebuild()
+            hit = self.nodes.get(node_id)
+        return hit
+
+    def node(self, node_id: str) -> Any:
+        hit = self.slot(node_id)
+        return hit[1][hit[2]] if hit is not None else None
+
+    def parent_of(self, node_id: str) -> Optional[str]:
+        hit = self.slot(node_id)
+        return hit[0] if hit is not None else None
+
+    def path(self, node_id: str) -> Optional[List[int]]:
+        """Positions from the root list down to the node (for JSON Pointers), or None."""
+        steps: List[int] = []
+        nid: Optional[str] = node_id
+        while nid is not None:
+            hit = self.slot(nid)
+            if hit is None:
+                return None
+            steps.append(hit[2])
+            nid = hit[0]
+        steps.reverse()
+        return steps
+
+    def is_ancestor(self, ancestor_id: str, node_id: str) -> bool:
+        """True if `node_id` is nested (at any depth) under `ancestor_id`."""
+        nid = self.parent_of(node_id)
+        while nid is not None:
+            if nid == ancestor_id:
+                return True
+            nid = self.parent_of(nid)
+        return False
+
+    def root_edge(self, edge_id: str) -> Optional[int]:
+        i = self.root_edges.get(edge_id)
+        if i is not None and (i >= len(self.graph.edges) or self.graph.edges[i].edge_id != edge_id):
+            self.rebuild()
+            i = self.root_edges.get(edge_id)
+        return i
+
+    def owners_of(self, edge_id: str) -> List[Optional[str]]:
+        return list(self.owners.get(edge_id, ()))
+
+    # ---- maintenance (call after/before the matching list edit) ----
+
+    def place(self, container: List[Any], i: int, parent_id: Optional[str], keep_first: bool = False) -> None:
+        """Map container[i], nested under `parent_id`, with its subtree and their owned edges."""
+        stack: List[Slot] = [(parent_id, container, i)]
+        while stack:
+            pid, c, j = stack.pop()
+            n = c[j]
+            nid = n.node_id
+            if keep_first:
+                self.nodes.setdefault(nid, (pid, c, j))
+            else:
+                self.nodes[nid] = (pid, c, j)
+            for e in n.edges:
+                self.owners.setdefault(e.edge_id, []).append(nid)
+            stack.extend((nid, n.nodes, k) for k in range(len(n.nodes) - 1, -1, -1))
+
+    def unplace(self, container: List[Any], i: int) -> None:
+        """Unmap container[i] with its subtree and owned edges; call before removing it."""
+        stack = [container[i]]
+        while stack:
+            n = stack.pop()
+            hit = self.nodes.get(n.node_id)
+            if hit is not None and hit[1][hit[2]] is n:
+                del self.nodes[n.node_id]
+            for e in n.edges:
+                self._drop_owner(e.edge_id, n.node_id)
+            stack.extend(n.nodes)
+
+    def shift(self, container: List[Any], start: int) -> None:
+        """Renumber container[start:] after an element before `start` was removed."""
+        for k in range(start, len(container)):
+            hit = self.nodes.get(container[k].node_id)
+            if hit is not None and hit[1] is container:
+                self.nodes[container[k].node_id] = (hit[0], container, k)
+
+    def root_edge_added(self, i: int, edge: Any) -> None:
+        self.root_edges.setdefault(edge.edge_id, i)
+        self.owners.setdefault(edge.edge_id, []).append(None)
+
+    def root_edges_removed(self, edge_id: str) -> None:
+        """Graph.edges lost every `edge_id` (and was rebuilt): renumber it in O(E)."""
+        self.root_edges = {}
+        for i, e in enumerate(self.graph.edges):
+            self.root_edges.setdefault(e.edge_id, i)
+        while None in self.owners.get(edge_id, ()):
+            self._drop_owner(edge_id, None)
+
+    def root_edges_shifted(self, first: int, removed: Iterable[Any] = ()) -> None:
+        """
+        Graph.edges changed from position `first` on (edges inserted there, or
+        `removed` deleted): renumber only from there, in O(E - first).
+        """
+        seen = set()
+        edges = self.graph.edges
+        for i in range(first, len(edges)):
+            eid = edges[i].edge_id
+            if eid not in seen:
+                seen.add(eid)
+                if self.root_edges.get(eid, first) >= first:
+                    self.root_edges[eid] = i
+        for e in removed:
+            self._drop_owner(e.edge_id, None)
+            if e.edge_id not in seen and self.root_edges.get(e.edge_id, -1) >= first:
+                del self.root_edges[e.edge_id]
+
+    def owned_edge_added(self, host_id: str, edge: Any) -> None:
+        self.owners.setdefault(edge.edge_id, []).append(host_id)
+
+    def owned_edges_removed(self, host_id: str, edge_id: str) -> None:
+        while host_id in self.owners.get(edge_id, ()):
+            self._drop_owner(edge_id, host_id)
+
+    def owned_edge_removed(self, host_id: str, edge: Any) -> None:
+        """One edge left the node-owned list of `host_id` (others with its id may remain)."""
+        self._drop_owner(edge.edge_id, host_id)
+
+    # ----------------------------- private --------------------------------
+
+    def _drop_owner(self, edge_id: str, owner: Optional[str]) -> None:
+        owners = self.owners.get(edge_id)
+        if owners is None or owner not in owners:
+            return
+        owners.remove(owner)
+        if not owners:
+            del self.owners[edge_id]
+
+
+def _holds(slot: Slot, node_id: str) -> bool:
+    _, container, i = slot
+    return i < len(container) and getattr(container[i], "node_id", None) == node_id
@@ -0,0 +1,659 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter
+
+from src.schemas.graph import Graph
+from src.schemas.node import NodeUnion
+from src.schemas.edge import EdgeBase, EdgeUnion
+from src.services.graph_index import GraphIndex
+from src.services.graph_locator import GraphLocator
+from src.services.graph_topo import CycleError, TopoOrder
+from src.services.graph_validation import GraphValidator
+
+
+class GraphMutator:
+    """
+    Applies node/edge edits to a Graph aggregate.
+
+    When a live GraphIndex for the same graph is supplied, every edit is mirrored
+    into it as a delta (O(subtree + degree)), so the index stays equal to
+    GraphIndex.from_graph(graph) without being rebuilt.
+
+    When a `journal` list is supplied, every applied edit is also appended to it as
+    a JSON-ready op ({"op": name, ...}; see OPS), serialized at the time of the
+    edit so later edits to the same objects cannot leak into it. Replaying the
+    journal through `apply` on a copy of the original graph reproduces the result.
+
+    When a `patch` list is supplied, every applied edit is also described there as
+    RFC 6902 JSON Patch operations against the graph's JSON (by alias), so a client
+    holding the previous version can catch up without refetching the graph.
+    GraphStore.write stamps `base_version`/`version` (before/after the edits).
+    `edits` counts the edits applied; a no-op (e.g. deleting a missing id) adds none.
+
+    When a GraphValidator is supplied, every edit is reported to it the same
+    way, so its violations stay those of a full audit of the edited graph.
+
+    The graph's maintained topological order of dependency edges (`topo()`; passed
+    in like the locator below, else built on first use) is kept in step too. With `acyclic`, a dependency edge that would close a cycle
+    raises CycleError (a ValueError) with the cycle path before the graph is touched.
+
+    Edits that would break Graph.check_invariants (a root edge to an unknown node or
+    metric, a node id used twice) raise ValueError before the graph is touched too,
+    so a stored graph always decodes again. Replays (`apply`) and rollbacks restore
+    recorded states and skip these checks.
+
+    Inside `atomic()`, every edit also leaves an undo step. If the block raises,
+    the steps run in reverse, so the graph, its order and every mirror above end up
+    as before the block, and the block's journal and patch entries are dropped.
+
+    Nodes and edges are located through a GraphLocator of the graph (`locator()`):
+    the one passed in (GraphStore keeps it with the stored graph between writes),
+    else one built on first use. Every edit keeps it in step: an edit costs O(1)
+    plus what it moves, never a scan of the tree, so n upserts into an N-node graph
+    cost O(n + N) overall.
+    """
+
+    # op name -> argument keys, in call order
+    OPS = {
+        "upsert_node": ("node",),
+        "delete_node": ("node_id",),
+        "delete_node_cascade": ("node_id",),
+        "reparent": ("node_id", "parent_id"),
+        "upsert_edge": ("edge",),
+        "attach_edge": ("host_id", "edge"),
+        "delete_edge": ("edge_id",),
+    }
+
+    def __init__(
+        self,
+        graph: Graph,
+        index: GraphIndex | None = None,
+        journal: List[Dict[str, Any]] | None = None,
+        patch: List[Dict[str, Any]] | None = None,
+        validator: GraphValidator | None = None,
+        acyclic: bool = False,
+        locator: GraphLocator | None = None,
+        topo: TopoOrder | None = None,
+    ):
+        self.graph = graph
+        self.index = index
+        self.journal = journal
+        self.patch = patch
+        self.validator = validator
+        self.acyclic = acyclic
+        self._locator = locator
+        self._topo = topo
+        self.undo: List[Callable[[], Any]] | None = None
+        self.base_version: Optional[int] = None
+        self.version: Optional[int] = None
+        self.edits = 0
+        self.checked = True
+
+    def apply(self, op: Dict[str, Any]) -> None:
+        """Re-apply one journaled op (node/edge payloads already validated to models)."""
+        name = op["op"]
+        if name not in self.OPS:
+            raise ValueError(f"Unknown graph op: {name}")
+        checked, self.checked = self.checked, False   # it passed the checks when first applied
+        try:
+            getattr(self, name)(*(op[k] for k in self.OPS[name]))
+        finally:
+            self.checked = checked
+
+    def locator(self, build: bool = True) -> Optional[GraphLocator]:
+        """
+        The GraphLocator of `graph`, kept in step by every edit. build=False only
+        returns one that is already there (for the store to keep).
+        """
+        if self._locator is None or self._locator.graph is not self.graph:
+            self._locator = GraphLocator(self.graph) if build else None
+        return self._locator
+
+    def topo(self, build: bool = True) -> Optional[TopoOrder]:
+        """
+        The maintained topological order of `graph`'s dependency edges. build=False
+        only returns one that is already maintained.
+        """
+        if self._topo is None or self._topo.stale:
+            self._topo = TopoOrder.from_graph(self.graph) if build else None
+        return self._topo
+
+    @contextmanager
+    def atomic(self) -> Iterator["GraphMutator"]:
+        """All edits made in the block, or none of them if it raises (see the class doc)."""
+        if self.undo is not None:               # nested: the outer block decides
+            yield self
+            return
+        self.undo = []
+        marks = (len(self.journal or ()), len(self.patch or ()), self.edits)
+        try:
+            yield self
+        except BaseException:
+            self._rollback(*marks)
+            raise
+        finally:
+            self.undo = None
+
+    # ---- nodes ----
+
+    def upsert_node(self, node: NodeUnion) -> None:
+        """Replace a node with the same id in place, else insert under node.parent or at the root."""
+        nid = node.node_id
+        hit = self.locator().slot(nid)
+        existed = hit is not None
+        old_parent = hit[0] if hit is not None else None
+        old = hit[1][hit[2]] if hit is not None else None
+        if old is None and node.parent is not None and self._node(node.parent) is None:
+            raise ValueError(f"Parent node '{node.parent}' not found for upsert")
+        self._check_ids(node, old)
+        self._admit(_owned(node), _owned(old), _ids(node), _ids(old))
+
+        self._place(node, hit)
+        self._record("upsert_node", node=node)
+        self._undo(partial(self.upsert_node, old) if old is not None else partial(self.delete_node, nid))
+
+        if self.index is not None:
+            if existed:
+                self.index.remove_node(nid)
+                self.index.add_node(node, old_parent)
+            else:
+                self.index.add_node(node, node.parent)
+        if self.validator is not None:
+            if old is not None:
+                self.validator.remove_node(old)
+            self.validator.add_node(node)
+        if self.patch is not None:
+            self._patched("replace" if existed else "add", self.pointer(nid), node)
+
+    def delete_node(self, node_id: str) -> Optional[NodeUnion]:
+        """Remove a node and its nested subtree. Returns the removed node or None."""
+        loc = self.locator()
+        hit = loc.slot(node_id)
+        if hit is None:
+            return None
+        where = self.pointer(node_id) if self.patch is not None else None
+        removed = self._detach(node_id)
+        self._record("delete_node", node_id=node_id)
+        self._undo(partial(self._restore_node, hit[0], hit[2], removed))
+        if self.patch is not None:
+            self.patch.append({"op": "remove", "path": where})
+        if self.index is not None:
+            self.index.remove_node(node_id)
+        if self.validator is not None:
+            self.validator.remove_node(removed)
+        self._admit((), _owned(removed), (), _ids(removed))
+        return removed
+
+    def delete_node_cascade(self, node_id: str) -> Optional[Cascade]:
+        """
+        Remove a node, its nested subtree and every edge touching any of them, wherever
+        the edge is held (Graph.edges or another node's edge list), so no dangling edge
+        is left behind. Returns what was removed (see plan_cascade), or None.
+        """
+        plan = plan_cascade(self.graph, self._edge_index(), node_id, self.locator())
+        if plan is None:
+            return None
+        journal, self.journal = self.journal, None   # replayed as one op
+        try:
+            self._remove_edges(plan.incident)
+            self.delete_node(node_id)
+        finally:
+            self.journal = journal
+        self._record("delete_node_cascade", node_id=node_id)
+        return plan
+
+    def reparent(self, node_id: str, parent_id: Optional[str]) -> None:
+        """Move a node (with its subtree) under `parent_id`, or to the root when None."""
+        host: Optional[NodeUnion] = None
+        if parent_id is not None:
+            if parent_id == node_id or self.locator().is_ancestor(node_id, parent_id):
+                raise ValueError(f"Cannot move node '{node_id}' under its own subtree")
+            host = self._node(parent_id)
+            if host is None:
+                raise ValueError(f"Parent node '{parent_id}' not found for reparent")
+        where = self.pointer(node_id) if self.patch is not None and self._node(node_id) is not None else None
+        slot = self.locator().slot(node_id)
+        node = self._detach(node_id)
+        if node is None:
+            raise ValueError(f"Node '{node_id}' not found for reparent")
+        self._undo(partial(self._unmove, node_id, slot[0], slot[2], node.parent))
+        if self.validator is not None:
+            self.validator.remove_node(node)   # its `parent` claim changes
+        node.parent = parent_id
+        container = self.graph.nodes if host is None else host.nodes
+        container.append(node)
+        self.locator().place(container, len(container) - 1, parent_id)
+        self._record("reparent", node_id=node_id, parent_id=parent_id)
+        if self.patch is not None:
+            to = self.pointer(node_id)
+            self.patch.append({"op": "move", "from": where, "path": to})
+            self.patch.append({"op": "replace", "path": to + "/parent", "value": parent_id})
+        if self.index is not None:
+            self.index.reparent(node_id, parent_id)
+        if self.validator is not None:
+            self.validator.add_node(node)
+
+    # ---- edges ----
+
+    def upsert_edge(self, edge: EdgeUnion) -> None:
+        """Replace a root edge with the same id, else append it to the root edge list."""
+        self._check_root_edge(edge)
+        i = self.locator().root_edge(edge.edge_id)
+        self._admit([edge], [self.graph.edges[i]] if i is not None else ())
+        self._upsert_edge(edge)
+
+    def upsert_edges(self, edges: List[EdgeUnion]) -> None:
+        """
+        upsert_edge for each edge, checked for cycles as one unit: a CycleError
+        rejects the whole batch before any edit.
+        """
+        for e in edges:
+            self._check_root_edge(e)
+        last = {e.edge_id: e for e in edges}
+        loc = self.locator()
+        slots = (loc.root_edge(edge_id) for edge_id in last)
+        self._admit(list(last.values()), [self.graph.edges[i] for i in slots if i is not None])
+        for e in edges:
+            self._upsert_edge(e)
+
+    def _upsert_edge(self, edge: EdgeUnion) -> None:
+        root_edges = self.graph.edges
+        self._record("upsert_edge", edge=edge)
+        loc = self.locator()
+        i = loc.root_edge(edge.edge_id)
+        if i is not None:
+            old = root_edges[i]
+            root_edges[i] = edge
+            self._undo(partial(self.upsert_edge, old))
+            if self.index is not None:
+                self.index.remove_edge(old)
+                self.index.add_edge(edge)
+            if self.validator is not None:
+                self.validator.remove_edge(old)
+                self.validator.add_edge(edge)
+            self._patched("replace", f"/edges/{i}", edge)
+            return
+        root_edges.append(edge)
+        loc.root_edge_added(len(root_edges) - 1, edge)
+        self._undo(partial(self._remove_edges, [(None, edge)]))
+        if self.index is not None:
+            self.index.add_edge(edge)
+        if self.validator is not None:
+            self.validator.add_edge(edge)
+        self._patched("add", f"/edges/{len(root_edges) - 1}", edge)
+
+    def attach_edge(self, host_id: str, edge: Any) -> bool:
+        """Append an edge to the node-owned edge list of `host_id`. Returns False if absent."""
+        host = self._node(host_id)
+        if host is None:
+            return False
+        self._admit([edge])
+        host.edges.append(edge)
+        self.locator().owned_edge_added(host_id, edge)
+        self._undo(partial(self._remove_edges, [(host_id, edge)]))
+        self._record("attach_edge", host_id=host_id, edge=edge)
+        if self.patch is not None:
+            self._patched("add", f"{self.pointer(host_id)}/edges/{len(host.edges) - 1}", edge, _OWNED_EDGE)
+        if self.index is not None:
+            self.index.add_edge(edge)
+        if self.validator is not None:
+            self.validator.add_edge(edge)
+        return True
+
+    def delete_edge(self, edge_id: str) -> List[Any]:
+        """
+        Remove every root edge with `edge_id`; if none, remove matches from node-owned
+        edge lists. Returns the removed edges (empty if the id was not found).
+        """
+        loc = self.locator()
+        owners = loc.owners_of(edge_id)
+        removed: List[Any] = []
+        held: List[Tuple[Optional[str], int, Any]] = []   # (holder, position, edge) for undo
+        if None in owners:
+            held = [(None, i, e) for i, e in enumerate(self.graph.edges) if e.edge_id == edge_id]
+            removed = [e for _, _, e in held]
+            self._patch_removals("", self.graph.edges, edge_id)
+            self.graph.edges = [e for e in self.graph.edges if e.edge_id != edge_id]
+            loc.root_edges_removed(edge_id)
+        else:
+            for owner in dict.fromkeys(owners):
+                n = loc.node(owner)
+                hits = [e for e in n.edges if e.edge_id == edge_id] if n is not None else []
+                if hits:
+                    held.extend((owner, i, e) for i, e in enumerate(n.edges) if e.edge_id == edge_id)
+                    if self.patch is not None:
+                        self._patch_removals(self.pointer(owner), n.edges, edge_id)
+                    n.edges = [e for e in n.edges if e.edge_id != edge_id]
+                    removed.extend(hits)
+                loc.owned_edges_removed(owner, edge_id)
+        if removed:
+            self._record("delete_edge", edge_id=edge_id)
+            self._undo(partial(self._restore_edges, held))
+        for e in removed:
+            if self.index is not None:
+                self.index.remove_edge(e)
+            if self.validator is not None:
+                self.validator.remove_edge(e)
+        self._admit((), removed)
+        return removed
+
+    def pointer(self, node_id: str) -> str:
+        """JSON Pointer of a node in the graph's JSON, e.g. "/nodes/2/nodes/0". KeyError if absent."""
+        steps = self.locator().path(node_id)
+        if steps is None:
+            raise KeyError(node_id)
+        return "".join(f"/nodes/{i}" for i in steps)
+
+    # ----------------------------- private --------------------------------
+
+    def _patched(self, op: str, path: str, value: BaseModel, adapter: TypeAdapter | None = None) -> None:
+        if self.patch is not None:
+            self.patch.append({"op": op, "path": path, "value": _view(value, adapter)})
+
+    def _patch_removals(self, owner: str, edges: List[Any], edge_id: str) -> None:
+        if self.patch is not None:
+            # highest index first, so earlier removals do not shift later paths
+            for i in reversed([i for i, e in enumerate(edges) if e.edge_id == edge_id]):
+                self.patch.append({"op": "remove", "path": f"{owner}/edges/{i}"})
+
+    def _edge_index(self) -> GraphIndex:
+        # the live index when the store keeps one, else one built for the call (O(N + E))
+        return self.index if self.index is not None else GraphIndex.from_graph(self.graph)
+
+    def _remove_edges(self, held: List[Tuple[Optional[str], Any]]) -> None:
+        """Remove these exact (holder, edge) pairs: holder None is Graph.edges, else a node id."""
+        if not held:
+            return
+        loc = self.locator()
+        by_holder: Dict[Optional[str], Dict[int, Any]] = {}
+        undo: List[Tuple[Optional[str], int, Any]] = []
+        for holder, e in held:
+            by_holder.setdefault(holder, {})[id(e)] = e
+        for holder, drop in by_holder.items():
+            edges = self.graph.edges if holder is None else loc.node(holder).edges
+            if holder is None:
+                hits = {loc.root_edge(e.edge_id) for e in drop.values()}
+                if None in hits or len(hits) < len(drop) or any(id(edges[i]) not in drop for i in hits):
+                    hits = {i for i, e in enumerate(edges) if id(e) in drop}   # duplicate edge ids
+            else:
+                hits = {i for i, e in enumerate(edges) if id(e) in drop}
+            owner = "" if holder is None else (self.pointer(holder) if self.patch is not None else None)
+            for i in sorted(hits, reverse=True):   # highest first: earlier paths stay valid
+                if self.patch is not None:
+                    self.patch.append({"op": "remove", "path": f"{owner}/edges/{i}"})
+                e = edges.pop(i)
+                undo.append((holder, i, e))
+                if holder is not None:
+                    loc.owned_edge_removed(holder, e)
+            if holder is None and hits:
+                loc.root_edges_shifted(min(hits), list(drop.values()))
+        self._undo(partial(self._restore_edges, undo))
+        removed = [e for _, e in held]
+        for e in removed:
+            if self.index is not None:
+                self.index.remove_edge(e)
+            if self.validator is not None:
+                self.validator.remove_edge(e)
+        self._admit((), removed)
+
+    # ---- undo (atomic) ----
+
+    def _undo(self, step: Callable[[], Any]) -> None:
+        if self.undo is not None:
+            self.undo.append(step)
+
+    def _rollback(self, journal_mark: int, patch_mark: int, edits_mark: int) -> None:
+        """Run the undo steps in reverse: unjournaled, unpatched, unchecked and never rejected as cycles."""
+        steps, self.undo = self.undo or [], None
+        journal, patch, acyclic, checked = self.journal, self.patch, self.acyclic, self.checked
+        self.journal = self.patch = None
+        self.acyclic = self.checked = False
+        try:
+            while steps:
+                steps.pop()()
+        finally:
+            self.journal, self.patch, self.acyclic, self.checked = journal, patch, acyclic, checked
+            self.edits = edits_mark
+            if journal is not None:
+                del journal[journal_mark:]
+            if patch is not None:
+                del patch[patch_mark:]
+
+    def _insert(self, parent_id: Optional[str], i: int, node: NodeUnion) -> None:
+        container = self.graph.nodes if parent_id is None else self._node(parent_id).nodes
+        container.insert(i, node)
+        loc = self.locator()
+        loc.place(container, i, parent_id)
+        loc.shift(container, i + 1)
+
+    def _restore_node(self, parent_id: Optional[str], i: int, node: NodeUnion) -> None:
+        """Undo delete_node: put `node` back at position `i` under `parent_id`."""
+        self._insert(parent_id, i, node)
+        if self.index is not None:
+            self.index.add_node(node, parent_id)
+        if self.validator is not None:
+            self.validator.add_node(node)
+        self._admit(_owned(node), (), _ids(node))
+
+    def _unmove(self, node_id: str, parent_id: Optional[str], i: int, parent: Optional[str]) -> None:
+        """Undo reparent: move the node back to position `i` under `parent_id`."""
+        node = self._detach(node_id)
+        if self.validator is not None:
+            self.validator.remove_node(node)
+        node.parent = parent
+        self._insert(parent_id, i, node)
+        if self.index is not None:
+            self.index.reparent(node_id, parent_id)
+        if self.validator is not None:
+            self.validator.add_node(node)
+
+    def _restore_edges(self, held: List[Tuple[Optional[str], int, Any]]) -> None:
+        """Undo an edge removal: put each (holder, position, edge) back, lowest position first."""
+        loc = self.locator()
+        first: Optional[int] = None
+        for holder, i, e in sorted(held, key=lambda h: h[1]):
+            if holder is None:
+                self.graph.edges.insert(i, e)
+                loc.root_edge_added(i, e)
+                first = i if first is None else min(first, i)
+            else:
+                self._node(holder).edges.insert(i, e)
+                loc.owned_edge_added(holder, e)
+        if first is not None:
+            loc.root_edges_shifted(first)
+        edges = [e for _, _, e in held]
+        for e in edges:
+            if self.index is not None:
+                self.index.add_edge(e)
+            if self.validator is not None:
+                self.validator.add_edge(e)
+        self._admit(edges)
+
+    def _admit(
+        self,
+        add_edges: Iterable[Any],
+        drop_edges: Iterable[Any] = (),
+        add_nodes: Iterable[str] = (),
+        drop_nodes: Iterable[str] = (),
+    ) -> None:
+        """
+        Swap nodes and dependency edges in the graph's topological order, all or nothing:
+        on CycleError it is left as it was. The order is built here when cycles are
+        rejected (acyclic); otherwise only one that is already maintained is updated.
+        """
+        topo = self.topo(build=self.acyclic)
+        if topo is None:
+            return
+        add = [e for e in add_edges if getattr(e, "kind", None) == "dependency"]
+        drop = [e for e in drop_edges if getattr(e, "kind", None) == "dependency"]
+        add_nodes = list(add_nodes)
+        for nid in add_nodes:
+            topo.add_node(nid)
+        for e in drop:
+            topo.remove_edge(e.from_node, e.to_node)
+        done = 0
+        try:
+            for e in add:
+                topo.add_edge(e.from_node, e.to_node, reject=self.acyclic)
+                done += 1
+        except CycleError as err:
+            err.edge_id = add[done].edge_id
+            for e in add[:done]:
+                topo.remove_edge(e.from_node, e.to_node)
+            for e in drop:
+                topo.add_edge(e.from_node, e.to_node, reject=False)
+            for nid in add_nodes:
+                topo.remove_node(nid)
+            raise
+        for nid in drop_nodes:
+            topo.remove_node(nid)
+
+    def _check_ids(self, node: NodeUnion, old: Optional[NodeUnion]) -> None:
+        """ValueError if `node`'s subtree reuses an id, within itself or held outside the subtree it replaces."""
+        if not self.checked:
+            return
+        replaced = set(_ids(old))
+        seen: set = set()
+        for nid in _ids(node):
+            if nid in seen or (nid not in replaced and self._node(nid) is not None):
+                raise ValueError(f"Duplicate node_id: {nid}")
+            seen.add(nid)
+
+    def _check_root_edge(self, edge: Any) -> None:
+        """ValueError if a root edge names an unknown node, or (contributes_to) metricIds its target goal lacks."""
+        if not self.checked:
+            return
+        missing = [nid for nid in dict.fromkeys((edge.from_node, edge.to_node)) if self._node(nid) is None]
+        if missing:
+            raise ValueError(f"Edge {edge.edge_id} references unknown node(s): {missing}")
+        if getattr(edge, "kind", None) == "contributes_to":
+            target = self._node(edge.to_node)
+            metrics = {m.metric_id for m in Graph._iter_metrics(target)} if getattr(target, "kind", None) == "goal" else set()
+            if metrics and not set(edge.metric_ids) <= metrics:
+                raise ValueError(
+                    f"Edge {edge.edge_id} has unknown metricIds on target {edge.to_node}: {sorted(set(edge.metric_ids) - metrics)}"
+                )
+
+    def _record(self, op: str, **args: Any) -> None:
+        self.edits += 1
+        if self.journal is not None:
+            self.journal.append({"op": op, **{k: _dump(v) for k, v in args.items()}})
+
+    def _place(self, node: NodeUnion, hit: Any) -> None:
+        """Put `node` in the slot `hit` of the node it replaces, else under node.parent or at the root."""
+        loc = self.locator()
+        if hit is not None:
+            parent_id, container, i = hit
+            loc.unplace(container, i)
+            container[i] = node
+            loc.place(container, i, parent_id)
+            return
+        container = self.graph.nodes if node.parent is None else self._node(node.parent).nodes
+        container.append(node)
+        loc.place(container, len(container) - 1, node.parent)
+
+    def _detach(self, node_id: str) -> Optional[NodeUnion]:
+        """Detach a node from its container, updating only the locator (not index, validator, order, journal or patch)."""
+        loc = self.locator()
+        hit = loc.slot(node_id)
+        if hit is None:
+            return None
+        _, container, i = hit
+        node = container[i]
+        loc.unplace(container, i)
+        del container[i]
+        loc.shift(container, i)
+        return node
+
+    def _node(self, node_id: str) -> Optional[NodeUnion]:
+        return self.locator().node(node_id)
+
+
+_OWNED_EDGE = TypeAdapter(EdgeBase)
+
+
+@dataclass
+class Cascade:
+    """What a cascading delete of `node` removes."""
+    node: NodeUnion
+    node_ids: List[str]                          # the node and its nested subtree, pre-order
+    owned: List[Any]                             # edges held by those nodes
+    incident: List[Tuple[Optional[str], Any]]    # (holder, edge) of edges held elsewhere that touch them;
+                                                 # holder None is Graph.edges, else the holding node id
+
+    @property
+    def edge_ids(self) -> List[str]:
+        return [e.edge_id for e in chain(self.owned, (e for _, e in self.incident))]
+
+
+def plan_cascade(graph: Graph, index: GraphIndex, node_id: str, locator: GraphLocator | None = None) -> Optional[Cascade]:
+    """
+    The nodes and edges a cascading delete of `node_id` would remove, without
+    touching the graph (the dry run). Incident edges come from the in/out edge
+    lists of `index`, a GraphIndex of this same graph, and their holders from
+    `locator` (built here if not given), so the cost is O(subtree + incident
+    edges) rather than a graph scan.
+    """
+    loc = locator if locator is not None else GraphLocator(graph)
+    node = loc.node(node_id)
+    if node is None:
+        return None
+    subtree = list(_subtree(node))
+    owned = [e for n in subtree for e in n.edges]
+    seen = {id(e) for e in owned}
+    incident: List[Tuple[Optional[str], Any]] = []
+    for n in subtree:
+        for e in chain(index.out_edges_of.get(n.node_id, ()), index.in_edges_of.get(n.node_id, ())):
+            if id(e) not in seen:
+                seen.add(id(e))
+                incident.append((_holder(loc, e), e))
+    return Cascade(node, [n.node_id for n in subtree], owned, incident)
+
+
+def _holder(loc: Any, e: Any) -> Optional[str]:
+    """Id of the node whose edge list holds `e`, or None for Graph.edges."""
+    owners = loc.owners_of(e.edge_id)
+    for owner in dict.fromkeys(o for o in owners if o is not None):
+        host = loc.node(owner)
+        if host is not None and any(x is e for x in host.edges):
+            return owner
+    return None
+
+
+def _subtree(node: Optional[NodeUnion]) -> Iterator[NodeUnion]:
+    stack = [node] if node is not None else []
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(reversed(n.nodes))
+
+
+def _ids(node: Optional[NodeUnion]) -> List[str]:
+    return [n.node_id for n in _subtree(node)]
+
+
+def _owned(node: Optional[NodeUnion]) -> List[Any]:
+    return [e for n in _subtree(node) for e in n.edges]
+
+
+def _view(value: BaseModel, adapter: TypeAdapter | None = None) -> Any:
+    """
+    A node/edge as the Graph response shows it: by declared field type, so node-owned
+    edges (typed EdgeBase) lose their subclass fields exactly as in GET /graphs/{id}.
+    """
+    if adapter is not None:
+        return adapter.dump_python(value, mode="json", by_alias=True)
+    return value.model_dump(mode="json", by_alias=True)
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # serialize_as_any keeps subclass fields of node-owned edges (typed EdgeBase)
+        return value.model_dump(mode="json", by_alias=True, serialize_as_any=True)
+    return value
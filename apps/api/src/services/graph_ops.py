@@ -1,22 +1,34 @@
 from __future__ import annotations
 
-from collections import Counter, deque
+from array import array
+from heapq import heappop, heappush
 from typing import List, Set, Dict, Tuple, Optional, Iterable, Any
 
 from src.schemas.enums import EdgeKind
+from src.services.graph_csr import Condensation, condense
 from src.services.graph_index import GraphIndex
+from src.services import graph_rollup_np
+from src.services.graph_rollup import RollupTable, rollup
+from src.services.graph_schedule import CriticalPathResult, critical_path
 
 class GraphOps:
     """
-    Stateless algorithms over a GraphIndex.
+    Algorithms over a GraphIndex (stateless apart from per-index-state caches).
+    Traversals run over the index's integer CSR view (GraphIndex.compact()) and
+    translate back to nodeIds only in their return values.
 
       - BFS/DFS for exploration
-      - Kahn's algorithm for topological sort (dependency DAGs)
+      - Iterative Tarjan SCC condensation for cycles + topological sort
       - Optional shortest/longest paths
+      - Memoized metric rollup over contributes_to edges
     """
 
     def __init__(self, index: GraphIndex):
         self.idx = index
+        self._condensed: Dict[str, Condensation] = {}
+        self._lags: Dict[Tuple[Optional[str], str], Tuple[Any, array]] = {}
+        # contrib kind -> (csr the table was computed for, table, table covers every node)
+        self._rolled: Dict[str, Tuple[Any, RollupTable, bool]] = {}
 
     def bfs(
         self,
@@ -30,54 +42,131 @@ class GraphOps:
         - direction: 'out' to follow outgoing edges, 'in' for incoming
         - kinds: restrict traversal to a subset of edge kinds (e.g., {'dependency'})
         - depth: limit traversal depth (0 => start only)
-        Complexity: O(N+E) for explored subgraph.
+        Complexity: O(N+E) for explored subgraph, over the int CSR view.
         """
         if start not in self.idx.id_to_node:
             return []
 
-        seen = {start}
-        q = deque([(start, 0)])
-        order: List[str] = []
-
-        step = (
-            (lambda n: self.idx.out_neighbors(n, kinds))
-            if direction == "out" else
-            (lambda n: self.idx.in_neighbors(n, kinds))
-        )
-
-        while q:
-            node, d = q.popleft()
-            order.append(node)
+        csr = self.idx.compact()
+        planes = csr.planes(kinds, direction)
+        s = csr.index_of[start]
+        seen = bytearray(csr.size)
+        seen[s] = 1
+        order: List[int] = [s]
+
+        head, level_end, d = 0, 1, 0
+        while head < len(order):
+            if head == level_end:
+                d += 1
+                level_end = len(order)
             if depth is not None and d >= depth:
-                continue
-            for nxt in step(node):
-                if nxt not in seen:
-                    seen.add(nxt)                    
-                    q.append((nxt, d + 1))
-        return order
+                break
+            u = order[head]
+            head += 1
+            for offsets, targets in planes:
+                for i in range(offsets[u], offsets[u + 1]):
+                    v = targets[i]
+                    if not seen[v]:
+                        seen[v] = 1
+                        order.append(v)
+        return csr.to_ids(order)
+
+    def condensation(self, dep_kind: str = EdgeKind.dependency.value) -> Condensation:
+        """
+        SCC condensation over edges of kind `dep_kind`, with components numbered in
+        topological order. One iterative O(N+E) pass, cached for the current index state.
+        """
+        csr = self.idx.compact()
+        cached = self._condensed.get(dep_kind)
+        if cached is not None and cached.csr is csr:
+            return cached
+        cond = condense(csr, csr.out_planes.get(dep_kind))
+        self._condensed[dep_kind] = cond
+        return cond
 
     def topological_order(self, dep_kind: str = EdgeKind.dependency.value) -> List[str]:
         """
-        Kahn's algorithm. Raises ValueError if cycles exist.
-        Only considers edges where kind == dep_kind (default: 'dependency').
+        Topological order of the `dep_kind` DAG, read off the condensation.
+        Raises ValueError if cycles exist.
         """
-        indeg = self.idx.in_degree(dep_kind)
-        zero = [n for n, deg in indeg.items() if deg == 0]
-        order: List[str] = []
+        cond = self.condensation(dep_kind)
+        if cond.has_cycles:
+            raise ValueError("dependency graph has cycles")
+        return cond.order()
 
-        while zero:
-            n = zero.pop()
-            order.append(n)
-            for m in self.idx.out_neighbors(n, {dep_kind}):
-                indeg[m] -= 1
-                if indeg[m] == 0:
-                    zero.append(m)
+    def critical_path(self, dep_kind: str = EdgeKind.dependency.value) -> CriticalPathResult:
+        """
+        Critical-path method (forward + backward pass) over `dep_kind` edges, honoring
+        FS/SS/FF/SF constraints, lag, date bounds and node time_bound durations.
+        Raises ValueError if the dependency graph has cycles. O(N+E).
+        """
+        return critical_path(self.idx, self.topological_order(dep_kind), dep_kind)
 
-        # any remaining incoming edges => cycle
-        if any(deg > 0 for deg in indeg.values()):
-            raise ValueError("dependency graph has cycles")
+    def reachable(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        dep_kind: str = EdgeKind.dependency.value,
+    ) -> List[bool]:
+        """
+        For each (a, b): does `a` reach `b` over `dep_kind` edges (is a upstream of b)?
+        Unknown nodeIds reach nothing. Answered from the index's reachability labels,
+        mostly in O(1) per pair; the labels live on the GraphIndex and survive edge
+        inserts (no CSR rebuild).
+        """
+        reach = self.idx.reachability(dep_kind, self._condensed.get(dep_kind))
+        nodes = self.idx.id_to_node
+        return [a in nodes and b in nodes and reach.reachable(a, b) for a, b in pairs]
 
-        return order
+    def rollup_metrics(
+        self,
+        target_goal: str,
+        contrib_kind: str = EdgeKind.contributes_to.value,
+    ) -> Dict[str, Any]:
+        """
+        Rolled-up metrics (metricId -> value) of `target_goal` over `contrib_kind` edges.
+        Only the goal's contributor sub-DAG is evaluated; results are memoized per
+        node for the current index state, so later calls reuse shared sub-DAGs.
+        Raises KeyError for an unknown goal, ValueError if its contributors form a cycle.
+        """
+        if target_goal not in self.idx.id_to_node:
+            raise KeyError(target_goal)
+        memo = self._rollup_memo(contrib_kind)
+        if target_goal not in memo:
+            cond = self.condensation(contrib_kind)
+            csr = cond.csr
+            upstream = [csr.index_of[n] for n in self.bfs(target_goal, {contrib_kind}, direction="in")]
+            if any(cond.cyclic[cond.comp_of[u]] for u in upstream):
+                raise ValueError("contributes_to graph has cycles")
+            upstream.sort(key=cond.comp_of.__getitem__)
+            rollup(self.idx, csr.to_ids(upstream), contrib_kind, memo)
+        return dict(memo[target_goal])
+
+    def rollup_all(
+        self,
+        contrib_kind: str = EdgeKind.contributes_to.value,
+        vectorized: bool | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Rolled-up metrics of every node in one O(N+E) pass in topological order of
+        `contrib_kind` edges. Raises ValueError if those edges form a cycle.
+        vectorized: evaluate with NumPy sparse reductions (default: when numpy is
+        installed); the result also seeds the rollup_metrics memo.
+        """
+        cond = self.condensation(contrib_kind)
+        if cond.has_cycles:
+            raise ValueError("contributes_to graph has cycles")
+        cached = self._rolled.get(contrib_kind)
+        if cached is not None and cached[0] is cond.csr and cached[2]:
+            memo = cached[1]
+        else:
+            if vectorized is None:
+                vectorized = graph_rollup_np.available()
+            if vectorized:
+                memo = graph_rollup_np.rollup_vectorized(self.idx, cond, contrib_kind)
+            else:
+                memo = rollup(self.idx, cond.order(), contrib_kind, self._rollup_memo(contrib_kind))
+            self._rolled[contrib_kind] = (cond.csr, memo, True)
+        return {nid: dict(memo[nid]) for nid in self.idx.id_to_node}
 
     def shortest_hops(
         self,
@@ -87,238 +176,177 @@ class GraphOps:
         direction: str = "out",
     ) -> List[str]:
         """
-        Unweighted shortest path (by hops) using BFS predecessor tracking.
-        Returns [] if no path.
+        Unweighted shortest path (by hops) using bidirectional BFS: level by level
+        from `src` over outgoing and from `dst` over incoming edges (swapped for
+        direction='in'), always growing the smaller frontier. Returns [] if no path.
         """
         if src not in self.idx.id_to_node or dst not in self.idx.id_to_node:
             return []
 
-        prev = {src: str(src)}
-        q = deque([src])
-        step = (
-            (lambda n: self.idx.out_neighbors(n, kinds))
-            if direction == "out" else
-            (lambda n: self.idx.in_neighbors(n, kinds))
+        csr = self.idx.compact()
+        s, t = csr.index_of[src], csr.index_of[dst]
+        if s == t:
+            return [src]
+        sides = (
+            (csr.planes(kinds, direction), array("i", [-1]) * csr.size, array("i", [-1]) * csr.size, [s]),
+            (csr.planes(kinds, _flip(direction)), array("i", [-1]) * csr.size, array("i", [-1]) * csr.size, [t]),
         )
-
-        while q:
-            u = q.popleft()
-            if u == dst:
+        for _planes, prev, dist, frontier in sides:
+            prev[frontier[0]] = frontier[0]
+            dist[frontier[0]] = 0
+
+        meet, best = -1, -1
+        while sides[0][3] and sides[1][3]:
+            k = 0 if len(sides[0][3]) <= len(sides[1][3]) else 1
+            planes, prev, dist, frontier = sides[k]
+            other_dist = sides[1 - k][2]
+            nxt: List[int] = []
+            for u in frontier:
+                du = dist[u] + 1
+                for offsets, targets in planes:
+                    for i in range(offsets[u], offsets[u + 1]):
+                        v = targets[i]
+                        if prev[v] >= 0:
+                            continue
+                        prev[v] = u
+                        dist[v] = du
+                        nxt.append(v)
+                        # finish the level, then keep the meet closest to the other end
+                        if other_dist[v] >= 0 and (meet < 0 or other_dist[v] < best):
+                            meet, best = v, other_dist[v]
+            if meet >= 0:
                 break
-            for v in step(u):
-                if v not in prev:
-                    prev[v] = u
-                    q.append(v)
-
-        if dst not in prev:
+            sides[k][3][:] = nxt
+        if meet < 0:
             return []
+        return csr.to_ids(_join(meet, sides[0][1], sides[1][1]))
 
-        # reconstruct
-        cur, path = dst, []
-        while cur is not None:
-            path.append(cur)
-            cur = prev[cur]
-        return list(reversed(path))
-
-
-    def detect_cycles(self, dep_kind: str = EdgeKind.dependency.value) -> List[List[str]]:
-        """
-        Find directed cycles over edges of kind `dep_kind` using Tarjan's SCC algorithm.
-        Returns a list of cycles, each as a list of nodeIds (SCCs with size>1 or self-loop).
-        Complexity: O(N+E). See Tarjan SCC / cycle↔SCC relationship. :contentReference[oaicite:1]{index=1}
-        """
-        # Build adjacency restricted to dep_kind
-        nodes = list(self.idx.id_to_node.keys())
-        adj: Dict[str, List[str]] = {n: list(self.idx.out_neighbors(n, {dep_kind})) for n in nodes}
-
-        index = 0
-        indices: Dict[str, int] = {}
-        lowlink: Dict[str, int] = {}
-        stack: List[str] = []
-        onstack: Set[str] = set()
-        sccs: List[List[str]] = []
-
-        def strongconnect(v: str) -> None:
-            nonlocal index
-            indices[v] = index
-            lowlink[v] = index
-            index += 1
-            stack.append(v)
-            onstack.add(v)
-
-            for w in adj.get(v, []):
-                if w not in indices:
-                    strongconnect(w)
-                    lowlink[v] = min(lowlink[v], lowlink[w])
-                elif w in onstack:
-                    lowlink[v] = min(lowlink[v], indices[w])
-
-            # Root of an SCC?
-            if lowlink[v] == indices[v]:
-                comp: List[str] = []
-                while True:
-                    w = stack.pop()
-                    onstack.remove(w)
-                    comp.append(w)
-                    if w == v:
-                        break
-                # SCC is a cycle if size>1 or (size==1 and self-loop exists)
-                if len(comp) > 1:
-                    sccs.append(comp)
-                else:
-                    u = comp[0]
-                    if u in adj.get(u, []):
-                        sccs.append([u])
-
-        for v in nodes:
-            if v not in indices:
-                strongconnect(v)
-        return sccs
-
-    def check_contrib_metrics(self) -> List[Dict[str, Any]]:
+    def shortest_path(
+        self,
+        src: str,
+        dst: str,
+        kinds: Set[str] | None = None,
+        direction: str = "out",
+    ) -> Tuple[List[str], float]:
         """
-        Validate that every `contributes_to` edge references metricIds that actually
-        exist on the *target* node's measurable metrics (per your schema rules).
-        Returns a list of issue dicts: {'message': str, 'path': ['edges', edgeId] }.
+        Minimum total `lag_hours` path (edges without lag weigh 0) using
+        bidirectional Dijkstra over the CSR view. Returns (path, cost), or ([], inf)
+        if no path. Raises ValueError if a traversed kind has negative lag.
         """
-        issues: List[Dict[str, Any]] = []
-        for (edge_id, kind, u, v, edge_obj) in self._iter_edges():
-            if kind != EdgeKind.contributes_to.value:
-                continue
-            metric_ids = self._extract_metric_ids(edge_obj)
-            if metric_ids is None:
-                # cannot validate if edge does not carry metricIds (skip silently)
+        if src not in self.idx.id_to_node or dst not in self.idx.id_to_node:
+            return [], float("inf")
+
+        csr = self.idx.compact()
+        s, t = csr.index_of[src], csr.index_of[dst]
+        if s == t:
+            return [src], 0.0
+        kinds_list = list(kinds) if kinds else list(csr.out_planes)
+        inf = float("inf")
+        sides = []
+        for d, root in ((direction, s), (_flip(direction), t)):
+            source = csr.out_planes if d == "out" else csr.in_planes
+            weighted = [(source[kind], self._lag_weights(kind, d)) for kind in kinds_list if kind in source]
+            dist = array("d", [inf]) * csr.size
+            prev = array("i", [-1]) * csr.size
+            dist[root] = 0.0
+            prev[root] = root
+            sides.append((weighted, dist, prev, [(0.0, root)]))
+
+        mu, meet = inf, -1
+        heap_f, heap_b = sides[0][3], sides[1][3]
+        while heap_f and heap_b and heap_f[0][0] + heap_b[0][0] < mu:
+            k = 0 if heap_f[0][0] <= heap_b[0][0] else 1
+            weighted, dist, prev, heap = sides[k]
+            other = sides[1 - k][1]
+            d, u = heappop(heap)
+            if d > dist[u]:
                 continue
-            target_metric_ids = self._metric_ids_on_node(v)
-            missing = [m for m in metric_ids if m not in target_metric_ids]
-            if missing:
-                msg = f"Edge {edge_id or f'{u}->{v}'} references unknown metricIds on target {v}: {missing}"
-                issues.append({"message": msg, "path": ["edges", str(edge_id) if edge_id else f"{u}->{v}"]})
-        return issues
-
-    def check_node_id_duplicates(self) -> List[Dict[str, Any]]:
-        """
-        Report duplicate nodeIds if the underlying index kept a raw list/multiset.
-        If only a dict of nodes is available (id_to_node), duplicates cannot exist
-        at index-time and we return [].
-        """
-        # Try to use any raw id collection preserved by the index
-        raw_ids: Optional[List[str]] = None
-        if hasattr(self.idx, "raw_node_ids"):
-            raw_ids = list(getattr(self.idx, "raw_node_ids"))
-        elif hasattr(self.idx, "nodes"):
-            try:
-                # handle Pydantic or dict-shaped nodes
-                raw_ids = []
-                for n in getattr(self.idx, "nodes"):
-                    nid = getattr(n, "node_id", None) or getattr(n, "nodeId", None)
-                    if nid is None and isinstance(n, dict):
-                        nid = n.get("nodeId") or n.get("node_id")
-                    if nid is not None:
-                        raw_ids.append(str(nid))
-            except Exception:
-                raw_ids = None
-
-        if not raw_ids:
-           return []  # cannot prove duplicates from a dict-backed view
-
-        
-        dupes = [nid for nid, cnt in Counter(raw_ids).items() if cnt > 1]
-        return [{"message": f"Duplicate node_id: {nid}", "path": ["nodes", nid]} for nid in dupes]
+            for (offsets, targets), weights in weighted:
+                for i in range(offsets[u], offsets[u + 1]):
+                    v = targets[i]
+                    nd = d + weights[i]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        prev[v] = u
+                        heappush(heap, (nd, v))
+                    if nd + other[v] < mu:
+                        mu, meet = nd + other[v], v
+        if meet < 0:
+            return [], inf
+        # mu only improves on a strict relaxation, so both prev chains through `meet` cost <= mu
+        return csr.to_ids(_join(meet, sides[0][2], sides[1][2])), mu
 
-    def check_edge_node_refs(self) -> List[Dict[str, Any]]:
+    def detect_cycles(self, dep_kind: str = EdgeKind.dependency.value) -> List[List[str]]:
         """
-        Verify that every edge's from_node/to_node exist among known nodeIds.
-        Returns issue dicts: {'message': str, 'path': ['edges', edgeId]}.
+        Find directed cycles over edges of kind `dep_kind` using (iterative) Tarjan SCC.
+        Returns a list of cycles, each as a list of nodeIds (SCCs with size>1 or self-loop).
+        Complexity: O(N+E); safe for arbitrarily deep dependency chains.
         """
-        issues: List[Dict[str, Any]] = []
-        known = set(self.idx.id_to_node.keys())
-        for (edge_id, kind, u, v, _edge) in self._iter_edges():
-            missing = [x for x in (u, v) if x not in known]
-            if missing:
-                msg = f"Edge {edge_id or f'{u}->{v}'} references unknown node(s): {missing}"
-                issues.append({"message": msg, "path": ["edges", str(edge_id) if edge_id else f"{u}->{v}"]})
-        return issues
+        return self.condensation(dep_kind).cycles()
 
   # ----------------------------- private --------------------------------
-    def _iter_edges(self) -> Iterable[Tuple[Optional[str], str, str, str, Any]]:
-        """
-        Yield (edge_id, kind, from, to, raw_edge_obj).
-        - If GraphIndex exposes `edges` (list/iterable), we read from it.
-        - Otherwise, we synthesize edges from neighbor lists per kind (edge_id=None).
+    def _lag_weights(self, kind: Optional[str], direction: str) -> array:
         """
-        # Prefer an explicit edge collection if available
-        if hasattr(self.idx, "edges"):
-            edges = getattr(self.idx, "edges")
-            for e in edges:
-                # Handle Pydantic objects or dicts
-                edge_id = getattr(e, "edge_id", None) or getattr(e, "edgeId", None)
-                kind = getattr(e, "kind", None) or (e.get("kind") if isinstance(e, dict) else None)
-                u = getattr(e, "from_node", None) or getattr(e, "fromNode", None)
-                v = getattr(e, "to_node", None) or getattr(e, "toNode", None)
-                if isinstance(e, dict):
-                    u = u or e.get("fromNode") or e.get("from_node")
-                    v = v or e.get("toNode") or e.get("to_node")
-                    edge_id = edge_id or e.get("edgeId") or e.get("edge_id")
-                if kind and u and v:
-                    yield (edge_id, kind, str(u), str(v), e)
-            return
-
-      # Fallback: synthesize edges from neighbor lists (no edge_id available)
-      # This allows referential checks; metric validation may be skipped.
-        all_kinds = {k.value for k in EdgeKind}
-        for kind in all_kinds:
-            for u in self.idx.id_to_node.keys():
-                for v in self.idx.out_neighbors(u, {kind}):
-                    yield (None, kind, u, v, None)
-
-    def _metric_ids_on_node(self, node_id: str) -> Set[str]:
+        lag_hours aligned with the `kind` CSR plane for `direction` (parallel edges
+        take the smallest lag), built once per index state.
         """
-        Extract measurable.metricIds for a target node (typically a 'goal').
-        Supports Pydantic objects or dicts and both snake/camel case.
-        """
-        node = self.idx.id_to_node.get(node_id)
-        if node is None:
-            return set()
-        # Try attribute forms
-        payload = getattr(node, "smarter", None)
-        # nested 'smarter.smarter' vs flat
-        inner = getattr(payload, "smarter", None) if payload is not None else None
-        measurable = None
-        if inner is not None:
-            measurable = getattr(inner, "measurable", None)
-        elif payload is not None:
-            measurable = getattr(payload, "measurable", None)
-        # try dict forms
-        if measurable is None:
-            if isinstance(node, dict):
-                payload = node.get("smarter") or {}
-                inner = payload.get("smarter") if isinstance(payload, dict) else None
-                if inner and isinstance(inner, dict):
-                    measurable = inner.get("measurable")
-                else:
-                    measurable = payload.get("measurable")
-        if not measurable:
-            return set()
-        ids: Set[str] = set()
-        for m in measurable:
-            mid = getattr(m, "metric_id", None) or getattr(m, "metricId", None)
-            if mid is None and isinstance(m, dict):
-                mid = m.get("metricId") or m.get("metric_id")
-            if mid is not None:
-                ids.add(str(mid))
-        return ids
-
-    def _extract_metric_ids(self, edge_obj: Any) -> Optional[List[str]]:
-        """
-        Robustly read metricIds from a contributes_to edge object (if available).
-        Returns None if not present or if working from synthesized edges.
-        """
-        if edge_obj is None:
-            return None
-        mids = getattr(edge_obj, "metric_ids", None) or getattr(edge_obj, "metricIds", None)
-        if mids is None and isinstance(edge_obj, dict):
-            mids = edge_obj.get("metricIds") or edge_obj.get("metric_ids")
-        if not mids:
-            return None
-        return [str(x) for x in mids]
\ No newline at end of file
+        csr = self.idx.compact()
+        cached = self._lags.get((kind, direction))
+        if cached is not None and cached[0] is csr:
+            return cached[1]
+        # mapped snapshots (graph_snapshot.SnapshotIndex) carry these precomputed
+        lag_plane = getattr(self.idx, "lag_plane", None)
+        stored = lag_plane(kind, direction) if lag_plane is not None else None
+        if stored is not None:
+            self._lags[(kind, direction)] = (csr, stored)
+            return stored
+        outgoing = direction == "out"
+        offsets, targets = (csr.out_planes if outgoing else csr.in_planes)[kind]
+        edges_of = self.idx.out_edges_of if outgoing else self.idx.in_edges_of
+        ids = csr.ids
+        weights = array("d", bytes(8 * len(targets)))
+        for u in range(csr.size):
+            lo, hi = offsets[u], offsets[u + 1]
+            if lo == hi:
+                continue
+            best: Dict[str, float] = {}
+            for e in edges_of.get(ids[u], ()):
+                if getattr(e, "kind", None) != kind:
+                    continue
+                lag = getattr(e, "lag_hours", 0) or 0
+                if lag < 0:
+                    raise ValueError(f"Edge {e.edge_id} has negative lag_hours; weighted paths need lag >= 0")
+                other = e.to_node if outgoing else e.from_node
+                if lag < best.get(other, float("inf")):
+                    best[other] = lag
+            for i in range(lo, hi):
+                weights[i] = best[ids[targets[i]]]
+        self._lags[(kind, direction)] = (csr, weights)
+        return weights
+
+    def _rollup_memo(self, contrib_kind: str) -> RollupTable:
+        """Per-node rollup results, valid for the current index state only."""
+        csr = self.idx.compact()
+        cached = self._rolled.get(contrib_kind)
+        if cached is None or cached[0] is not csr:
+            cached = self._rolled[contrib_kind] = (csr, {}, False)
+        return cached[1]
+
+
+def _flip(direction: str) -> str:
+    return "in" if direction == "out" else "out"
+
+
+def _join(meet: int, prev_fwd: array, prev_bwd: array) -> List[int]:
+    """Stitch the forward predecessor chain to `meet` and the backward one from it."""
+    path = [meet]
+    u = meet
+    while prev_fwd[u] != u:
+        u = prev_fwd[u]
+        path.append(u)
+    path.reverse()
+    u = meet
+    while prev_bwd[u] != u:
+        u = prev_bwd[u]
+        path.append(u)
+    return path
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.services.graph_csr import Condensation, Plane
+
+# Inserted edges are answered through an overlay; past this many the index asks to be rebuilt
+MAX_OVERLAY = 64
+# Landmark components carrying 2-hop labels (one bit each)
+LANDMARKS = 128
+
+
+class ReachabilityIndex:
+    """
+    "Does A reach B?" over one edge kind, built on the SCC condensation.
+
+    Components are numbered topologically, so A can only reach B if comp(A) <= comp(B).
+    On top of that every component carries interval labels from two DFS post-order
+    traversals of the condensation DAG (children visited in opposite orders):
+
+      - label [low, post], low = min post over everything reachable: if B's label is
+        not nested in A's for either traversal, A cannot reach B (exact negative cut);
+      - tree interval [tree_low, post] of the first traversal's spanning forest: if
+        B's post falls inside it, A reaches B (exact positive cut).
+
+    and 2-hop labels over a fixed set of high-degree landmark components, as bit masks:
+    `down[c]` = landmarks c reaches, `up[c]` = landmarks reaching c. A reaches B if
+    down[A] & up[B] (positive cut); it cannot if up[A] is not a subset of up[B] or
+    down[B] is not a subset of down[A] (negative cuts).
+
+    Queries the labels cannot settle fall back to a DFS over the condensation that
+    prunes every component the labels rule out. Build is O(N + E), memory O(N).
+
+    Edge inserts after the build are kept in a small overlay (see add_edge) so the
+    index stays exact without a rebuild; deletes require a rebuild.
+    """
+
+    __slots__ = ("comp_of", "dag_offsets", "dag_targets", "post", "low", "tree_low", "down", "up", "overlay")
+
+    def __init__(self, cond: Condensation, plane: Optional[Plane]):
+        """`plane` is the CSR plane `cond` was computed from."""
+        csr = cond.csr
+        self.comp_of: Dict[str, int] = {nid: cond.comp_of[i] for i, nid in enumerate(csr.ids)}
+        self.dag_offsets, self.dag_targets = _component_dag(cond, plane)
+        n = len(cond.members)
+        first = _label(n, self.dag_offsets, self.dag_targets, reverse=False)
+        second = _label(n, self.dag_offsets, self.dag_targets, reverse=True)
+        self.post: Tuple[array, array] = (first[0], second[0])
+        self.low: Tuple[array, array] = (first[1], second[1])
+        self.tree_low: array = first[2]
+        self.down, self.up = _landmark_masks(n, self.dag_offsets, self.dag_targets)
+        self.overlay: List[Tuple[str, str]] = []
+
+    @property
+    def stale(self) -> bool:
+        """True once the overlay is large enough that a rebuild is cheaper than using it."""
+        return len(self.overlay) > MAX_OVERLAY
+
+    def add_edge(self, u: str, v: str) -> None:
+        """Record an inserted edge u -> v; a no-op if u already reaches v."""
+        if not self.reachable(u, v):
+            self.overlay.append((u, v))
+
+    def reachable(self, a: str, b: str) -> bool:
+        """True if `a` reaches `b` over zero or more edges (every node reaches itself)."""
+        if self._base(a, b):
+            return True
+        if not self.overlay:
+            return False
+        # stitch base paths together through inserted edges
+        used = bytearray(len(self.overlay))
+        frontier = [a]
+        while frontier:
+            f = frontier.pop()
+            for i, (x, y) in enumerate(self.overlay):
+                if not used[i] and self._base(f, x):
+                    used[i] = 1
+                    if self._base(y, b):
+                        return True
+                    frontier.append(y)
+        return False
+
+    def reachable_many(self, pairs: Iterable[Tuple[str, str]]) -> List[bool]:
+        return [self.reachable(a, b) for a, b in pairs]
+
+    # ----------------------------- private --------------------------------
+
+    def _base(self, a: str, b: str) -> bool:
+        """Reachability in the graph as built (no overlay)."""
+        if a == b:
+            return True
+        ca, cb = self.comp_of.get(a), self.comp_of.get(b)
+        if ca is None or cb is None:
+            return False
+        if ca == cb:
+            return True
+        if ca > cb or not self._may_reach(ca, cb):
+            return False
+        if self._must_reach(ca, cb):
+            return True
+
+        # labels are inconclusive: DFS over components, pruning what the labels rule out
+        offsets, targets = self.dag_offsets, self.dag_targets
+        seen = {ca}
+        stack = [ca]
+        while stack:
+            c = stack.pop()
+            for i in range(offsets[c], offsets[c + 1]):
+                w = targets[i]
+                if w == cb:
+                    return True
+                if w in seen or w > cb or not self._may_reach(w, cb):
+                    continue
+                if self._must_reach(w, cb):
+                    return True
+                seen.add(w)
+                stack.append(w)
+        return False
+
+    def _may_reach(self, c: int, d: int) -> bool:
+        """False only if component c provably cannot reach d."""
+        up_c, down_d = self.up[c], self.down[d]
+        if up_c & ~self.up[d] or down_d & ~self.down[c]:
+            return False
+        for post, low in zip(self.post, self.low):
+            if not (low[c] <= low[d] and post[d] <= post[c]):
+                return False
+        return True
+
+    def _must_reach(self, c: int, d: int) -> bool:
+        """True only if component c provably reaches d."""
+        if self.down[c] & self.up[d]:
+            return True
+        return self.tree_low[c] <= self.post[0][d] <= self.post[0][c]
+
+
+def _component_dag(cond: Condensation, plane: Optional[Plane]) -> Tuple[array, array]:
+    """CSR of the condensation DAG (component -> successor components, deduplicated)."""
+    offsets, targets = array("i", [0]), array("i")
+    comp_of = cond.comp_of
+    for c, members in enumerate(cond.members):
+        succ = set()
+        if plane is not None:
+            node_offsets, node_targets = plane
+            for u in members:
+                for i in range(node_offsets[u], node_offsets[u + 1]):
+                    w = comp_of[node_targets[i]]
+                    if w != c:
+                        succ.add(w)
+        targets.extend(sorted(succ))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def _label(n: int, offsets: array, targets: array, reverse: bool) -> Tuple[array, array, array]:
+    """
+    Iterative DFS over the component DAG from every root, in post-order.
+    Returns (post, low, tree_low) per component.
+    """
+    post = array("i", [-1]) * n
+    low = array("i", [0]) * n
+    tree_low = array("i", [0]) * n
+    indegree = array("i", [0]) * n
+    for w in targets:
+        indegree[w] += 1
+    roots = [c for c in range(n) if indegree[c] == 0]
+    if reverse:
+        roots.reverse()
+
+    rank = 0
+    pos = array("i", [0]) * n
+    for c in range(n):
+        pos[c] = offsets[c + 1] - 1 if reverse else offsets[c]
+    started = bytearray(n)
+    for root in roots:
+        started[root] = 1
+        tree_low[root] = n   # placeholder until the first descendant finishes
+        stack = [root]
+        while stack:
+            c = stack[-1]
+            nxt = -1
+            if reverse:
+                while pos[c] >= offsets[c]:
+                    w = targets[pos[c]]
+                    pos[c] -= 1
+                    if not started[w]:
+                        nxt = w
+                        break
+            else:
+                while pos[c] < offsets[c + 1]:
+                    w = targets[pos[c]]
+                    pos[c] += 1
+                    if not started[w]:
+                        nxt = w
+                        break
+            if nxt >= 0:
+                started[nxt] = 1
+                tree_low[nxt] = n
+                stack.append(nxt)
+                continue
+
+            stack.pop()
+            post[c] = rank
+            lo = rank
+            for i in range(offsets[c], offsets[c + 1]):
+                if low[targets[i]] < lo:
+                    lo = low[targets[i]]
+            low[c] = lo
+            if tree_low[c] > rank:
+                tree_low[c] = rank
+            if stack and tree_low[c] < tree_low[stack[-1]]:
+                tree_low[stack[-1]] = tree_low[c]
+            rank += 1
+    return post, low, tree_low
+
+
+def _landmark_masks(n: int, offsets: array, targets: array) -> Tuple[List[int], List[int]]:
+    """
+    Bit masks of the LANDMARKS highest-degree components: down[c] (landmarks c
+    reaches) and up[c] (landmarks that reach c), one O(E) sweep each over the
+    topologically numbered component DAG.
+    """
+    degree = [offsets[c + 1] - offsets[c] for c in range(n)]
+    indegree = [0] * n
+    for w in targets:
+        indegree[w] += 1
+    ranked = sorted(range(n), key=lambda c: (degree[c] + 1) * (indegree[c] + 1), reverse=True)
+    down = [0] * n
+    up = [0] * n
+    for bit, c in enumerate(ranked[:LANDMARKS]):
+        down[c] = up[c] = 1 << bit
+
+    for c in range(n - 1, -1, -1):
+        mask = down[c]
+        for i in range(offsets[c], offsets[c + 1]):
+            mask |= down[targets[i]]
+        down[c] = mask
+    for c in range(n):
+        mask = up[c]
+        if mask:
+            for i in range(offsets[c], offsets[c + 1]):
+                up[targets[i]] |= mask
+    return down, up
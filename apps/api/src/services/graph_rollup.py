@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.graph_index import GraphIndex
+
+# nodeId -> metricId -> rolled-up value
+RollupTable = Dict[str, Dict[str, Any]]
+
+AGGREGATIONS = ("weighted_sum", "avg", "min", "max", "boolean_or")
+
+
+def rollup(idx: GraphIndex, order: Iterable[str], contrib_kind: str, memo: RollupTable) -> RollupTable:
+    """
+    Roll metrics up `contrib_kind` edges for every node of `order`, which must list
+    contributors before the goals they contribute to. Results are written into
+    `memo`; nodes already present there are not re-evaluated, so shared sub-DAGs
+    are computed once and a full pass costs O(N + E).
+
+    For a node v and one of its metrics m:
+      - every incoming edge u -> v that names m in `metric_ids` (or names nothing,
+        meaning "every metric v measures") contributes u's rolled-up value of m,
+        if u has one;
+      - contributions are combined with the edge `aggregation` and `weight`
+        (edges into the same metric are expected to agree; the first one wins);
+      - with no contributions, the node's own Metric.value stands.
+    """
+    nodes = idx.id_to_node
+    for v in order:
+        if v in memo:
+            continue
+        own = _own_values(nodes.get(v))
+        inputs: Dict[str, Tuple[str, List[Tuple[float, Any]]]] = {}
+        for e in idx.in_edges_of.get(v, ()):
+            if getattr(e, "kind", None) != contrib_kind:
+                continue
+            source = memo.get(e.from_node)
+            if not source:
+                continue
+            for m in e.metric_ids or own:
+                if m in source:
+                    agg, values = inputs.setdefault(m, (e.aggregation, []))
+                    values.append((e.weight, source[m]))
+
+        rolled = dict(own)
+        for m, (agg, values) in inputs.items():
+            value = aggregate(agg, values)
+            if value is not None:
+                rolled[m] = value
+        memo[v] = rolled
+    return memo
+
+
+def aggregate(aggregation: str, values: List[Tuple[float, Any]]) -> Optional[Any]:
+    """
+    Combine (weight, value) contributions. Numeric aggregations skip values that
+    are not numbers; returns None when nothing usable was contributed.
+    """
+    if aggregation == "boolean_or":
+        return any(_truthy(x) for _w, x in values)
+
+    pairs = [(w, x) for w, x in ((w, _number(x)) for w, x in values) if x is not None]
+    if not pairs:
+        return None
+    if aggregation == "weighted_sum":
+        return sum(w * x for w, x in pairs)
+    if aggregation == "avg":
+        total = sum(w for w, _x in pairs)
+        if total > 0:
+            return sum(w * x for w, x in pairs) / total
+        return sum(x for _w, x in pairs) / len(pairs)
+    if aggregation == "min":
+        return min(x for _w, x in pairs)
+    if aggregation == "max":
+        return max(x for _w, x in pairs)
+    raise ValueError(f"Unknown aggregation: {aggregation}")
+
+
+def _own_values(node: Any) -> Dict[str, Any]:
+    payload = getattr(getattr(node, "smarter", None), "smarter", None)
+    return {m.metric_id: m.value for m in getattr(payload, "measurable", None) or []}
+
+
+def _number(x: Any) -> Optional[float]:
+    if isinstance(x, (int, float)):
+        return x
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _truthy(x: Any) -> bool:
+    if isinstance(x, str):
+        return x.strip().lower() in ("true", "yes", "y", "1")
+    return bool(x)
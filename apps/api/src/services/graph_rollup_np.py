@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+try:  # optional: pip install numpy (poetry extra "fast")
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from src.services.graph_csr import Condensation
+from src.services.graph_index import GraphIndex
+from src.services.graph_rollup import AGGREGATIONS, RollupTable, _number, _own_values, _truthy
+
+_WEIGHTED_SUM, _AVG, _MIN, _MAX, _BOOLEAN_OR = range(len(AGGREGATIONS))
+_CODE = {name: code for code, name in enumerate(AGGREGATIONS)}
+
+# per-node outcome of a metric: own value kept, numeric aggregate, boolean_or
+_OWN, _NUMERIC, _BOOL = 0, 1, 2
+
+
+def available() -> bool:
+    return np is not None
+
+
+@dataclass(slots=True)
+class MetricPlane:
+    """
+    One metric compiled to arrays over the interned node ids: the node's own
+    value (as number and truthiness) plus the contributing edges as a sparse
+    COO weight matrix (src row, tgt column, weight), sorted by target level.
+    """
+    has: Any                  # bool[n]: node has a value for the metric
+    num: Any                  # float[n]: numeric value (NaN when not a number)
+    truth: Any                # bool[n]: truthiness of the value
+    src: Any                  # int[e]
+    tgt: Any                  # int[e]
+    weight: Any               # float[e]
+    agg: Any                  # int[e]: aggregation code of the edge
+    level_bounds: List[int] = field(default_factory=list)   # edge slice per target level
+
+
+def rollup_vectorized(idx: GraphIndex, cond: Condensation, contrib_kind: str) -> RollupTable:
+    """
+    Same results as graph_rollup.rollup over every node (numeric aggregates come
+    back as floats), evaluated with NumPy. Metrics are independent, so each metric
+    is one sparse matrix; targets are processed level by level (level = longest
+    contributor chain below the node), each level in a handful of vectorized
+    reductions. Requires numpy and an acyclic `cond`.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+    if cond.has_cycles:
+        raise ValueError("contributes_to graph has cycles")
+
+    csr = cond.csr
+    n = csr.size
+    level = _levels(cond, csr.in_planes.get(contrib_kind))
+    own = [_own_values(idx.id_to_node.get(nid)) for nid in csr.ids]
+    planes = _compile(idx, csr.ids, csr.index_of, own, level, contrib_kind)
+
+    table: RollupTable = {nid: dict(values) for nid, values in zip(csr.ids[: csr.n_nodes], own)}
+    for m, plane in planes.items():
+        rolled = np.full(n, _OWN, dtype=np.int8)
+        _evaluate(plane, rolled)
+        nodes = np.flatnonzero(rolled[: csr.n_nodes] != _OWN)
+        for u, kind, value, truth in zip(
+            nodes.tolist(), rolled[nodes].tolist(), plane.num[nodes].tolist(), plane.truth[nodes].tolist()
+        ):
+            table[csr.ids[u]][m] = truth if kind == _BOOL else value
+    return table
+
+
+def _levels(cond: Condensation, in_plane) -> List[int]:
+    """Longest-path depth of every interned id over the (acyclic) plane."""
+    level = [0] * cond.csr.size
+    if in_plane is None:
+        return level
+    offsets, sources = in_plane
+    for comp in cond.members:
+        v = comp[0]
+        deepest = -1
+        for i in range(offsets[v], offsets[v + 1]):
+            d = level[sources[i]]
+            if d > deepest:
+                deepest = d
+        level[v] = deepest + 1
+    return level
+
+
+def _compile(idx, ids, index_of, own, level, contrib_kind) -> Dict[str, MetricPlane]:
+    """
+    Read every edge and metric once: edges go to shared columns, each metric keeps
+    only the numbers of the edges that carry it and gathers its COO slice from them.
+    """
+    n = len(ids)
+    e_src: List[int] = []
+    e_tgt: List[int] = []
+    e_weight: List[float] = []
+    e_agg: List[int] = []
+    carried: Dict[str, List[int]] = {}
+    code_of = _CODE
+    for v, nid in enumerate(ids):
+        for e in idx.in_edges_of.get(nid, ()):
+            if getattr(e, "kind", None) != contrib_kind:
+                continue
+            k = len(e_src)
+            e_src.append(index_of[e.from_node])
+            e_tgt.append(v)
+            e_weight.append(e.weight)
+            e_agg.append(code_of[e.aggregation])
+            for m in e.metric_ids or own[v]:
+                edges = carried.get(m)
+                if edges is None:
+                    edges = carried[m] = []
+                edges.append(k)
+
+    src = np.asarray(e_src, dtype=np.int64)
+    tgt = np.asarray(e_tgt, dtype=np.int64)
+    weight = np.asarray(e_weight, dtype=np.float64)
+    agg = np.asarray(e_agg, dtype=np.int8)
+    lvl = np.asarray(level, dtype=np.int64)[tgt] if len(tgt) else np.zeros(0, dtype=np.int64)
+
+    planes: Dict[str, MetricPlane] = {}
+
+    def plane(m: str) -> MetricPlane:
+        p = planes.get(m)
+        if p is None:
+            p = planes[m] = MetricPlane(
+                has=np.zeros(n, dtype=bool), num=np.full(n, np.nan), truth=np.zeros(n, dtype=bool),
+                src=src[:0], tgt=tgt[:0], weight=weight[:0], agg=agg[:0], level_bounds=[0, 0],
+            )
+        return p
+
+    for v, values in enumerate(own):
+        for m, x in values.items():
+            p = plane(m)
+            p.has[v] = True
+            p.truth[v] = _truthy(x)
+            x = _number(x)
+            if x is not None:
+                p.num[v] = x
+
+    for m, edges in carried.items():
+        sel = np.asarray(edges, dtype=np.int64)
+        # stable sort keeps in-edge order inside a level ("first edge wins")
+        sel = sel[np.argsort(lvl[sel], kind="stable")]
+        bounds = np.flatnonzero(np.diff(lvl[sel])) + 1
+        p = plane(m)
+        p.src, p.tgt, p.weight, p.agg = src[sel], tgt[sel], weight[sel], agg[sel]
+        p.level_bounds = [0, *bounds.tolist(), len(sel)]
+    return planes
+
+
+def _evaluate(p: MetricPlane, rolled) -> None:
+    """
+    Level-by-level evaluation; every array below is sized by the level's edges or
+    targets (never by N), so deep chains stay O(N + E) overall.
+    """
+    bounds = p.level_bounds
+    for lo, hi in zip(bounds, bounds[1:]):
+        if lo == hi:
+            continue
+        src, tgt = p.src[lo:hi], p.tgt[lo:hi]
+        live = p.has[src]
+        if not live.any():
+            continue
+        src, tgt = src[live], tgt[live]
+        w, agg = p.weight[lo:hi][live], p.agg[lo:hi][live]
+
+        # local target numbering; each target uses the aggregation of its first live edge
+        targets, first, t = np.unique(tgt, return_index=True, return_inverse=True)
+        k = len(targets)
+        code = agg[first]
+        edge_code = code[t]
+
+        is_bool = edge_code == _BOOLEAN_OR
+        if is_bool.any():
+            hit = np.zeros(k, dtype=bool)
+            np.logical_or.at(hit, t[is_bool], p.truth[src[is_bool]])
+            local = np.flatnonzero(code == _BOOLEAN_OR)
+            done = targets[local]
+            p.has[done] = True
+            p.truth[done] = hit[local]
+            p.num[done] = hit[local]
+            rolled[done] = _BOOL
+
+        x = p.num[src]
+        numeric = ~is_bool & ~np.isnan(x)
+        if not numeric.any():
+            continue
+        t, x, w, edge_code = t[numeric], x[numeric], w[numeric], edge_code[numeric]
+        count = np.bincount(t, minlength=k)
+        value = np.full(k, np.nan)
+        for c in np.unique(edge_code).tolist():
+            sel = edge_code == c
+            tc, xc, wc = t[sel], x[sel], w[sel]
+            if c == _WEIGHTED_SUM:
+                acc = np.bincount(tc, weights=wc * xc, minlength=k)
+            elif c == _AVG:
+                sw = np.bincount(tc, weights=wc, minlength=k)
+                swx = np.bincount(tc, weights=wc * xc, minlength=k)
+                sx = np.bincount(tc, weights=xc, minlength=k)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    acc = np.where(sw > 0, swx / sw, sx / np.maximum(count, 1))
+            elif c == _MIN:
+                acc = np.full(k, np.inf)
+                np.minimum.at(acc, tc, xc)
+            else:  # _MAX
+                acc = np.full(k, -np.inf)
+                np.maximum.at(acc, tc, xc)
+            mask = code == c
+            value[mask] = acc[mask]
+        local = np.flatnonzero(count)
+        done = targets[local]
+        p.has[done] = True
+        p.num[done] = value[local]
+        p.truth[done] = value[local] != 0
+        rolled[done] = _NUMERIC
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from src.services.graph_index import GraphIndex
+
+_EPS = 1e-9
+
+
+@dataclass(slots=True)
+class ScheduledNode:
+    """CPM times for one node, in hours from the schedule origin."""
+    node_id: str
+    duration_hours: float
+    es: float
+    ef: float
+    ls: float
+    lf: float
+    origin: Optional[datetime] = None
+
+    @property
+    def slack_hours(self) -> float:
+        return self.ls - self.es
+
+    @property
+    def earliest_start(self) -> Optional[str]:
+        return _iso(self.origin, self.es)
+
+    @property
+    def latest_finish(self) -> Optional[str]:
+        return _iso(self.origin, self.lf)
+
+
+@dataclass(slots=True)
+class CriticalPathResult:
+    path: List[ScheduledNode] = field(default_factory=list)
+    total_lag_hours: int = 0
+    schedule: Dict[str, ScheduledNode] = field(default_factory=dict)
+    project_hours: float = 0.0
+
+
+def critical_path(idx: GraphIndex, order: List[str], dep_kind: str) -> CriticalPathResult:
+    """
+    Critical-path method over `dep_kind` edges, given a topological `order` of the nodes.
+
+    - Duration of a node is its smarter.time_bound (due - start) in hours (0 if absent);
+      time_bound.start also acts as a start-no-earlier-than date.
+    - Edge `constraint` relates the predecessor u to the successor v, shifted by `lag_hours`:
+        FS: ES(v) >= EF(u) + lag      SS: ES(v) >= ES(u) + lag
+        FF: EF(v) >= EF(u) + lag      SF: EF(v) >= ES(u) + lag
+    - Edge `earliest_start` is a start-no-earlier-than date for v.
+    - Edge `latest_finish` is a finish-no-later-than deadline for v when the edge is
+      `hard`; such deadlines tighten the backward pass (slack may go negative).
+      Soft deadlines are advisory and ignored.
+
+    One forward and one backward sweep over `order`: O(N + E).
+    """
+    nodes = idx.id_to_node
+    # Resolve every dependency edge once into plain tuples; edge dates fold into
+    # per-node bounds so the sweeps below never touch edge objects again.
+    preds: Dict[str, List[tuple]] = {nid: [] for nid in order}
+    succs: Dict[str, List[tuple]] = {nid: [] for nid in order}
+    not_before: Dict[str, datetime] = {}
+    deadline_at: Dict[str, datetime] = {}
+    for v in order:
+        for e in idx.in_edges_of.get(v, ()):
+            if getattr(e, "kind", None) != dep_kind or e.from_node not in nodes:
+                continue
+            u, c, lag = e.from_node, e.constraint, e.lag_hours
+            preds[v].append((u, c, lag))
+            succs[u].append((v, c, lag))
+            if e.earliest_start is not None:
+                nle = _naive(e.earliest_start)
+                if v not in not_before or nle > not_before[v]:
+                    not_before[v] = nle
+            if e.hard and e.latest_finish is not None:
+                due = _naive(e.latest_finish)
+                if v not in deadline_at or due < deadline_at[v]:
+                    deadline_at[v] = due
+
+    # Resolve durations and absolute dates, then pick the origin
+    duration: Dict[str, float] = {}
+    planned: Dict[str, datetime] = {}
+    for nid in order:
+        tb = _time_bound(nodes[nid])
+        if tb is None:
+            duration[nid] = 0.0
+            continue
+        start, due = _naive(tb.start), _naive(tb.due)
+        planned[nid] = start
+        duration[nid] = max((due - start).total_seconds() / 3600.0, 0.0)
+    dates = list(planned.values()) + list(not_before.values())
+    origin = min(dates) if dates else None
+
+    def offsets(dates_of: Dict[str, datetime]) -> Dict[str, float]:
+        return {nid: (dt - origin).total_seconds() / 3600.0 for nid, dt in dates_of.items()}
+
+    earliest = offsets(planned)
+    for nid, at in offsets(not_before).items():
+        if at > earliest.get(nid, 0.0):
+            earliest[nid] = at
+    deadline = offsets(deadline_at)
+
+    # Forward pass: earliest start/finish
+    es: Dict[str, float] = {}
+    ef: Dict[str, float] = {}
+    for v in order:
+        d = duration[v]
+        start = earliest.get(v, 0.0)
+        for u, c, lag in preds[v]:
+            if c == "FS":
+                bound = ef[u] + lag
+            elif c == "SS":
+                bound = es[u] + lag
+            elif c == "FF":
+                bound = ef[u] + lag - d
+            else:  # SF
+                bound = es[u] + lag - d
+            if bound > start:
+                start = bound
+        es[v] = start
+        ef[v] = start + d
+
+    finish = max(ef.values(), default=0.0)
+
+    # Backward pass: latest finish/start
+    lf: Dict[str, float] = {}
+    ls: Dict[str, float] = {}
+    for u in reversed(order):
+        d = duration[u]
+        latest = deadline.get(u, finish)
+        if latest > finish:
+            latest = finish
+        for v, c, lag in succs[u]:
+            if c == "FS":
+                bound = ls[v] - lag
+            elif c == "SS":
+                bound = ls[v] - lag + d
+            elif c == "FF":
+                bound = lf[v] - lag
+            else:  # SF
+                bound = lf[v] - lag + d
+            if bound < latest:
+                latest = bound
+        lf[u] = latest
+        ls[u] = latest - d
+
+    schedule = {
+        nid: ScheduledNode(nid, duration[nid], es[nid], ef[nid], ls[nid], lf[nid], origin)
+        for nid in order
+    }
+
+    # Walk back from the node that finishes last through driving, zero-slack predecessors
+    path: List[ScheduledNode] = []
+    total_lag = 0
+    critical = [n for n in order if schedule[n].slack_hours <= _EPS]
+    # ties go to the node latest in topological order (the sink of the chain)
+    cur = max(reversed(critical), key=lambda n: ef[n], default=None)
+    while cur is not None:
+        path.append(schedule[cur])
+        nxt = None
+        for u, c, lag in preds[cur]:
+            if schedule[u].slack_hours > _EPS:
+                continue
+            bound = _start_bound(c, es[u], ef[u], lag, duration[cur])
+            if abs(bound - es[cur]) <= _EPS:
+                nxt = u
+                total_lag += lag
+                break
+        cur = nxt
+    path.reverse()
+
+    return CriticalPathResult(path=path, total_lag_hours=total_lag, schedule=schedule, project_hours=finish)
+
+
+def _start_bound(constraint: str, es_u: float, ef_u: float, lag: float, d: float) -> float:
+    """Earliest start a predecessor (ES=es_u, EF=ef_u) allows for a successor of duration d."""
+    if constraint == "FS":
+        return ef_u + lag
+    if constraint == "SS":
+        return es_u + lag
+    if constraint == "FF":
+        return ef_u + lag - d
+    return es_u + lag - d  # SF
+
+
+def _time_bound(node) -> Optional[object]:
+    payload = getattr(getattr(node, "smarter", None), "smarter", None)
+    return getattr(payload, "time_bound", None)
+
+
+def _naive(dt: datetime) -> datetime:
+    """Compare aware and naive datetimes on one (UTC) timeline."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _iso(origin: Optional[datetime], hours: float) -> Optional[str]:
+    if origin is None:
+        return None
+    return (origin + timedelta(hours=hours)).isoformat()
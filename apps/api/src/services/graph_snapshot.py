@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.schemas.edge import EdgeBase
+from src.schemas.node import NodeUnion
+from src.services.graph_codec import decode_edge, decode_node
+from src.services.graph_csr import CompactAdjacency, Condensation, Plane, _degrees, condense
+from src.services.graph_index import GraphIndex
+from src.services.graph_reach import ReachabilityIndex
+
+MAGIC = b"LHGSNAP1"
+_ALIGN = 8
+
+# Binary snapshot layout (little-endian):
+#
+#   MAGIC | u64 header length | JSON header | sections, each 8-byte aligned
+#
+# The header names every section as [offset, typecode, count]; a section is a raw
+# `array(typecode)` dump, so readers map it with memoryview.cast and never copy it.
+#
+#   ids.offsets q / ids.blob B          interned ids in CompactAdjacency order (UTF-8)
+#   node.body.offsets q / node.body B   per node: its JSON without `nodes`/`edges`
+#   node.children.offsets/targets i     nesting (child node numbers, in order)
+#   node.edges.offsets/targets i        node-owned edge records, in order
+#   edge.body.offsets q / edge.body B   per edge record: its JSON
+#   {out|in}.<k>.offsets/targets i      CSR plane of the k-th kind in `kinds`
+#   {out|in}.<k>.edges i                edge record behind every plane slot
+#   {out|in}.<k>.lag d                  min lag_hours per slot (only if all lags >= 0)
+
+
+def write_snapshot(index: GraphIndex, graph_id: str, path: str) -> None:
+    """
+    Write the graph behind `index` (built by GraphIndex.from_graph, or kept equal to
+    it) as a binary snapshot at `path`, atomically (temp file + rename).
+    """
+    csr = index.compact()
+    ids = csr.ids
+    nodes = list(index.id_to_node.values())
+
+    records: List[EdgeBase] = []
+    record_of: Dict[int, int] = {}
+
+    def record(e: EdgeBase) -> int:
+        r = record_of.get(id(e))
+        if r is None:
+            r = record_of[id(e)] = len(records)
+            records.append(e)
+        return r
+
+    sections: Dict[str, array] = {}
+    sections["ids.offsets"], sections["ids.blob"] = _blobs(s.encode() for s in ids)
+    sections["node.body.offsets"], sections["node.body"] = _blobs(
+        n.model_dump_json(by_alias=True, serialize_as_any=True, exclude={"nodes", "edges"}).encode() for n in nodes
+    )
+    sections["node.children.offsets"], sections["node.children.targets"] = _lists(
+        [csr.index_of[c.node_id] for c in n.nodes] for n in nodes
+    )
+    sections["node.edges.offsets"], sections["node.edges.targets"] = _lists(
+        [record(e) for e in n.edges or ()] for n in nodes
+    )
+
+    kinds = list(csr.out_planes)
+    for k, kind in enumerate(kinds):
+        for direction, planes, edges_of in (
+            ("out", csr.out_planes, index.out_edges_of),
+            ("in", csr.in_planes, index.in_edges_of),
+        ):
+            offsets, targets = planes[kind]
+            slots = array("i", bytes(4 * len(targets)))
+            lags = array("d", bytes(8 * len(targets)))
+            nonneg = True
+            for u in range(csr.size):
+                if offsets[u] == offsets[u + 1]:
+                    continue
+                # match edges to slots by neighbor (parallel edges keep their order)
+                by_other: Dict[int, List[EdgeBase]] = {}
+                for e in edges_of.get(ids[u], ()):
+                    if getattr(e, "kind", None) == kind:
+                        other = csr.index_of[e.to_node if direction == "out" else e.from_node]
+                        by_other.setdefault(other, []).append(e)
+                lag_of = {other: min(getattr(e, "lag_hours", 0) or 0 for e in es) for other, es in by_other.items()}
+                nonneg = nonneg and min(lag_of.values()) >= 0
+                taken: Dict[int, int] = {}
+                for i in range(offsets[u], offsets[u + 1]):
+                    other = targets[i]
+                    j = taken.get(other, 0)
+                    taken[other] = j + 1
+                    slots[i] = record(by_other[other][j])
+                    lags[i] = lag_of[other]
+            prefix = f"{direction}.{k}"
+            sections[prefix + ".offsets"] = offsets
+            sections[prefix + ".targets"] = targets
+            sections[prefix + ".edges"] = slots
+            if nonneg:
+                sections[prefix + ".lag"] = lags
+
+    sections["edge.body.offsets"], sections["edge.body"] = _blobs(
+        e.model_dump_json(by_alias=True, serialize_as_any=True).encode() for e in records
+    )
+
+    layout: Dict[str, Tuple[int, str, int]] = {}
+    pos = 0
+    for name, column in sections.items():
+        layout[name] = (pos, column.typecode, len(column))
+        pos = _aligned(pos + column.itemsize * len(column))
+    header = json.dumps({
+        "graph_id": graph_id,
+        "n_nodes": csr.n_nodes,
+        "n_edges": index.edge_count,
+        "kinds": kinds,
+        "sections": layout,
+    }).encode()
+    start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, column in sections.items():
+            f.seek(start + layout[name][0])
+            column.tofile(f)
+        f.truncate(start + pos)
+    os.replace(tmp, path)
+
+
+def open_snapshot(path: str) -> "SnapshotIndex":
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SnapshotIndex(mm)
+
+
+class SnapshotIndex:
+    """
+    Read-only GraphIndex over a memory-mapped binary snapshot.
+
+    Adjacency, interned ids and lags are used in place from the mapping, so the
+    structural analyses (traversal, SCC/topo, reachability, shortest paths) run
+    without building any Pydantic object. `id_to_node`, `out_edges_of` and
+    `in_edges_of` are lazy mappings: a node or edge model is decoded on first
+    access (e.g. when a handler returns it) and then kept.
+    """
+
+    def __init__(self, mm: mmap.mmap):
+        if mm[: len(MAGIC)] != MAGIC:
+            raise ValueError("not a graph snapshot")
+        (size,) = struct.unpack_from("<Q", mm, len(MAGIC))
+        header = json.loads(mm[len(MAGIC) + 8: len(MAGIC) + 8 + size])
+        self._mm = mm
+        view = memoryview(mm)[_aligned(len(MAGIC) + 8 + size):]
+        self._columns = {
+            name: view[off: off + count * array(code).itemsize].cast(code)
+            for name, (off, code, count) in header["sections"].items()
+        }
+        self.graph_id: str = header["graph_id"]
+        self.edge_count: int = header["n_edges"]
+        self.kinds: List[Optional[str]] = header["kinds"]
+
+        ids = [bytes(s).decode() for s in _split(self._columns["ids.offsets"], self._columns["ids.blob"])]
+        out_planes: Dict[Optional[str], Plane] = {}
+        in_planes: Dict[Optional[str], Plane] = {}
+        for k, kind in enumerate(self.kinds):
+            out_planes[kind] = (self._columns[f"out.{k}.offsets"], self._columns[f"out.{k}.targets"])
+            in_planes[kind] = (self._columns[f"in.{k}.offsets"], self._columns[f"in.{k}.targets"])
+        self._csr = CompactAdjacency(
+            ids=ids,
+            index_of={nid: i for i, nid in enumerate(ids)},
+            n_nodes=header["n_nodes"],
+            out_planes=out_planes,
+            in_planes=in_planes,
+            in_degrees={k: _degrees(offsets) for k, (offsets, _t) in in_planes.items()},
+        )
+        self._reach: Dict[Optional[str], ReachabilityIndex] = {}
+        self._nodes: Dict[int, NodeUnion] = {}
+        self._edges: Dict[int, EdgeBase] = {}
+        self.id_to_node = _LazyNodes(self)
+        self.out_edges_of = _LazyEdges(self, "out")
+        self.in_edges_of = _LazyEdges(self, "in")
+
+    # ---- GraphIndex read API ----
+
+    def compact(self) -> CompactAdjacency:
+        return self._csr
+
+    def reachability(self, kind: Optional[str], cond: Condensation | None = None) -> ReachabilityIndex:
+        reach = self._reach.get(kind)
+        if reach is None:
+            plane = self._csr.out_planes.get(kind)
+            if cond is None or cond.csr is not self._csr:
+                cond = condense(self._csr, plane)
+            reach = self._reach[kind] = ReachabilityIndex(cond, plane)
+        return reach
+
+    def out_neighbors(self, node_id: str, kinds=None) -> List[str]:
+        return self._neighbors(self._csr.planes(kinds, "out"), node_id)
+
+    def in_neighbors(self, node_id: str, kinds=None) -> List[str]:
+        return self._neighbors(self._csr.planes(kinds, "in"), node_id)
+
+    @property
+    def metrics_on(self) -> Dict[str, set]:
+        out = {}
+        for nid, n in self.id_to_node.items():
+            mids = {m.metric_id for m in getattr(n.smarter.smarter, "measurable", None) or []}
+            if mids:
+                out[nid] = mids
+        return out
+
+    def weight(self) -> int:
+        return self._csr.n_nodes + self.edge_count
+
+    def lag_plane(self, kind: Optional[str], direction: str) -> Optional[memoryview]:
+        """Per-slot lag_hours of a plane (see GraphOps._lag_weights); None if any lag is negative."""
+        if kind not in self.kinds:
+            return None
+        return self._columns.get(f"{direction}.{self.kinds.index(kind)}.lag")
+
+    # ----------------------------- private --------------------------------
+
+    def _neighbors(self, planes: List[Plane], node_id: str) -> List[str]:
+        u = self._csr.index_of.get(node_id)
+        if u is None:
+            return []
+        ids = self._csr.ids
+        return [ids[targets[i]] for offsets, targets in planes for i in range(offsets[u], offsets[u + 1])]
+
+    def _node(self, u: int) -> NodeUnion:
+        node = self._nodes.get(u)
+        if node is None:
+            node = self._nodes[u] = decode_node(self._node_data(u))
+        return node
+
+    def _node_data(self, u: int) -> Dict[str, Any]:
+        col = self._columns
+        data = json.loads(_slice(col["node.body.offsets"], col["node.body"], u))
+        data["edges"] = [
+            self._edge(r) for r in _row(col["node.edges.offsets"], col["node.edges.targets"], u)
+        ]
+        data["nodes"] = [
+            self._node_data(c) for c in _row(col["node.children.offsets"], col["node.children.targets"], u)
+        ]
+        return data
+
+    def _edge(self, r: int) -> EdgeBase:
+        edge = self._edges.get(r)
+        if edge is None:
+            col = self._columns
+            edge = self._edges[r] = decode_edge(json.loads(_slice(col["edge.body.offsets"], col["edge.body"], r)))
+        return edge
+
+
+class _LazyNodes(Mapping):
+    """nodeId -> node model, decoded on first access."""
+
+    def __init__(self, snap: SnapshotIndex):
+        self._snap = snap
+        self._csr = snap.compact()
+
+    def __getitem__(self, node_id: str) -> NodeUnion:
+        u = self._csr.index_of.get(node_id)
+        if u is None or u >= self._csr.n_nodes:
+            raise KeyError(node_id)
+        return self._snap._node(u)
+
+    def __contains__(self, node_id: object) -> bool:
+        u = self._csr.index_of.get(node_id)  # type: ignore[arg-type]
+        return u is not None and u < self._csr.n_nodes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._csr.ids[: self._csr.n_nodes])
+
+    def __len__(self) -> int:
+        return self._csr.n_nodes
+
+
+class _LazyEdges(Mapping):
+    """nodeId -> its out (or in) edge models over every kind, decoded on first access."""
+
+    def __init__(self, snap: SnapshotIndex, direction: str):
+        self._snap = snap
+        self._direction = direction
+        self._csr = snap.compact()
+
+    def __getitem__(self, node_id: str) -> List[EdgeBase]:
+        u = self._csr.index_of.get(node_id)
+        if u is None:
+            raise KeyError(node_id)
+        snap, col = self._snap, self._snap._columns
+        return [
+            snap._edge(r)
+            for k in range(len(snap.kinds))
+            for r in _row(col[f"{self._direction}.{k}.offsets"], col[f"{self._direction}.{k}.edges"], u)
+        ]
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._csr.index_of
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._csr.ids)
+
+    def __len__(self) -> int:
+        return self._csr.size
+
+
+def _blobs(items) -> Tuple[array, array]:
+    offsets, blob = array("q", [0]), array("B")
+    for b in items:
+        blob.frombytes(b)
+        offsets.append(len(blob))
+    return offsets, blob
+
+
+def _lists(rows) -> Tuple[array, array]:
+    offsets, targets = array("i", [0]), array("i")
+    for row in rows:
+        targets.extend(row)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def _split(offsets, blob) -> Iterator[memoryview]:
+    for i in range(len(offsets) - 1):
+        yield blob[offsets[i]: offsets[i + 1]]
+
+
+def _slice(offsets, blob, i: int) -> bytes:
+    return bytes(blob[offsets[i]: offsets[i + 1]])
+
+
+def _row(offsets, targets, i: int):
+    return targets[offsets[i]: offsets[i + 1]]
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
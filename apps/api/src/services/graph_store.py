@@ -1,15 +1,361 @@
-from typing import Dict, List, Optional
+import threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, Dict, Iterator, Optional, Tuple
 
-from schemas.node import NodeUnion
+from src.config import settings
 from src.schemas.graph import Graph
+from src.schemas.node import NodeUnion
+from src.services.body_cache import BodyCache, CachedBody
+from src.services.graph_index import GraphIndex
+from src.services.graph_locator import GraphLocator
+from src.services.graph_mutations import GraphMutator
+from src.services.graph_ops import GraphOps
+from src.services.graph_topo import TopoOrder
+from src.services.graph_validation import GraphValidator
+from src.services.index_cache import IndexCache
+
+# Process-wide so versions never repeat, even across stores or delete/re-create.
+_next_version = count(1)
+
+
+@dataclass(slots=True)
+class _GraphLock:
+    """Per-graph reader/writer state: writers serialize on `writer`; `cond` guards the rest."""
+    cond: threading.Condition = field(default_factory=threading.Condition)
+    writer: threading.Lock = field(default_factory=threading.Lock)
+    pins: Dict[int, int] = field(default_factory=dict)   # id(Graph object) -> pinned readers
+    writing: bool = False                                 # an in-place edit is in progress
+
+
+@dataclass(slots=True)
+class _Kept:
+    """Edit-time structures of one stored Graph object, carried from write to write (see GraphMutator)."""
+    graph: Graph
+    locator: Optional[GraphLocator] = None
+    topo: Optional[TopoOrder] = None
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """
+    A pinned, read-only view of one version of a graph. Snapshots served from a
+    memory-mapped file (read(..., mapped=True)) have no Graph: `graph` is None and
+    `ops`/`node` run over the mapped index.
+    """
+    graph_id: str
+    graph: Optional[Graph]
+    version: int
+    store: "GraphStore"
+    mapped: Any = None   # graph_snapshot.SnapshotIndex
+
+    @property
+    def ops(self) -> GraphOps:
+        cache = self.store.index_cache
+        if self.graph is None:
+            return (cache.peek(self.graph_id, self.version) or cache.adopt(self.graph_id, self.version, self.mapped)).ops
+        return cache.get(self.graph_id, self.version, self.graph).ops
+
+    def node(self, node_id: str) -> Optional[NodeUnion]:
+        """The node with `node_id` (nested ones included), or None."""
+        return self.ops.idx.id_to_node.get(node_id)
+
+    def validator(self) -> GraphValidator:
+        """
+        The live GraphValidator of this version: audited once, then kept in step
+        by in-place edits. Needs the Graph (not available on mapped snapshots).
+        """
+        if self.graph is None:
+            raise ValueError("validation needs a loaded graph, not a mapped snapshot")
+        entry = self.store.index_cache.get(self.graph_id, self.version, self.graph)
+        if entry.validator is None:
+            entry.validator = GraphValidator.from_graph(self.graph)
+        return entry.validator
+
+    def locator(self) -> GraphLocator:
+        """The GraphLocator of this version's Graph, shared with in-place writers (built on first use)."""
+        if self.graph is None:
+            raise ValueError("locating nodes needs a loaded graph, not a mapped snapshot")
+        kept = self.store._kept_for(self.graph)
+        if kept.locator is None:
+            kept.locator = GraphLocator(self.graph)
+        return kept.locator
+
+    def topo(self) -> Optional[TopoOrder]:
+        """
+        The topological order that writes maintain for this version's Graph (built
+        on first use); None on a mapped snapshot.
+        """
+        if self.graph is None:
+            return None
+        kept = self.store._kept_for(self.graph)
+        if kept.topo is None or kept.topo.stale:
+            kept.topo = TopoOrder.from_graph(self.graph)
+        return kept.topo
+
+    def reports(self) -> Dict[Any, Any]:
+        """Memo for results derived from this version (e.g. the validation report); cleared by the next write."""
+        return self.store.index_cache.get(self.graph_id, self.version, self.graph).reports
+
+    def body(self) -> CachedBody:
+        """The serialized Graph JSON of this version (with its ETag), cached until the next save."""
+        return self.store.body_cache.get(self.graph_id, self.version, self.graph)
+
 
 class GraphStore:
+    """
+    In-memory graph repository, safe to share across request threads.
+
+    Reads go through pinned snapshots (`read`) and writes through `write`:
+      - a writer edits the stored Graph (and its cached index) in place only when
+        no reader has that object pinned; otherwise it edits a deep copy and
+        publishes it as the next version (copy-on-write), so readers never see a
+        half-applied edit and long analyses never block writers;
+      - writers to one graph are serialized; readers wait only while an in-place
+        edit (O(delta)) is running.
+    The price of never blocking on readers: a copy-on-write edit is O(graph), not
+    O(delta), since it deep-copies the Graph and its mutator starts without the
+    cached index, locator and order (rebuilt on first use). Under sustained read
+    load every write can pay that; benchmarks/bench_delta.py measures it ("pinned").
+    """
+
+    # backends that persist edits as deltas set this: mutators then keep a journal
+    journaled = False
+
     def __init__(self):
         self._by_id: Dict[str, Graph] = {}
+        self._versions: Dict[str, int] = {}
+        self.index_cache = IndexCache(
+            max_entries=settings.INDEX_CACHE_MAX_GRAPHS,
+            max_weight=settings.INDEX_CACHE_MAX_ELEMENTS,
+        )
+        self.body_cache = BodyCache(
+            max_entries=settings.BODY_CACHE_MAX_GRAPHS,
+            max_bytes=settings.BODY_CACHE_MAX_BYTES,
+            gzip_min_bytes=settings.BODY_CACHE_GZIP_MIN_BYTES,
+        )
+        self._kept: Dict[str, _Kept] = {}
+        self._locks: Dict[str, _GraphLock] = {}
+        self._locks_guard = threading.Lock()
+
+    def save(self, graph: Graph, mutator: GraphMutator | None = None):
+        """
+        Store `graph` under a new version. Pass the `mutator` that produced the edits
+        to carry its live index, locator and topological order over to the new
+        version instead of rebuilding them.
+        """
+        old = self._versions.get(graph.graph_id)
+        new = next(_next_version)
+        self._by_id[graph.graph_id] = graph
+        self._versions[graph.graph_id] = new
+        self.body_cache.invalidate(graph.graph_id)
+        if mutator is not None and mutator.graph is graph:
+            self._kept[graph.graph_id] = _Kept(graph, mutator.locator(build=False), mutator.topo(build=False))
+        else:
+            self._kept.pop(graph.graph_id, None)
+        if old is not None and mutator is not None and mutator.index is not None and mutator.graph is graph:
+            self.index_cache.advance(graph.graph_id, old, new)
+
+    def mutator(self, graph: Graph) -> GraphMutator:
+        """A GraphMutator that keeps the cached index, locator and order of the stored version in step."""
+        version = self._versions.get(graph.graph_id)
+        live = self.index_cache.peek(graph.graph_id, version) if version is not None else None
+        kept = self._kept.get(graph.graph_id)
+        if kept is None or kept.graph is not graph:
+            kept = _Kept(graph)
+        if live is None or not isinstance(live.index, GraphIndex):
+            return self._mutator(graph, None, kept=kept)
+        return self._mutator(graph, live.index, live.validator, kept)
 
-    def save(self, graph: Graph): self._by_id[graph.graph_id] = graph
     def load(self, graph_id: str) -> Graph: return self._by_id[graph_id]
     def exists(self, graph_id: str) -> bool: return graph_id in self._by_id
+    def version(self, graph_id: str) -> int: return self._versions[graph_id]
+
+    def delete(self, graph_id: str) -> None:
+        del self._by_id[graph_id]
+        self._versions.pop(graph_id, None)
+        self._kept.pop(graph_id, None)
+        self.index_cache.invalidate(graph_id)
+        self.body_cache.invalidate(graph_id)
+
+    # ---- concurrency-safe access ----
+
+    def create(self, graph: Graph) -> bool:
+        """Store a new graph; False (and nothing stored) if the id is taken."""
+        lock = self._lock_for(graph.graph_id)
+        with lock.writer:
+            if self.exists(graph.graph_id):
+                return False
+            self.save(graph)
+            return True
+
+    @contextmanager
+    def read(self, graph_id: str, mapped: bool = False) -> Iterator[Snapshot]:
+        """
+        Pin the current version of a graph for the duration of the block. KeyError if absent.
+        mapped: callers that only need `ops`/`node` accept a snapshot served from a
+        memory-mapped file when the backend has a current one and the graph is not
+        loaded, so no Graph is parsed.
+        """
+        if mapped:
+            hit = self._mapped(graph_id)
+            if hit is not None:
+                # immutable file: nothing to pin
+                yield Snapshot(graph_id, None, hit[0], self, hit[1])
+                return
+        lock = self._lock_for(graph_id)
+        with lock.cond:
+            while lock.writing:
+                lock.cond.wait()
+            graph = self.load(graph_id)
+            snap = Snapshot(graph_id, graph, self.version(graph_id), self)
+            _pin(lock, graph)
+        try:
+            yield snap
+        finally:
+            with lock.cond:
+                _unpin(lock, graph)
+
+    @contextmanager
+    def pinned(self, graph_id: str, graph: Graph) -> Iterator[Graph]:
+        """Keep a specific Graph object from being edited in place during the block."""
+        lock = self._lock_for(graph_id)
+        with lock.cond:
+            while lock.writing:
+                lock.cond.wait()
+            _pin(lock, graph)
+        try:
+            yield graph
+        finally:
+            with lock.cond:
+                _unpin(lock, graph)
+
+    @contextmanager
+    def write(self, graph_id: str) -> Iterator[GraphMutator]:
+        """
+        Edit a graph through the yielded GraphMutator and publish the result as a new
+        version on exit (stamped on the mutator as `version`). KeyError if absent.
+        A block that edits nothing publishes nothing: `version` stays the base one.
+        All or nothing: on error a copy-on-write edit is discarded and an in-place
+        edit is undone (GraphMutator.atomic), so no version is published either way.
+        If a reader has the current object pinned, the edit goes to a deep copy with
+        no index: O(graph) for this write (see the class docstring).
+        """
+        lock = self._lock_for(graph_id)
+        with lock.writer:
+            with lock.cond:
+                graph = self.load(graph_id)
+                base = self.version(graph_id)
+                in_place = not lock.pins.get(id(graph))
+                lock.writing = in_place
+            try:
+                if in_place:
+                    m = self.mutator(graph)
+                else:
+                    m = self._mutator(graph.model_copy(deep=True), None)
+                m.base_version = base
+                with m.atomic():
+                    yield m
+                if m.edits:
+                    self.save(m.graph, m)
+                    m.version = self.version(graph_id)
+                else:
+                    m.graph, m.version = graph, base   # an unedited copy is just the original
+            finally:
+                with lock.cond:
+                    lock.writing = False
+                    lock.cond.notify_all()
+
+    def drop(self, graph_id: str) -> None:
+        """Delete a graph once in-flight writers are done. KeyError if absent."""
+        lock = self._lock_for(graph_id)
+        with lock.writer:
+            self.delete(graph_id)
+
+    def _mapped(self, graph_id: str) -> Optional[Tuple[int, Any]]:
+        """(version, SnapshotIndex) of a current memory-mapped snapshot; backends override."""
+        return None
+
+    def _mutator(
+        self,
+        graph: Graph,
+        index: GraphIndex | None,
+        validator: GraphValidator | None = None,
+        kept: _Kept | None = None,
+    ) -> GraphMutator:
+        return GraphMutator(
+            graph, index, [] if self.journaled else None, validator=validator, acyclic=True,
+            locator=kept.locator if kept is not None else None, topo=kept.topo if kept is not None else None,
+        )
+
+    def _kept_for(self, graph: Graph) -> _Kept:
+        """What is kept for `graph`; a new entry on a miss, kept only if `graph` is still the stored object."""
+        kept = self._kept.get(graph.graph_id)
+        if kept is None or kept.graph is not graph:
+            kept = _Kept(graph)
+            if self._by_id.get(graph.graph_id) is graph:
+                self._kept[graph.graph_id] = kept
+        return kept
+
+    def _lock_for(self, graph_id: str) -> _GraphLock:
+        with self._locks_guard:
+            lock = self._locks.get(graph_id)
+            if lock is None:
+                lock = self._locks[graph_id] = _GraphLock()
+            return lock
+
+
+class GraphSession:
+    """
+    Request-scoped access to a shared GraphStore. Snapshots and written graphs
+    stay pinned until close(), i.e. until the response has been serialized.
+    """
+
+    def __init__(self, store: GraphStore):
+        self.store = store
+        self._pins = ExitStack()
+
+    def read(self, graph_id: str, mapped: bool = False) -> Snapshot:
+        return self._pins.enter_context(self.store.read(graph_id, mapped))
+
+    @contextmanager
+    def write(self, graph_id: str) -> Iterator[GraphMutator]:
+        """store.write, then pin the published graph (m.graph) for the response."""
+        with self.store.write(graph_id) as m:
+            yield m
+        self._pins.enter_context(self.store.pinned(graph_id, m.graph))
+
+    def close(self) -> None:
+        self._pins.close()
+
+
+def _pin(lock: _GraphLock, graph: Graph) -> None:
+    key = id(graph)
+    lock.pins[key] = lock.pins.get(key, 0) + 1
+
+
+def _unpin(lock: _GraphLock, graph: Graph) -> None:
+    key = id(graph)
+    left = lock.pins[key] - 1
+    if left:
+        lock.pins[key] = left
+    else:
+        del lock.pins[key]
+    lock.cond.notify_all()
+
 
+def open_graph_store() -> GraphStore:
+    """The configured backend: SQLite when GRAPH_STORE_PATH is set, else in-memory."""
+    if settings.GRAPH_STORE_PATH:
+        from src.services.graph_store_sqlite import SqliteGraphStore
 
-    
\ No newline at end of file
+        return SqliteGraphStore(
+            settings.GRAPH_STORE_PATH,
+            cache_graphs=settings.GRAPH_STORE_CACHE_GRAPHS,
+            batch_size=settings.GRAPH_STORE_BATCH_SIZE,
+            flush_interval=settings.GRAPH_STORE_FLUSH_SECONDS,
+            compact_after=settings.GRAPH_STORE_COMPACT_OPS,
+            snapshot_dir=settings.GRAPH_STORE_SNAPSHOT_DIR,
+        )
+    return GraphStore()
@@ -0,0 +1,427 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.schemas.graph import Graph
+from src.services.graph_codec import decode_graph, decode_op, encode_graph
+from src.services.graph_mutations import GraphMutator
+from src.services.graph_snapshot import SnapshotIndex, open_snapshot, write_snapshot
+from src.services.graph_store import GraphStore, _Kept, _next_version
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    graph_id TEXT PRIMARY KEY,
+    rev      INTEGER NOT NULL,            -- bumped on every write; lets other processes detect stale caches
+    body     BLOB    NOT NULL,            -- Graph snapshot as JSON (by alias)
+    seq      INTEGER NOT NULL DEFAULT 0,  -- last graph_ops entry folded into `body`
+    mapped   TEXT                         -- binary snapshot file of `body` (see graph_snapshot), if any
+);
+CREATE TABLE IF NOT EXISTS graph_ops (
+    graph_id TEXT    NOT NULL,
+    seq      INTEGER NOT NULL,
+    op       BLOB    NOT NULL,            -- one GraphMutator journal entry as JSON
+    PRIMARY KEY (graph_id, seq)
+) WITHOUT ROWID;
+"""
+
+class WriteConflict(RuntimeError):
+    """Pending writes that another process overtook on disk; they were dropped, not written."""
+
+    def __init__(self, graph_ids: List[str]):
+        self.graph_ids = graph_ids
+        super().__init__(f"graphs changed on disk by another writer: {', '.join(graph_ids)}")
+
+
+class SqliteGraphStore(GraphStore):
+    """
+    GraphStore persisted to a local SQLite file in WAL mode.
+
+    - Hot graphs live in a bounded LRU of Graph objects (`cache_graphs`); a hit
+      costs one indexed `rev` lookup so edits made by other processes are seen.
+    - Edits made through a mutator are persisted as its journal: O(delta) rows
+      appended to `graph_ops`, not a rewrite of the graph. New graphs and plain
+      `save(graph)` calls write a full snapshot instead.
+    - A load reads the last snapshot and replays the ops logged after it. Once a
+      graph has `compact_after` ops since its snapshot, the background thread
+      folds them into a fresh snapshot, so recovery time stays bounded however
+      many edits a graph has had.
+    - With a `snapshot_dir`, every snapshot is also written as a binary file
+      (graph_snapshot) in the background. Reads that only need GraphOps or single
+      nodes (read(..., mapped=True)) of a graph that is not loaded are then served
+      by memory-mapping that file when no ops were logged after it, instead of
+      parsing and validating the JSON body.
+    - Writes are batched: `save` queues the snapshot or ops and returns; they are
+      written in one transaction once `batch_size` graphs are pending, every
+      `flush_interval` seconds from a background thread, before a pending graph is
+      evicted, and on `flush()`/`close()`.
+    - Writes are checked against the `rev` they were based on. If another process
+      wrote the graph first, the pending write is dropped rather than overwriting
+      it, the cached copy is invalidated so the next load reads the disk state, and
+      the next `flush()` raises WriteConflict.
+
+    Same save/load/exists/version/delete contract as the in-memory GraphStore.
+    """
+
+    journaled = True
+
+    def __init__(
+        self,
+        path: str,
+        cache_graphs: int = 64,
+        batch_size: int = 64,
+        flush_interval: float = 0.2,
+        compact_after: int = 256,
+        snapshot_dir: Optional[str] = None,
+    ):
+        super().__init__()
+        self.path = path
+        self.cache_graphs = cache_graphs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_after = compact_after
+        self.snapshot_dir = snapshot_dir
+        if snapshot_dir is not None:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        self._by_id: "OrderedDict[str, Graph]" = OrderedDict()
+        self._revs: Dict[str, int] = {}
+        self._dirty: Dict[str, Graph] = {}          # full snapshots to write
+        self._pending: Dict[str, List[bytes]] = {}  # journaled ops to append
+        self._compactable: Set[str] = set()       # graphs due for a fresh snapshot
+        self._maps: "OrderedDict[str, Tuple[str, int, SnapshotIndex]]" = OrderedDict()  # file, version, index
+        self._conflicts: List[str] = []            # dropped writes not yet reported by flush()
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(graphs)")}
+        if "seq" not in columns:  # files written before the op log existed
+            self._db.execute("ALTER TABLE graphs ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        if "mapped" not in columns:
+            self._db.execute("ALTER TABLE graphs ADD COLUMN mapped TEXT")
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="graph-store-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # ---- GraphStore contract ----
+
+    def save(self, graph: Graph, mutator: GraphMutator | None = None):
+        with self._lock:
+            super().save(graph, mutator)
+            gid = graph.graph_id
+            self._by_id.move_to_end(gid)
+            journal = mutator.journal if mutator is not None and mutator.graph is graph else None
+            if journal is None or gid in self._dirty or gid not in self._revs:
+                # nothing on disk to replay onto (or a snapshot is queued anyway)
+                self._dirty[gid] = graph
+                self._pending.pop(gid, None)
+            elif journal:
+                self._pending.setdefault(gid, []).extend(json.dumps(op).encode() for op in journal)
+            if len(self._dirty) + len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            self._evict_locked()
+
+    def load(self, graph_id: str) -> Graph:
+        with self._lock:
+            cached = self._by_id.get(graph_id)
+            if cached is not None:
+                if self._queued(graph_id) or self._disk_rev(graph_id) == self._revs.get(graph_id):
+                    self._by_id.move_to_end(graph_id)
+                    return cached
+            row = self._db.execute("SELECT rev, seq, body FROM graphs WHERE graph_id = ?", (graph_id,)).fetchone()
+            if row is None:
+                self._forget(graph_id)
+                raise KeyError(graph_id)
+            rev, seq, body = row
+            self._maps.pop(graph_id, None)
+            graph = decode_graph(body)
+            ops = self._db.execute(
+                "SELECT op FROM graph_ops WHERE graph_id = ? AND seq > ? ORDER BY seq", (graph_id, seq)
+            ).fetchall()
+            replay = GraphMutator(graph)
+            for (op,) in ops:
+                replay.apply(decode_op(op))
+            if len(ops) >= self.compact_after:
+                self._compactable.add(graph_id)
+            self._by_id[graph_id] = graph
+            self._kept[graph_id] = _Kept(graph, replay.locator(build=False), replay.topo(build=False))
+            self._revs[graph_id] = rev
+            self._versions[graph_id] = next(_next_version)
+            self._evict_locked()
+            return graph
+
+    def exists(self, graph_id: str) -> bool:
+        with self._lock:
+            return self._queued(graph_id) or self._disk_rev(graph_id) is not None
+
+    def version(self, graph_id: str) -> int:
+        with self._lock:
+            if graph_id not in self._versions:
+                self.load(graph_id)
+            return self._versions[graph_id]
+
+    def delete(self, graph_id: str) -> None:
+        with self._lock:
+            known = self._queued(graph_id)
+            self._forget(graph_id)
+            self._db.execute("DELETE FROM graph_ops WHERE graph_id = ?", (graph_id,))
+            row = self._db.execute("DELETE FROM graphs WHERE graph_id = ? RETURNING mapped", (graph_id,)).fetchone()
+            if row is None and not known:
+                raise KeyError(graph_id)
+            self._unlink(row[0] if row else None)
+
+    # ---- persistence ----
+
+    def flush(self) -> int:
+        """
+        Write every pending snapshot and op now, in one transaction. Returns how many
+        graphs were written; WriteConflict names the writes dropped since the last call.
+        """
+        with self._lock:
+            written = self._flush_locked()
+            conflicts, self._conflicts = self._conflicts, []
+        if conflicts:
+            raise WriteConflict(conflicts)
+        return written
+
+    def compact(self, graph_id: Optional[str] = None) -> int:
+        """
+        Fold logged ops into a fresh snapshot for `graph_id`, or for every graph
+        past `compact_after`. Returns how many graphs were compacted.
+        """
+        with self._lock:
+            ids = [graph_id] if graph_id is not None else sorted(self._compactable)
+        return sum(self._compact_one(gid) for gid in ids)
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join(timeout=max(self.flush_interval * 2, 1.0))
+        with self._lock:
+            self._flush_locked()
+            self._db.close()
+
+    # ----------------------------- private --------------------------------
+
+    def _flush_locked(self) -> int:
+        if not self._dirty and not self._pending:
+            return 0
+        snapshots = [(gid, encode_graph(g)) for gid, g in self._dirty.items()]
+        logged = list(self._pending.items())
+        stale: List[str] = []
+        conflicts: List[str] = []
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for gid, body in snapshots:
+                # a snapshot supersedes every op logged before it, and its binary file
+                expected = self._revs.get(gid)
+                old = self._db.execute("SELECT rev, mapped FROM graphs WHERE graph_id = ?", (gid,)).fetchone()
+                if expected is not None and (old is None or old[0] != expected):
+                    conflicts.append(gid)  # written (or deleted) by another process since we read it
+                    continue
+                seq = self._head_seq(gid)
+                self._db.execute("DELETE FROM graph_ops WHERE graph_id = ?", (gid,))
+                if old and old[1]:
+                    stale.append(old[1])
+                # graphs we never read (new ones, or a plain save) are written as given
+                (rev,) = self._db.execute(
+                    "INSERT INTO graphs (graph_id, rev, body, seq) VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(graph_id) DO UPDATE SET rev = rev + 1, body = excluded.body, seq = excluded.seq, "
+                    "mapped = NULL RETURNING rev",
+                    (gid, body, seq),
+                ).fetchone()
+                self._revs[gid] = rev
+                if self.snapshot_dir is not None:
+                    self._compactable.add(gid)
+            for gid, ops in logged:
+                # the ops were computed against the graph as of our rev: append only onto that
+                row = self._db.execute(
+                    "UPDATE graphs SET rev = rev + 1 WHERE graph_id = ? AND rev = ? RETURNING rev, seq",
+                    (gid, self._revs.get(gid)),
+                ).fetchone()
+                if row is None:  # written or deleted by another process meanwhile
+                    conflicts.append(gid)
+                    continue
+                rev, base = row
+                head = self._head_seq(gid)
+                self._db.executemany(
+                    "INSERT INTO graph_ops (graph_id, seq, op) VALUES (?, ?, ?)",
+                    [(gid, head + i, op) for i, op in enumerate(ops, start=1)],
+                )
+                self._revs[gid] = rev
+                if head + len(ops) - base >= self.compact_after:
+                    self._compactable.add(gid)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._dirty.clear()
+        self._pending.clear()
+        for name in stale:
+            self._unlink(name)
+        for gid in conflicts:
+            log.warning("graph %s was written by another process; dropping our pending write", gid)
+            self._uncache(gid)
+        self._conflicts.extend(conflicts)
+        return len(snapshots) + len(logged) - len(conflicts)
+
+    def _compact_one(self, graph_id: str) -> bool:
+        try:
+            # pinned: writers copy instead of editing this object while it is encoded
+            with self.read(graph_id) as snap:
+                with self._lock:
+                    self._flush_locked()
+                    if self._by_id.get(graph_id) is not snap.graph or self._disk_rev(graph_id) != self._revs.get(graph_id):
+                        return False  # superseded meanwhile; retried on the next pass
+                    rev, seq, mapped = self._db.execute(
+                        "SELECT rev, seq, mapped FROM graphs WHERE graph_id = ?", (graph_id,)
+                    ).fetchone()
+                    head = self._head_seq(graph_id)
+                    if head > seq:
+                        if not self._write_body(graph_id, encode_graph(snap.graph), head, rev):
+                            return False  # written by another process meanwhile
+                        mapped = None
+                    elif mapped is not None or self.snapshot_dir is None:
+                        self._compactable.discard(graph_id)
+                        return True
+                if self.snapshot_dir is not None:
+                    # built outside the lock: the pinned graph cannot change underneath
+                    index = self.index_cache.get(graph_id, snap.version, snap.graph).index
+                    name = f"{uuid.uuid4().hex}.lhgs"
+                    write_snapshot(index, graph_id, os.path.join(self.snapshot_dir, name))
+                    with self._lock:
+                        cur = self._db.execute(
+                            "UPDATE graphs SET mapped = ? WHERE graph_id = ? AND rev = ?", (name, graph_id, rev)
+                        )
+                        if cur.rowcount == 0:  # written meanwhile; the file describes an old state
+                            self._unlink(name)
+                            return False
+                        self._unlink(mapped)
+        except KeyError:
+            pass
+        self._compactable.discard(graph_id)
+        return True
+
+    def _write_body(self, graph_id: str, body: bytes, seq: int, rev: int) -> bool:
+        """
+        Replace the snapshot with `body` (covering ops up to `seq`) if the graph is still
+        at `rev`; the state it describes is unchanged. False if it has moved on.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            old = self._db.execute("SELECT mapped FROM graphs WHERE graph_id = ? AND rev = ?", (graph_id, rev)).fetchone()
+            if old is None:
+                self._db.execute("ROLLBACK")
+                return False
+            self._db.execute("UPDATE graphs SET body = ?, seq = ?, mapped = NULL WHERE graph_id = ?", (body, seq, graph_id))
+            self._db.execute("DELETE FROM graph_ops WHERE graph_id = ? AND seq <= ?", (graph_id, seq))
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        if old[0]:
+            self._unlink(old[0])
+        return True
+
+    def _mapped(self, graph_id: str) -> Optional[Tuple[int, Any]]:
+        if self.snapshot_dir is None:
+            return None
+        with self._lock:
+            if graph_id in self._by_id or self._queued(graph_id):
+                return None  # loaded graphs are served as usual
+            row = self._db.execute("SELECT seq, mapped FROM graphs WHERE graph_id = ?", (graph_id,)).fetchone()
+            if row is None or row[1] is None or self._head_seq(graph_id) != row[0]:
+                return None
+            hit = self._maps.get(graph_id)
+            if hit is None or hit[0] != row[1]:
+                try:
+                    index = open_snapshot(os.path.join(self.snapshot_dir, row[1]))
+                except (OSError, ValueError):
+                    log.exception("graph snapshot %s unreadable; falling back to JSON", row[1])
+                    return None
+                hit = self._maps[graph_id] = (row[1], next(_next_version), index)
+                while len(self._maps) > self.cache_graphs:
+                    self._maps.popitem(last=False)
+            self._maps.move_to_end(graph_id)
+            return hit[1], hit[2]
+
+    def _unlink(self, name: Optional[str]) -> None:
+        if name is None or self.snapshot_dir is None:
+            return
+        try:
+            os.unlink(os.path.join(self.snapshot_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self._compactable:
+                    self.compact()
+            except WriteConflict:
+                pass  # logged when detected
+            except Exception:  # keep flushing; the graphs stay pending and are retried
+                log.exception("graph store flush failed")
+
+    def _evict_locked(self) -> None:
+        while len(self._by_id) > self.cache_graphs:
+            graph_id = next(iter(self._by_id))
+            if self._queued(graph_id):
+                self._flush_locked()
+            self._uncache(graph_id)
+            self._revs.pop(graph_id, None)
+
+    def _uncache(self, graph_id: str) -> None:
+        """
+        Drop the in-memory copy so the next load reads the disk state. The rev it was
+        read at is kept: a write still based on that copy is then caught as a conflict.
+        """
+        self._by_id.pop(graph_id, None)
+        self._versions.pop(graph_id, None)
+        self._kept.pop(graph_id, None)
+        self.index_cache.invalidate(graph_id)
+        self.body_cache.invalidate(graph_id)
+
+    def _forget(self, graph_id: str) -> None:
+        self._by_id.pop(graph_id, None)
+        self._versions.pop(graph_id, None)
+        self._kept.pop(graph_id, None)
+        self._revs.pop(graph_id, None)
+        self._dirty.pop(graph_id, None)
+        self._pending.pop(graph_id, None)
+        self._compactable.discard(graph_id)
+        self._maps.pop(graph_id, None)
+        self.index_cache.invalidate(graph_id)
+        self.body_cache.invalidate(graph_id)
+
+    def _queued(self, graph_id: str) -> bool:
+        return graph_id in self._dirty or graph_id in self._pending
+
+    def _disk_rev(self, graph_id: str) -> Optional[int]:
+        row = self._db.execute("SELECT rev FROM graphs WHERE graph_id = ?", (graph_id,)).fetchone()
+        return row[0] if row else None
+
+    def _head_seq(self, graph_id: str) -> int:
+        """Sequence number of the last op logged for the graph (or folded into its snapshot)."""
+        row = self._db.execute(
+            "SELECT COALESCE((SELECT MAX(seq) FROM graph_ops WHERE graph_id = ?), "
+            "(SELECT seq FROM graphs WHERE graph_id = ?), 0)",
+            (graph_id, graph_id),
+        ).fetchone()
+        return row[0]
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEPENDENCY = "dependency"
+
+
+class CycleError(ValueError):
+    """A dependency edge would close a cycle; `path` runs from the edge's source back to it."""
+
+    def __init__(self, path: List[str], edge_id: Optional[str] = None):
+        self.path = path
+        self.edge_id = edge_id
+        super().__init__(f"Dependency edge would create a cycle: {' -> '.join(path)}")
+
+
+class TopoOrder:
+    """
+    A topological order of one Graph's dependency edges, kept up to date edge by
+    edge (Pearce & Kelly, "A dynamic topological sort algorithm for directed
+    acyclic graphs", 2006).
+
+    Every id seen as a node or dependency endpoint holds a slot in `at`. Inserting
+    u -> v when u already precedes v costs O(1). Otherwise only the region between
+    them is searched: the nodes reachable from v that sit no later than u, and the
+    nodes reaching u that sit no earlier than v. Reaching u from v is a cycle, and
+    is reported with its path before anything changes. Otherwise the two regions
+    swap into the slots they already occupy. Removals never break the order.
+
+    A graph that already has a cycle is `cyclic`: edges are only recorded, there
+    is no order, and the next removal marks it `stale` so GraphMutator.topo() rebuilds it.
+    """
+
+    def __init__(self):
+        self.pos: Dict[str, int] = {}             # id -> slot in `at`
+        self.at: List[Optional[str]] = []         # slot -> id (None: freed)
+        self.out: Dict[str, List[str]] = {}       # dependency successors, one entry per edge
+        self.into: Dict[str, List[str]] = {}      # dependency predecessors, one entry per edge
+        self.nodes: Dict[str, int] = {}           # ids that are graph nodes (count of carriers)
+        self.cyclic = False
+        self.stale = False
+
+    @classmethod
+    def from_graph(cls, graph: Any) -> "TopoOrder":
+        """Kahn's algorithm over every node and dependency edge (root and node-owned): O(N + E)."""
+        t = cls()
+        edges: List[Tuple[str, str]] = []
+        for n in graph._iter_nodes_preorder():
+            t.nodes[n.node_id] = t.nodes.get(n.node_id, 0) + 1
+            t._vertex(n.node_id)
+            edges.extend((e.from_node, e.to_node) for e in n.edges if _is_dependency(e))
+        edges.extend((e.from_node, e.to_node) for e in graph.edges if _is_dependency(e))
+        for u, v in edges:
+            t._vertex(u)
+            t._vertex(v)
+            t.out.setdefault(u, []).append(v)
+            t.into.setdefault(v, []).append(u)
+
+        indeg = {x: len(t.into.get(x, ())) for x in t.pos}
+        ready = [x for x in t.at if x is not None and not indeg[x]]
+        order: List[str] = []
+        while ready:
+            x = ready.pop()
+            order.append(x)
+            for y in t.out.get(x, ()):
+                indeg[y] -= 1
+                if not indeg[y]:
+                    ready.append(y)
+        if len(order) < len(t.pos):
+            t.cyclic = True
+        else:
+            t.at = list(order)
+            t.pos = {x: i for i, x in enumerate(order)}
+        return t
+
+    # ---- queries ----
+
+    def order(self) -> List[str]:
+        """Node ids in topological order (dependency endpoints that are not nodes are skipped)."""
+        if self.cyclic:
+            raise ValueError("graph has dependency cycles: no topological order")
+        return [x for x in self.at if x is not None and x in self.nodes]
+
+    # ---- deltas ----
+
+    def add_node(self, node_id: str) -> None:
+        self.nodes[node_id] = self.nodes.get(node_id, 0) + 1
+        self._vertex(node_id)
+
+    def remove_node(self, node_id: str) -> None:
+        left = self.nodes.get(node_id, 0) - 1
+        if left > 0:
+            self.nodes[node_id] = left
+            return
+        self.nodes.pop(node_id, None)
+        self._release(node_id)
+
+    def add_edge(self, u: str, v: str, reject: bool = True) -> None:
+        """
+        Record dependency u -> v, reordering the affected region. If it closes a cycle,
+        raise CycleError (nothing changed) or, with reject=False, turn `cyclic`.
+        """
+        self._vertex(u)
+        self._vertex(v)
+        if u == v or not self.cyclic and self.pos[v] < self.pos[u]:
+            cycle = self._reorder(u, v)
+            if cycle is not None:
+                if reject:
+                    self._release(u)
+                    self._release(v)
+                    raise CycleError(cycle)
+                self.cyclic = True
+        self.out.setdefault(u, []).append(v)
+        self.into.setdefault(v, []).append(u)
+
+    def remove_edge(self, u: str, v: str) -> None:
+        _remove_one(self.out, u, v)
+        _remove_one(self.into, v, u)
+        if self.cyclic:
+            self.stale = True
+        self._release(u)
+        self._release(v)
+
+    # ----------------------------- private --------------------------------
+
+    def _vertex(self, x: str) -> None:
+        if x not in self.pos:
+            self.pos[x] = len(self.at)
+            self.at.append(x)
+
+    def _release(self, x: str) -> None:
+        """Free the slot of an id that is neither a node nor an endpoint any more."""
+        if x in self.nodes or self.out.get(x) or self.into.get(x) or x not in self.pos:
+            return
+        self.out.pop(x, None)
+        self.into.pop(x, None)
+        self.at[self.pos.pop(x)] = None
+        if len(self.at) > 64 and len(self.pos) < len(self.at) // 2:
+            self.at = [y for y in self.at if y is not None]
+            self.pos = {y: i for i, y in enumerate(self.at)}
+
+    def _reorder(self, u: str, v: str) -> Optional[List[str]]:
+        """Make room for u -> v with pos[v] < pos[u]; the cycle u -> v -> ... -> u if there is one."""
+        if u == v:
+            return [u, u]
+        pos = self.pos
+        lower, upper = pos[v], pos[u]
+        # forward from v, within (.., upper]: reaching u closes a cycle
+        parent: Dict[str, Optional[str]] = {v: None}
+        stack = [v]
+        while stack:
+            x = stack.pop()
+            for y in self.out.get(x, ()):
+                if y == u:
+                    path = [u]
+                    step: Optional[str] = x
+                    while step is not None:
+                        path.append(step)
+                        step = parent[step]
+                    path.reverse()                 # v ... x u
+                    return [u] + path
+                if y not in parent and pos[y] < upper:
+                    parent[y] = x
+                    stack.append(y)
+        forward = list(parent)
+        # backward from u, within [lower, ..)
+        seen = {u}
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            for y in self.into.get(x, ()):
+                if y not in seen and pos[y] > lower:
+                    seen.add(y)
+                    stack.append(y)
+        backward = list(seen)
+        # the region keeps its slots: everything reaching u first, then everything v reaches
+        moved = sorted(backward, key=pos.__getitem__) + sorted(forward, key=pos.__getitem__)
+        slots = sorted(pos[x] for x in moved)
+        for x, i in zip(moved, slots):
+            pos[x] = i
+            self.at[i] = x
+        return None
+
+
+def dependency_pairs(edges: Iterable[Any]) -> List[Tuple[str, str]]:
+    """(from, to) of the dependency edges among `edges`."""
+    return [(e.from_node, e.to_node) for e in edges if _is_dependency(e)]
+
+
+def _is_dependency(e: Any) -> bool:
+    return getattr(e, "kind", None) == DEPENDENCY
+
+
+def _remove_one(adj: Dict[str, List[str]], key: str, value: str) -> None:
+    items = adj.get(key)
+    if items is not None and value in items:
+        items.remove(value)
+        if not items:
+            del adj[key]
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
-from typing import List, Set
-from src.services.graph_index import GraphIndex
+import heapq
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.schemas.enums import EdgeKind
+from src.schemas.graph import Graph
+from src.services.graph_ops import GraphOps
+
+# Every issue code of ValidateIssue, in report order.
+ISSUE_CODES = ("unknown-node", "duplicate-node", "unknown-edge-node", "missing-contrib-metric", "cycle-detected")
+_RANK = {code: i for i, code in enumerate(ISSUE_CODES)}
 
 
 class GraphViolation:
@@ -20,64 +28,249 @@ class GraphViolation:
 
 class GraphValidator:
     """
-    Cross-object validation aligned with your modeling rules:
-      - All edges connect existing nodes.
-      - contributes_to.metricIds must exist on the TARGET node's measurable metrics.
-      - (Optional) weights normalization or other rollup preconditions.
+    The one validation engine for a Graph. It checks:
+      - node.parent names an existing node ("unknown-node")
+      - node ids are unique ("duplicate-node")
+      - every edge connects existing nodes ("unknown-edge-node")
+      - contributes_to.metricIds exist on the TARGET goal ("missing-contrib-metric")
+      - dependency edges form no cycle ("cycle-detected", via GraphOps, in `report`)
+
+    `audit(graph)` derives everything in a single pass: nodes first, then edges.
+    The validator then keeps the id set (with multiplicity), the per-goal metric
+    map and the edges touching each id. GraphMutator reports each edit through
+    add_node/remove_node/add_edge/remove_edge, like GraphIndex deltas. Only the
+    touched nodes, their edges and the contributes_to edges pointing at them are
+    re-checked, so an edit costs O(subtree + degree) and `violations()` O(issues).
     """
 
-    def __init__(self, index: GraphIndex):
-        self.idx = index
-
-    def validate(self) -> List[GraphViolation]:
-        violations: List[GraphViolation] = []
-        violations.extend(self._check_edge_endpoints())
-        violations.extend(self._check_contributes_to_metrics())
-        return violations
-
-    def _check_edge_endpoints(self) -> List[GraphViolation]:
-        out: List[GraphViolation] = []
-        ids = self.idx.id_to_node.keys()
-        for from_id, edges in self.idx.out_edges_of.items():
-            if from_id not in ids:
-                out.append(
-                    GraphViolation(
-                        "UnknownFromNode",
-                        f"Edge(s) reference unknown from_node '{from_id}'",
-                    )
-                )
-            for e in edges:
-                if e.to_node not in ids:
-                    out.append(
-                        GraphViolation(
-                            "UnknownToNode",
-                            f"Edge '{e.edge_id}' references unknown to_node '{e.to_node}'",
-                            {"edgeId": e.edge_id},
-                        )
-                    )
-        return out
-
-    def _check_contributes_to_metrics(self) -> List[GraphViolation]:
-        out: List[GraphViolation] = []
-        for from_id, edges in self.idx.out_edges_of.items():
-            for edge in edges:
-                if getattr(edge, "kind", None) == "contributes_to":
-                    target_metrics: Set[str] = self.idx.metrics_on.get(edge.to_node, set())
-                    missing = [
-                        m
-                        for m in getattr(edge, "metric_ids", [])
-                        if m not in target_metrics
-                    ]
-                    if missing:
-                        out.append(
-                            GraphViolation(
-                                "UnknownTargetMetric",
-                                f"Edge '{edge.edge_id}' refers to metricIds not present on target '{edge.to_node}'",
-                                {
-                                    "edgeId": edge.edge_id,
-                                    "missing": missing,
-                                    "target": edge.to_node,
-                                },
-                            )
-                        )
-        return out
+    def __init__(self):
+        self.nodes: Dict[str, List[Any]] = {}            # node id -> nodes carrying it (2+ = duplicate)
+        self.metrics: Dict[str, Set[str]] = {}           # goal id -> metricIds
+        self.edges_at: Dict[str, Dict[int, Any]] = {}    # node id -> {id(edge): edge} for edges from/to it
+        self.claims: Dict[str, Dict[int, Any]] = {}      # parent id -> {id(node): node} naming it as parent
+        self.truncated = False                           # an audit stopped at max_issues
+        self._node_issues: Dict[str, GraphViolation] = {}
+        self._parent_issues: Dict[int, GraphViolation] = {}
+        self._edge_issues: Dict[int, List[GraphViolation]] = {}
+        self._edge_count = 0                             # violations in _edge_issues
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "GraphValidator":
+        v = cls()
+        v.audit(graph)
+        return v
+
+    def audit(self, graph: Graph, max_issues: Optional[int] = None) -> List[GraphViolation]:
+        """
+        Full revalidation: rebuild all state from `graph` and return its violations.
+        With `max_issues`, checking stops once more than that many are found and
+        `truncated` is set. A truncated validator is only good for that answer, not
+        for further deltas.
+        """
+        self.__init__()
+        for e in graph.edges:
+            self._link(e)
+        added = [node for n in graph.nodes for _, node in self._index(n)]
+        for node in added:
+            self._check_node(node.node_id)
+            self._check_parent(node)
+            if self._spent(max_issues):
+                return self.violations(max_issues)
+        seen: Set[int] = set()
+        for edges in self.edges_at.values():
+            for key, e in edges.items():
+                if key not in seen:
+                    seen.add(key)
+                    self._check_edge(e)
+                    if self._spent(max_issues):
+                        return self.violations(max_issues)
+        return self.violations(max_issues)
+
+    def violations(self, max_issues: Optional[int] = None) -> List[GraphViolation]:
+        """Current violations by code (ISSUE_CODES order), then node/edge id; the first `max_issues`."""
+        issues = self._iter_issues()
+        if max_issues is None:
+            return [v for _, v in sorted(issues, key=lambda kv: kv[0])]
+        return [v for _, v in heapq.nsmallest(max_issues, issues, key=lambda kv: kv[0])]
+
+    def report(self, ops: GraphOps, max_issues: Optional[int] = None) -> Tuple[List[GraphViolation], bool]:
+        """
+        Every violation, dependency cycles (from `ops`, over the same graph) last.
+        Returns (violations, truncated); stops early, skipping the cycle pass when
+        the budget is already spent, once `max_issues` are found.
+        """
+        out = self.violations(max_issues)
+        truncated = self.truncated or (max_issues is not None and self.count > len(out))
+        if truncated:
+            return out, True
+        cycles = ops.detect_cycles(dep_kind=EdgeKind.dependency.value)
+        for cyc in cycles:
+            if max_issues is not None and len(out) >= max_issues:
+                return out, True
+            out.append(GraphViolation("cycle-detected", "Dependency cycle", {"path": [",".join(cyc)]}))
+        return out, False
+
+    @property
+    def count(self) -> int:
+        return len(self._node_issues) + len(self._parent_issues) + self._edge_count
+
+    @property
+    def ok(self) -> bool:
+        return not self.count
+
+    # ---- deltas (same contract as GraphIndex: call after the graph edit) ----
+
+    def add_node(self, node: Any) -> None:
+        """`node` (with its nested subtree and node-owned edges) was added."""
+        added = self._index(node)
+        for _, n in added:
+            self._check_parent(n)
+        self._recheck([nid for nid, _ in added])
+
+    def remove_node(self, node: Any) -> None:
+        """`node` (with its nested subtree and node-owned edges) was removed."""
+        touched: List[str] = []
+        for n in _subtree(node):
+            nid = n.node_id
+            carriers = self.nodes.get(nid, [])
+            _remove_identity(carriers, n)
+            if carriers:
+                self._set_metrics(nid, carriers[0])
+            else:
+                self.nodes.pop(nid, None)
+                self.metrics.pop(nid, None)
+            if n.parent is not None:
+                _drop(self.claims, n.parent, id(n))
+            self._parent_issues.pop(id(n), None)
+            for e in n.edges:
+                self._unlink(e)
+            touched.append(nid)
+        self._recheck(touched)
+
+    def add_edge(self, edge: Any) -> None:
+        self._link(edge)
+        self._check_edge(edge)
+
+    def remove_edge(self, edge: Any) -> None:
+        self._unlink(edge)
+
+    # ----------------------------- private --------------------------------
+
+    def _spent(self, max_issues: Optional[int]) -> bool:
+        if max_issues is None or self.count <= max_issues:
+            return False
+        self.truncated = True
+        return True
+
+    def _iter_issues(self) -> Iterator[Tuple[Tuple[int, str], GraphViolation]]:
+        for nid, v in self._node_issues.items():
+            yield (_RANK[v.code], nid), v
+        for v in self._parent_issues.values():
+            yield (_RANK[v.code], v.extra["path"][1]), v
+        for vs in self._edge_issues.values():
+            for v in vs:
+                yield (_RANK[v.code], v.extra["edgeId"]), v
+
+    def _index(self, node: Any) -> List[Tuple[str, Any]]:
+        added: List[Tuple[str, Any]] = []
+        for n in _subtree(node):
+            nid = n.node_id
+            carriers = self.nodes.setdefault(nid, [])
+            carriers.append(n)
+            if len(carriers) == 1:
+                self._set_metrics(nid, n)
+            if n.parent is not None:
+                self.claims.setdefault(n.parent, {})[id(n)] = n
+            for e in n.edges:
+                self._link(e)
+            added.append((nid, n))
+        return added
+
+    def _set_metrics(self, nid: str, node: Any) -> None:
+        mids = set()
+        if getattr(node, "kind", None) == "goal":
+            mids = {m.metric_id for m in node.smarter.smarter.measurable}
+        if mids:
+            self.metrics[nid] = mids
+        else:
+            self.metrics.pop(nid, None)
+
+    def _link(self, e: Any) -> None:
+        self.edges_at.setdefault(e.from_node, {})[id(e)] = e
+        self.edges_at.setdefault(e.to_node, {})[id(e)] = e
+
+    def _unlink(self, e: Any) -> None:
+        for nid in (e.from_node, e.to_node):
+            _drop(self.edges_at, nid, id(e))
+        self._edge_count -= len(self._edge_issues.pop(id(e), ()))
+
+    def _recheck(self, node_ids: List[str]) -> None:
+        seen: Set[int] = set()
+        for nid in node_ids:
+            self._check_node(nid)
+            for n in self.claims.get(nid, {}).values():
+                self._check_parent(n)
+            for key, e in self.edges_at.get(nid, {}).items():
+                if key not in seen:
+                    seen.add(key)
+                    self._check_edge(e)
+
+    def _check_node(self, nid: str) -> None:
+        if len(self.nodes.get(nid, ())) > 1:
+            self._node_issues[nid] = GraphViolation(
+                "duplicate-node", f"Duplicate node_id: {nid}", {"path": ["nodes", nid]}
+            )
+        else:
+            self._node_issues.pop(nid, None)
+
+    def _check_parent(self, n: Any) -> None:
+        if n.parent is not None and n.parent not in self.nodes:
+            self._parent_issues[id(n)] = GraphViolation(
+                "unknown-node", f"Node {n.node_id} has unknown parent {n.parent}", {"path": ["nodes", n.node_id]}
+            )
+        else:
+            self._parent_issues.pop(id(n), None)
+
+    def _check_edge(self, e: Any) -> None:
+        issues: List[GraphViolation] = []
+        path = {"edgeId": e.edge_id, "path": ["edges", e.edge_id]}
+        unknown = [x for x in (e.from_node, e.to_node) if x not in self.nodes]
+        if unknown:
+            issues.append(GraphViolation(
+                "unknown-edge-node", f"Edge {e.edge_id} references unknown node(s): {unknown}", path
+            ))
+        if getattr(e, "kind", None) == "contributes_to":
+            target = self.metrics.get(e.to_node, set())
+            missing = [m for m in e.metric_ids if m not in target]
+            if missing:
+                issues.append(GraphViolation(
+                    "missing-contrib-metric",
+                    f"Edge {e.edge_id} references unknown metricIds on target {e.to_node}: {missing}",
+                    {**path, "missing": missing, "target": e.to_node},
+                ))
+        self._edge_count += len(issues) - len(self._edge_issues.pop(id(e), ()))
+        if issues:
+            self._edge_issues[id(e)] = issues
+
+
+def _subtree(node: Any) -> Iterator[Any]:
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(reversed(n.nodes))
+
+
+def _drop(buckets: Dict[str, Dict[int, Any]], key: str, item: int) -> None:
+    bucket = buckets.get(key)
+    if bucket is not None:
+        bucket.pop(item, None)
+        if not bucket:
+            del buckets[key]
+
+
+def _remove_identity(items: List[Any], item: Any) -> None:
+    for i, cur in enumerate(items):
+        if cur is item:
+            del items[i]
+            return
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from src.schemas.graph import Graph
+from src.services.graph_index import GraphIndex
+from src.services.graph_ops import GraphOps
+from src.services.graph_validation import GraphValidator
+
+
+@dataclass(slots=True)
+class CachedIndex:
+    """A built GraphIndex/GraphOps pair for one version of one graph."""
+    graph_id: str
+    version: int
+    index: GraphIndex
+    ops: GraphOps
+    weight: int
+    validator: Optional[GraphValidator] = None   # built on first validation, kept by in-place edits
+    reports: Dict[Any, Any] = field(default_factory=dict)   # per-version results (e.g. ValidateResponse)
+
+
+class IndexCache:
+    """
+    LRU cache of built indexes, keyed by graph id and tagged with the graph version.
+
+    Only the newest version of a graph is kept: a lookup with a newer version
+    replaces the stale entry. Eviction is least-recently-used and bounded by both
+    the number of graphs and the total weight (nodes + edges) held in memory.
+    Indexes heavier than `max_weight` are built and returned but never cached.
+    """
+
+    def __init__(self, max_entries: int = 16, max_weight: int = 2_000_000):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[str, CachedIndex]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, graph_id: str, version: int, graph: Graph) -> CachedIndex:
+        """Return the cached index for `version`, building it from `graph` on a miss."""
+        hit = self.peek(graph_id, version)
+        if hit is not None:
+            return hit
+
+        # Build outside the lock; concurrent misses may build twice, last one wins.
+        return self.adopt(graph_id, version, GraphIndex.from_graph(graph))
+
+    def adopt(self, graph_id: str, version: int, index: Any) -> CachedIndex:
+        """Cache an index built elsewhere (e.g. a mapped snapshot) for `version`."""
+        entry = CachedIndex(
+            graph_id=graph_id,
+            version=version,
+            index=index,
+            ops=GraphOps(index),
+            weight=index.weight(),
+        )
+        self._put(entry)
+        return entry
+
+    def peek(self, graph_id: str, version: int) -> Optional[CachedIndex]:
+        """Return the cached entry only if it matches `version`; never builds."""
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(graph_id)
+            return entry
+
+    def advance(self, graph_id: str, old_version: int, new_version: int) -> None:
+        """
+        Re-tag an entry whose index was edited in place (see GraphMutator) from
+        `old_version` to `new_version`. Derived GraphOps state and reports are
+        reset; the validator, edited alongside the index, is kept.
+        """
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is None or entry.version != old_version:
+                return
+            entry.version = new_version
+            entry.ops = GraphOps(entry.index)
+            entry.reports = {}
+            self._weight += entry.index.weight() - entry.weight
+            entry.weight = entry.index.weight()
+            self._entries.move_to_end(graph_id)
+
+    def invalidate(self, graph_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(graph_id, None)
+            if entry is not None:
+                self._weight -= entry.weight
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    # ----------------------------- private --------------------------------
+    def _put(self, entry: CachedIndex) -> None:
+        if entry.weight > self.max_weight:
+            self.invalidate(entry.graph_id)
+            return
+        with self._lock:
+            old = self._entries.pop(entry.graph_id, None)
+            if old is not None:
+                if old.version > entry.version:
+                    # a newer version raced us in; keep it
+                    self._entries[old.graph_id] = old
+                    return
+                self._weight -= old.weight
+            self._entries[entry.graph_id] = entry
+            self._weight += entry.weight
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._weight > self.max_weight
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= evicted.weight
@@ -0,0 +1,54 @@
+"""Small builders for schema objects used across the test-suite."""
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+from src.schemas.edge import ContributesToEdge, DependencyEdge
+from src.schemas.graph import Graph
+from src.schemas.node import GoalNode
+
+T0 = datetime(2025, 1, 1)
+
+
+def goal(
+    node_id: str,
+    *,
+    parent: Optional[str] = None,
+    hours: float = 0,
+    start: Optional[datetime] = None,
+    metrics: Optional[List[dict]] = None,
+    nodes: Optional[List[GoalNode]] = None,
+    edges: Optional[List[Any]] = None,
+    status: str = "not-started",
+) -> GoalNode:
+    start = start or T0
+    return GoalNode(
+        node_id=node_id,
+        title=node_id,
+        parent=parent,
+        status=status,
+        nodes=nodes or [],
+        edges=edges or [],
+        smarter={
+            "smarter": {
+                "specific": {"label": node_id, "statement": node_id},
+                "measurable": [
+                    {"description": m["metric_id"], "name": m["metric_id"], "type": "quantitative", **m}
+                    for m in (metrics or [])
+                ],
+                "relevant": {"relevance_to_root": {"node_id": 0, "explanation": "-", "confidence": 1.0}},
+                "time_bound": {"start": start, "due": start + timedelta(hours=hours)},
+            }
+        },
+    )
+
+
+def dep(edge_id: str, u: str, v: str, **kw: Any) -> DependencyEdge:
+    return DependencyEdge(edge_id=edge_id, from_node=u, to_node=v, **kw)
+
+
+def contrib(edge_id: str, u: str, v: str, **kw: Any) -> ContributesToEdge:
+    return ContributesToEdge(edge_id=edge_id, from_node=u, to_node=v, **kw)
+
+
+def graph(graph_id: str = "g", nodes: Optional[List[GoalNode]] = None, edges: Optional[List[Any]] = None) -> Graph:
+    return Graph(graph_id=graph_id, nodes=nodes or [], edges=edges or [])
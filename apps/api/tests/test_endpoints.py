@@ -0,0 +1,181 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.deps import get_graph_store
+from src.main import app
+from src.services.graph_store import GraphStore
+
+from tests.factories import contrib, dep, goal, graph
+
+G = "/api/v1/graph"
+
+
+@pytest.fixture
+def store():
+    store = GraphStore()
+    app.dependency_overrides[get_graph_store] = lambda: store
+    yield store
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(app)
+
+
+def _json(model):
+    return model.model_dump(mode="json", by_alias=True)
+
+
+def test_get_graph_negotiates_gzip_by_accept_encoding_tokens(store, client):
+    store.create(graph("z", nodes=[goal(f"n{i}") for i in range(8)]))
+
+    def encoding(accept):
+        r = client.get(f"{G}/z", headers={"Accept-Encoding": accept})
+        assert r.status_code == 200 and r.json()["graphId"] == "z"
+        assert r.headers["vary"] == "Accept-Encoding"
+        return r.headers.get("content-encoding")
+
+    assert encoding("gzip") == "gzip"
+    assert encoding("br, GZIP;q=0.5") == "gzip"
+    assert encoding("*") == "gzip"
+    assert encoding("gzip;q=0") is None
+    assert encoding("gzip;q=0, *") is None          # refused explicitly, not covered by *
+    assert encoding("x-gzipish, identity") is None  # not a substring match
+    assert encoding("identity") is None
+
+
+def test_get_graph_sets_vary_on_bodies_too_small_to_gzip(store, client):
+    store.create(graph("s"))
+    r = client.get(f"{G}/s", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers and r.headers["vary"] == "Accept-Encoding"
+
+
+def test_get_graph_answers_304_while_the_etag_is_current(store, client):
+    store.create(graph("e", nodes=[goal("a")]))
+    r = client.get(f"{G}/e")
+    etag = r.headers["etag"]
+    assert r.status_code == 200 and etag.startswith('"')
+    for match in (etag, f'W/{etag}', f'"x", {etag}', "*"):
+        r = client.get(f"{G}/e", headers={"If-None-Match": match})
+        assert r.status_code == 304 and r.headers["etag"] == etag and not r.content
+    assert client.get(f"{G}/e", headers={"If-None-Match": '"x"'}).status_code == 200
+
+    client.post("/api/v1/graphs/e/nodes", json=_json(goal("b")))
+    r = client.get(f"{G}/e", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_deleting_a_missing_node_or_edge_keeps_the_etag(store, client):
+    store.create(graph("m", nodes=[goal("a")]))
+    etag, version = client.get(f"{G}/m").headers["etag"], store.version("m")
+    assert client.delete("/api/v1/graphs/m/nodes/ghost").status_code == 404
+    assert client.delete("/api/v1/graphs/m/edges/ghost").status_code == 404
+    assert store.version("m") == version
+    assert client.get(f"{G}/m", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_writes_reply_with_a_delta_when_asked(store, client):
+    store.create(graph("d", nodes=[goal("p")]))
+    base = store.version("d")
+    r = client.post("/api/v1/graphs/d/nodes", json=_json(goal("q", parent="p")), headers={"Prefer": "return=minimal"})
+    body = r.json()
+    assert r.status_code == 200 and r.headers["preference-applied"] == "return=minimal"
+    assert body["base_version"] == base and body["version"] == store.version("d") > base
+    assert [(p["op"], p["path"]) for p in body["patch"]] == [("add", "/nodes/0/nodes/0")]
+    assert body["entity"]["nodeId"] == "q"
+
+    r = client.delete("/api/v1/graphs/d/nodes/q", params={"response": "delta"})
+    assert [(p["op"], p["path"]) for p in r.json()["patch"]] == [("remove", "/nodes/0/nodes/0")]
+
+    r = client.post("/api/v1/graphs/d/nodes", json=_json(goal("r")))   # no preference: the full graph
+    assert r.status_code == 200 and r.json()["graphId"] == "d" and "preference-applied" not in r.headers
+
+
+def test_cycle_closing_edges_answer_409_with_the_cycle(store, client):
+    store.create(graph("c", nodes=[goal("p"), goal("q"), goal("r")], edges=[dep("1", "p", "q"), dep("2", "q", "r")]))
+    version = store.version("c")
+    r = client.post("/api/v1/graphs/c/edges", json=_json(dep("3", "r", "p")))
+    assert r.status_code == 409
+    assert r.json()["detail"] == {
+        "message": "Dependency edge would create a cycle: r -> p -> q -> r",
+        "edgeId": "3",
+        "cycle": ["r", "p", "q", "r"],
+    }
+    r = client.post("/api/v1/graphs/c/edges:bulk", json={"edges": [_json(dep("4", "p", "r")), _json(dep("5", "r", "q"))]})
+    assert r.status_code == 409 and r.json()["detail"]["edgeId"] == "5"
+    assert store.version("c") == version and [e.edge_id for e in store.load("c").edges] == ["1", "2"]
+
+
+def test_cascade_dry_run_reports_without_deleting(store, client):
+    store.create(graph("k", nodes=[goal("p"), goal("q", nodes=[goal("s", parent="q")]), goal("r")],
+                       edges=[dep("1", "p", "q"), dep("2", "s", "r"), dep("3", "p", "r")]))
+    version = store.version("k")
+    r = client.delete("/api/v1/graphs/k/nodes/q", params={"dryRun": "true"})
+    report = r.json()
+    assert r.status_code == 200 and report["dry_run"] is True and report["node_id"] == "q"
+    assert sorted(report["node_ids"]) == ["q", "s"] and sorted(report["edge_ids"]) == ["1", "2"]
+    assert store.version("k") == version
+    assert client.delete("/api/v1/graphs/k/nodes/ghost", params={"dryRun": "true"}).status_code == 404
+
+    client.delete("/api/v1/graphs/k/nodes/q")
+    assert [e.edge_id for e in store.load("k").edges] == ["3"]
+
+
+def test_batch_errors_name_the_failing_op_and_apply_nothing(store, client):
+    store.create(graph("b", nodes=[goal("u"), goal("w")], edges=[dep("b1", "u", "w")]))
+    version, before = store.version("b"), store.load("b").model_dump()
+
+    def batch(*ops):
+        return client.post("/api/v1/graphs/b:batch", json={"ops": list(ops)})
+
+    r = batch({"op": "delete_node", "nodeId": "u"}, {"op": "reparent", "nodeId": "w", "parentId": "ghost"})
+    assert r.status_code == 422
+    assert r.json()["detail"] == {"message": "Parent node 'ghost' not found for reparent", "index": 1, "op": "reparent"}
+
+    r = batch({"op": "upsert_node", "node": _json(goal("z"))}, {"op": "upsert_edge", "edge": _json(dep("b2", "w", "u"))})
+    assert r.status_code == 409
+    assert r.json()["detail"] == {
+        "message": "Dependency edge would create a cycle: w -> u -> w",
+        "edgeId": "b2",
+        "cycle": ["w", "u", "w"],
+        "index": 1,
+        "op": "upsert_edge",
+    }
+    assert store.version("b") == version and store.load("b").model_dump() == before
+
+    assert batch({"op": "delete_node", "nodeId": "u"}, {"op": "bogus"}).status_code == 422   # rejected as a whole
+    r = batch({"op": "delete_edge", "edgeId": "ghost"}, {"op": "delete_node", "nodeId": "u"})
+    assert r.status_code == 200
+    assert [(x["index"], x["status"]) for x in r.json()["results"]] == [(0, "not_found"), (1, "deleted")]
+    assert r.json()["results"][1]["edge_ids"] == ["b1"]
+
+
+def test_edge_to_an_unknown_node_answers_422_and_is_not_stored(store, client):
+    store.create(graph("u", nodes=[goal("a")]))
+    version = store.version("u")
+    r = client.post("/api/v1/graphs/u/edges", json=_json(dep("e1", "a", "ghost")))
+    assert r.status_code == 422 and r.json()["detail"] == "Edge e1 references unknown node(s): ['ghost']"
+    r = client.post("/api/v1/graphs/u/edges:bulk", json={"edges": [_json(dep("e2", "a", "a")), _json(dep("e3", "ghost", "a"))]})
+    assert r.status_code == 422
+    r = client.post("/api/v1/graphs/u/nodes", json=_json(goal("b", nodes=[goal("a", parent="b")])))
+    assert r.status_code == 422 and r.json()["detail"] == "Duplicate node_id: a"
+    assert store.version("u") == version and store.load("u").edges == []
+    assert client.get("/api/v1/graphs/u/validate").json()["ok"]
+
+
+def test_edge_pages_walk_root_and_owned_edges_sharing_an_id(store, client):
+    store.create(graph("p", nodes=[goal("a", edges=[contrib("x", "a", "b", weight=0.5)]), goal("b")],
+                       edges=[dep("x", "a", "b"), dep("y", "b", "a")]))
+    seen, cursor = [], None
+    while True:
+        r = client.get("/api/v1/graphs/p/edges", params={"limit": 1, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += [(e["edgeId"], e["kind"]) for e in r.json()["items"]]
+        if not (cursor := r.json()["next_cursor"]):
+            break
+    assert seen == [("x", "dependency"), ("y", "dependency"), ("x", "contributes_to")]
+
+    cursor = client.get("/api/v1/graphs/p/nodes", params={"limit": 1}).json()["next_cursor"]
+    client.delete("/api/v1/graphs/p/nodes/a")
+    assert client.get("/api/v1/graphs/p/nodes", params={"cursor": cursor}).status_code == 400
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from src.services import graph_export
+from src.services.graph_locator import GraphLocator
+from src.services.graph_store import GraphStore
+
+from tests.factories import contrib, dep, goal, graph
+
+
+def _graph():
+    tree = goal("a", nodes=[goal("b", nodes=[goal("c")]), goal("d", status="done")],
+                edges=[contrib("own", "a", "b", weight=0.5)])
+    return graph("g", nodes=[tree, goal("e")], edges=[dep("e1", "a", "e"), dep("e2", "c", "e")])
+
+
+def test_rows_are_preorder_with_nesting_parents_and_filters():
+    g = _graph()
+    rows = [(n.node_id, parent) for n, parent in graph_export.node_rows(g)]
+    assert rows == [("a", None), ("b", "a"), ("c", "b"), ("d", "a"), ("e", None)]
+    assert [n.node_id for n, _ in graph_export.node_rows(g, statuses={"done"})] == ["d"]
+    assert [graph_export.edge_key(r) for r in graph_export.edge_rows(g)] == [(None, "e1"), (None, "e2"), ("a", "own")]
+    assert [e.edge_id for e, _ in graph_export.edge_rows(g, kinds={"contributes_to"})] == ["own"]
+
+    line = json.loads(graph_export.node_line(next(r for r in graph_export.node_rows(g) if r[0].node_id == "c")))
+    assert line["parent"] == "b" and "nodes" not in line
+    assert json.loads(graph_export.edge_line((g.nodes[0].edges[0], "a")))["kind"] == "contributes_to"
+
+
+def _walk(g, rows, after, key, limit, **filters):
+    seen, cursor = [], None
+    while True:
+        items, cursor = graph_export.page(rows(g, after=after(cursor), **filters), key, limit)
+        seen += [key(r) for r in items]
+        if cursor is None:
+            return seen
+
+
+def test_pages_walk_every_row_once_and_reject_stale_cursors():
+    g = _graph()
+    nodes = ["a", "b", "c", "d", "e"]
+    for limit in (1, 2, 3, 5, 6):
+        assert _walk(g, graph_export.node_rows, graph_export.node_after, graph_export.node_key, limit) == nodes
+    assert _walk(g, graph_export.node_rows, graph_export.node_after, graph_export.node_key, 1, kinds={"goal"}) == nodes
+    assert _walk(g, graph_export.node_rows, graph_export.node_after, graph_export.node_key, 1, statuses={"done"}) == ["d"]
+
+    _, cursor = graph_export.page(graph_export.node_rows(g), graph_export.node_key, 3)
+    g.nodes[0].nodes[0].nodes = []                   # "c" was the last row returned
+    with pytest.raises(ValueError):
+        graph_export.page(graph_export.node_rows(g, after=graph_export.node_after(cursor)), graph_export.node_key, 3)
+    for bad in ("not-a-cursor", graph_export.encode_cursor(["a", "b"])):
+        with pytest.raises(ValueError):
+            graph_export.node_after(bad)
+    with pytest.raises(ValueError):
+        graph_export.edge_after(graph_export.encode_cursor("e1"))
+
+
+def test_edge_pages_tell_root_and_node_owned_edges_with_one_id_apart():
+    tree = goal("a", nodes=[goal("b", edges=[contrib("x", "b", "a", weight=0.5), contrib("y", "b", "a", weight=0.5)])],
+                edges=[contrib("x", "a", "b", weight=0.5)])
+    g = graph("g", nodes=[tree, goal("c")], edges=[dep("x", "a", "c"), dep("r", "b", "c")])
+    keys = [(None, "x"), (None, "r"), ("a", "x"), ("b", "x"), ("b", "y")]
+    assert [graph_export.edge_key(r) for r in graph_export.edge_rows(g)] == keys
+    for limit in (1, 2, 4):
+        assert _walk(g, graph_export.edge_rows, graph_export.edge_after, graph_export.edge_key, limit) == keys
+
+    _, cursor = graph_export.page(graph_export.edge_rows(g), graph_export.edge_key, 4)   # ends at ("b", "x")
+    g.nodes[0].nodes[0].edges.pop(0)
+    with pytest.raises(ValueError):
+        list(graph_export.edge_rows(g, after=graph_export.edge_after(cursor)))
+
+
+def test_pages_resume_through_the_locator_without_rewalking_earlier_rows():
+    g = graph("g", nodes=[goal(f"n{i}", nodes=[goal(f"n{i}.0")]) for i in range(50)])
+    loc = GraphLocator(g)
+    rows = graph_export.node_rows(g, after="n40", locate=lambda: loc)
+    assert [n.node_id for n, _ in rows] == ["n40.0"] + [f"n{i}{s}" for i in range(41, 50) for s in ("", ".0")]
+    g.nodes[:40] = [None] * 40                       # earlier rows are never touched
+    assert next(graph_export.node_rows(g, after="n41.0", locate=lambda: loc))[0].node_id == "n42"
+
+
+def test_ndjson_stream_pins_one_version_until_it_is_consumed(monkeypatch):
+    monkeypatch.setattr(graph_export, "CHUNK_ROWS", 2)
+    store = GraphStore()
+    store.save(_graph())
+    with pytest.raises(KeyError):
+        graph_export.ndjson(store, "missing", graph_export.node_rows, graph_export.node_line)
+
+    streamed = store.load("g")
+    chunks = graph_export.ndjson(store, "g", graph_export.node_rows, graph_export.node_line)
+    with store.write("g") as m:                      # copy-on-write: the stream keeps its version
+        m.upsert_node(goal("late"))
+    assert m.graph is not streamed
+    body = b"".join(chunks)
+    assert [json.loads(x)["nodeId"] for x in body.splitlines()] == ["a", "b", "c", "d", "e"]
+
+    with store.write("g") as m:                      # released: edits go in place again
+        m.upsert_node(goal("later"))
+    assert store.load("g") is m.graph
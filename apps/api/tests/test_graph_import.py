@@ -0,0 +1,45 @@
+import asyncio
+
+from pydantic import TypeAdapter
+
+from src.schemas.node import NodeUnion
+from src.services import graph_import
+from src.services.graph_mutations import GraphMutator
+from src.services.graph_store import GraphStore
+
+from tests.factories import goal, graph
+
+
+async def _chunked(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def _batches(body: bytes, chunk: int, size: int):
+    async def collect():
+        return [b async for b in graph_import.ndjson_batches(_chunked(body, chunk), size)]
+    return asyncio.run(collect())
+
+
+def test_batches_split_lines_across_arbitrary_chunk_boundaries():
+    body = b'{"a":1}\n\n{"b":2}\n{"c":3}\n{"d":4}'          # blank line, no trailing newline
+    for chunk in (1, 3, 7, 100):
+        batches = _batches(body, chunk, 2)
+        assert batches == [[(1, b'{"a":1}'), (3, b'{"b":2}')], [(4, b'{"c":3}'), (5, b'{"d":4}')]]
+
+
+def test_apply_batch_reports_bad_lines_and_applies_the_rest():
+    store = GraphStore()
+    store.save(graph("g", nodes=[goal("root")]))
+    lines = [
+        goal("a", parent="root").model_dump_json(by_alias=True).encode(),
+        b"{broken",
+        goal("b", parent="missing").model_dump_json(by_alias=True).encode(),
+        goal("c", parent="a").model_dump_json(by_alias=True).encode(),
+    ]
+    report = graph_import.ImportReport(max_errors=1)
+    graph_import.apply_batch(store, "g", list(enumerate(lines, 1)), TypeAdapter(NodeUnion), GraphMutator.upsert_node, report)
+
+    assert (report.lines, report.applied, report.failed) == (4, 2, 2)
+    assert [n for n, _ in report.errors] == [2]                 # capped at max_errors
+    assert [n.node_id for n in store.load("g").flatten_nodes()] == ["root", "a", "c"]
@@ -0,0 +1,226 @@
+import pytest
+
+from src.services.graph_index import GraphIndex
+from src.services.graph_ops import GraphOps
+
+from tests.factories import contrib, dep, goal, graph
+
+
+def _ops(nodes, edges) -> GraphOps:
+    return GraphOps(GraphIndex.from_graph(graph(nodes=nodes, edges=edges)))
+
+
+def _chain_ops():
+    # a -> b -> c -> d, a -> c ; plus x -(contributes_to)-> a, owned by x
+    return _ops(
+        [goal(n) for n in "abcd"] + [goal("x", edges=[contrib("5", "x", "a")])],
+        [dep("1", "a", "b"), dep("2", "b", "c"), dep("3", "c", "d"), dep("4", "a", "c")],
+    )
+
+
+def test_bfs_respects_kinds_direction_and_depth():
+    ops = _chain_ops()
+    assert ops.bfs("a", {"dependency"}) == ["a", "b", "c", "d"]
+    assert ops.bfs("a", {"dependency"}, depth=1) == ["a", "b", "c"]
+    assert ops.bfs("a", {"dependency"}, depth=0) == ["a"]
+    assert ops.bfs("d", {"dependency"}, direction="in") == ["d", "c", "b", "a"]
+    assert ops.bfs("x", {"dependency"}) == ["x"]
+    assert ops.bfs("x", None) == ["x", "a", "b", "c", "d"]
+    assert ops.bfs("missing") == []
+
+
+def test_topological_order_and_shortest_hops():
+    ops = _chain_ops()
+    order = ops.topological_order()
+    pos = {n: i for i, n in enumerate(order)}
+    assert sorted(order) == list("abcdx")
+    assert pos["a"] < pos["b"] < pos["c"] < pos["d"]
+    assert ops.shortest_hops("a", "d", {"dependency"}) == ["a", "c", "d"]
+    assert ops.shortest_hops("d", "a", {"dependency"}) == []
+    assert ops.shortest_hops("d", "a", {"dependency"}, direction="in") == ["d", "c", "a"]
+
+
+def test_detect_cycles_and_topological_order_rejects_them():
+    ops = _ops(
+        [goal(n) for n in "abcs"],
+        [dep("1", "a", "b"), dep("2", "b", "c"), dep("3", "c", "a"), dep("4", "s", "s")],
+    )
+    cycles = sorted(sorted(c) for c in ops.detect_cycles())
+    assert cycles == [["a", "b", "c"], ["s"]]
+    with pytest.raises(ValueError):
+        ops.topological_order()
+
+
+def test_compact_view_is_dropped_on_delta():
+    idx = GraphIndex.from_graph(graph(nodes=[goal("a"), goal("b")]))
+    ops = GraphOps(idx)
+    assert ops.bfs("a", {"dependency"}) == ["a"]
+    idx.add_edge(dep("1", "a", "b"))
+    assert ops.bfs("a", {"dependency"}) == ["a", "b"]
+
+
+def _cpm_ops(**ab):
+    from datetime import timedelta
+    from tests.factories import T0
+
+    return _ops(
+        [goal("a", hours=10), goal("b", hours=5), goal("c", hours=20), goal("d", hours=1)],
+        [
+            dep("ab", "a", "b", lag_hours=2, **{k: (T0 + timedelta(hours=v) if k == "latest_finish" else v) for k, v in ab.items()}),
+            dep("ac", "a", "c", constraint="SS"),
+            dep("bd", "b", "d"),
+            dep("cd", "c", "d", constraint="FF"),
+        ],
+    )
+
+
+def test_critical_path_honours_constraints_and_lag():
+    cp = _cpm_ops().critical_path()
+    s = cp.schedule
+    assert (s["b"].es, s["b"].ef) == (12, 17)
+    assert (s["d"].es, s["d"].ef) == (19, 20)
+    assert cp.project_hours == 20
+    assert {n: s[n].slack_hours for n in "abcd"} == {"a": 0, "b": 2, "c": 0, "d": 0}
+    assert [n.node_id for n in cp.path] == ["a", "c", "d"]
+    assert cp.path[0].earliest_start == "2025-01-01T00:00:00"
+    assert cp.path[-1].latest_finish == "2025-01-01T20:00:00"
+
+
+def test_critical_path_hard_deadline_creates_negative_slack():
+    soft = _cpm_ops(latest_finish=15).critical_path().schedule
+    assert soft["b"].slack_hours == 2
+    hard = _cpm_ops(latest_finish=15, hard=True).critical_path().schedule
+    assert hard["b"].lf == 15 and hard["b"].slack_hours == -2
+    assert hard["a"].slack_hours == -2
+
+
+def test_critical_path_rejects_cycles():
+    ops = _ops([goal("a"), goal("b")], [dep("1", "a", "b"), dep("2", "b", "a")])
+    with pytest.raises(ValueError):
+        ops.critical_path()
+
+
+def _m(metric_id, value):
+    return {"metric_id": metric_id, "value": value, "target": 1}
+
+
+def _rollup_ops():
+    # leaves l1, l2 feed shared s; s and l3 feed top (contributes_to edges owned by sources)
+    return _ops(
+        [
+            goal("l1", metrics=[_m("m", 2), _m("ok", "no")], edges=[contrib("1", "l1", "s", weight=0.5, metric_ids=["m", "ok"])]),
+            goal("l2", metrics=[_m("m", 4), _m("ok", "yes")], edges=[contrib("2", "l2", "s", weight=1.0, metric_ids=["m"]),
+                                                                contrib("3", "l2", "ok", aggregation="boolean_or")]),
+            goal("s", metrics=[_m("m", 100), _m("ok", "no")], edges=[contrib("4", "s", "top", weight=0.25, aggregation="max")]),
+            goal("l3", metrics=[_m("m", 7)], edges=[contrib("5", "l3", "top", weight=0.75, aggregation="max")]),
+            goal("top", metrics=[_m("m", 0), _m("n", 3)]),
+            goal("ok", metrics=[_m("ok", False)]),
+        ],
+        [],
+    )
+
+
+def test_rollup_metrics_aggregates_shared_subdag_once():
+    ops = _rollup_ops()
+    # s: weighted_sum 0.5*2 + 1.0*4 ; its own "ok" stays (no numeric contribution for a string)
+    assert ops.rollup_metrics("s") == {"m": 5.0, "ok": "no"}
+    # top: max(s=5, l3=7); "n" has no contributors and keeps its own value
+    assert ops.rollup_metrics("top") == {"m": 7, "n": 3}
+    assert ops.rollup_metrics("ok") == {"ok": True}
+    full = ops.rollup_all()
+    assert full["top"] == {"m": 7, "n": 3} and full["l1"] == {"m": 2, "ok": "no"}
+    with pytest.raises(KeyError):
+        ops.rollup_metrics("missing")
+
+
+def test_rollup_aggregations_and_cycles():
+    from src.services.graph_rollup import aggregate
+
+    pairs = [(0.25, 4), (0.75, "8"), (1.0, "n/a")]
+    assert aggregate("weighted_sum", pairs) == 7.0
+    assert aggregate("avg", pairs) == 7.0
+    assert aggregate("avg", [(0.0, 1), (0.0, 3)]) == 2.0
+    assert (aggregate("min", pairs), aggregate("max", pairs)) == (4, 8.0)
+    assert aggregate("boolean_or", [(0, 0), (0, "true")]) is True
+    assert aggregate("max", [(1, "n/a")]) is None
+
+    ops = _ops([goal("a", edges=[contrib("1", "a", "b")]), goal("b", edges=[contrib("2", "b", "a")]), goal("c")], [])
+    assert ops.rollup_metrics("c") == {}
+    with pytest.raises(ValueError):
+        ops.rollup_metrics("a")
+    with pytest.raises(ValueError):
+        ops.rollup_all()
+
+
+def test_vectorized_rollup_matches_scalar_engine():
+    pytest.importorskip("numpy")
+    import random
+
+    rnd = random.Random(7)
+    aggs = ["weighted_sum", "avg", "min", "max", "boolean_or"]
+    values = [0, 1, 2.5, "3", "yes", "n/a", True]
+    n = 120
+    nodes = []
+    for i in range(n):
+        metrics = [_m(m, rnd.choice(values)) for m in ("m1", "m2", "m3") if rnd.random() < 0.6]
+        edges = [
+            contrib(f"{i}-{j}", str(i), str(j), weight=rnd.choice([0.0, 0.3, 1.0]), aggregation=rnd.choice(aggs),
+                    metric_ids=rnd.sample(["m1", "m2", "m3"], rnd.randrange(3)))
+            for j in rnd.sample(range(i + 1, n + 3), min(3, n + 2 - i))  # a few dangling targets too
+        ]
+        nodes.append(goal(str(i), metrics=metrics, edges=edges))
+    ops = _ops(nodes, [])
+
+    scalar = ops.rollup_all(vectorized=False)
+    fast_ops = GraphOps(ops.idx)
+    fast = fast_ops.rollup_all(vectorized=True)
+    assert scalar.keys() == fast.keys()
+    for nid in scalar:
+        assert scalar[nid] == pytest.approx(fast[nid]), nid
+    assert any(isinstance(v, bool) for row in fast.values() for v in row.values())
+    # the vectorized table seeds the per-node memo
+    assert fast_ops.rollup_metrics("119") == fast["119"]
+
+
+def test_bidirectional_hops_and_lag_weighted_path_match_brute_force():
+    import random
+
+    rnd = random.Random(3)
+    for _ in range(25):
+        n = rnd.randrange(2, 30)
+        edges = [(rnd.randrange(n), rnd.randrange(n), rnd.randrange(6)) for _ in range(rnd.randrange(3 * n))]
+        ops = _ops([goal(str(i)) for i in range(n)], [dep(f"e{k}", str(u), str(v), lag_hours=w) for k, (u, v, w) in enumerate(edges)])
+        hops = [[float("inf")] * n for _ in range(n)]
+        lag = [[float("inf")] * n for _ in range(n)]
+        for i in range(n):
+            hops[i][i] = lag[i][i] = 0
+        for u, v, w in edges:
+            hops[u][v] = min(hops[u][v], 1)
+            lag[u][v] = min(lag[u][v], w)
+        for k in range(n):
+            for i in range(n):
+                for j in range(n):
+                    hops[i][j] = min(hops[i][j], hops[i][k] + hops[k][j])
+                    lag[i][j] = min(lag[i][j], lag[i][k] + lag[k][j])
+        weight = {}
+        for u, v, w in edges:
+            weight[(str(u), str(v))] = min(weight.get((str(u), str(v)), w), w)
+
+        for a in range(n):
+            for b in range(n):
+                path = ops.shortest_hops(str(a), str(b), {"dependency"})
+                assert len(path) - 1 == hops[a][b] if path else hops[a][b] == float("inf")
+                back = ops.shortest_hops(str(b), str(a), {"dependency"}, direction="in")
+                assert len(back) == len(path)
+                path, cost = ops.shortest_path(str(a), str(b), {"dependency"})
+                assert cost == lag[a][b]
+                if path:
+                    assert (path[0], path[-1]) == (str(a), str(b))
+                    assert sum(weight[(x, y)] for x, y in zip(path, path[1:])) == cost
+
+
+def test_weighted_path_rejects_negative_lag():
+    ops = _ops([goal("a"), goal("b")], [dep("1", "a", "b", lag_hours=-2)])
+    assert ops.shortest_hops("a", "b") == ["a", "b"]
+    with pytest.raises(ValueError):
+        ops.shortest_path("a", "b")
@@ -0,0 +1,138 @@
+import random
+from array import array
+
+from src.services.graph_csr import CompactAdjacency, condense
+
+from tests.factories import dep, goal, graph
+from src.services.graph_index import GraphIndex
+from src.services.graph_ops import GraphOps
+
+
+def _csr(n, edges):
+    offsets = array("i", [0])
+    targets = array("i")
+    adj = [[] for _ in range(n)]
+    for u, v in edges:
+        adj[u].append(v)
+    for u in range(n):
+        targets.extend(adj[u])
+        offsets.append(len(targets))
+    csr = CompactAdjacency(ids=[str(i) for i in range(n)], n_nodes=n)
+    csr.index_of = {nid: i for i, nid in enumerate(csr.ids)}
+    return csr, (offsets, targets)
+
+
+def _reach(n, edges):
+    adj = [[] for _ in range(n)]
+    for u, v in edges:
+        adj[u].append(v)
+    out = []
+    for s in range(n):
+        seen, todo = {s}, [s]
+        while todo:
+            for v in adj[todo.pop()]:
+                if v not in seen:
+                    seen.add(v)
+                    todo.append(v)
+        out.append(seen)
+    return out
+
+
+def test_deep_chain_does_not_hit_recursion_limit():
+    n = 200_000
+    csr, plane = _csr(n, [(i, i + 1) for i in range(n - 1)])
+    cond = condense(csr, plane)
+    assert not cond.has_cycles
+    assert cond.order() == [str(i) for i in range(n)]
+
+    csr, plane = _csr(n, [(i, i + 1) for i in range(n - 1)] + [(n - 1, 0)])
+    cond = condense(csr, plane)
+    assert len(cond.members) == 1 and cond.has_cycles
+
+
+def test_condensation_matches_brute_force_on_random_graphs():
+    rnd = random.Random(7)
+    for _ in range(40):
+        n = rnd.randint(1, 25)
+        edges = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(rnd.randint(0, 2 * n))]
+        cond = condense(*_csr(n, edges))
+        reach = _reach(n, edges)
+
+        assert sorted(u for comp in cond.members for u in comp) == list(range(n))
+        for u, v in edges:
+            assert cond.comp_of[u] <= cond.comp_of[v]
+        for u in range(n):
+            for v in range(n):
+                same = u in reach[v] and v in reach[u]
+                assert (cond.comp_of[u] == cond.comp_of[v]) == same
+        for c, comp in enumerate(cond.members):
+            expected = len(comp) > 1 or (comp[0], comp[0]) in edges
+            assert bool(cond.cyclic[c]) == expected
+
+
+def test_graph_ops_topo_and_cycles_share_one_condensation():
+    g = graph(nodes=[goal(n) for n in "abc"], edges=[dep("1", "a", "b"), dep("2", "b", "c")])
+    ops = GraphOps(GraphIndex.from_graph(g))
+    assert ops.condensation() is ops.condensation()
+    assert ops.topological_order() == ["a", "b", "c"]
+    assert ops.detect_cycles() == []
+
+
+def test_reachability_index_matches_brute_force_across_inserts():
+    rnd = random.Random(11)
+    for trial in range(20):
+        n = rnd.randrange(2, 40)
+        edges = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(rnd.randrange(n * 2))]
+        if trial % 2:  # mostly-DAG graphs exercise the interval labels more than SCCs
+            edges = [(u, v) for u, v in edges if u < v]
+        g = graph(nodes=[goal(str(i)) for i in range(n)], edges=[dep(f"e{k}", str(u), str(v)) for k, (u, v) in enumerate(edges)])
+        idx = GraphIndex.from_graph(g)
+        ops = GraphOps(idx)
+        pairs = [(str(a), str(b)) for a in range(n) for b in range(n)]
+        expected = _reach(n, edges)
+        assert ops.reachable(pairs) == [int(b) in expected[int(a)] for a, b in pairs]
+
+        reach = idx.reachability("dependency")
+        for k in range(5):
+            u, v = rnd.randrange(n), rnd.randrange(n)
+            edges.append((u, v))
+            idx.add_edge(dep(f"x{k}", str(u), str(v)))
+        assert idx.reachability("dependency") is reach  # maintained, not rebuilt
+        expected = _reach(n, edges)
+        assert GraphOps(idx).reachable(pairs) == [int(b) in expected[int(a)] for a, b in pairs]
+
+    assert ops.reachable([("0", "missing"), ("missing", "missing"), ("0", "0")]) == [False, False, True]
+
+
+
+def test_maintained_topo_order_rejects_exactly_the_cycle_closing_edges():
+    from src.services.graph_topo import CycleError
+    from src.services.graph_mutations import GraphMutator
+
+    rnd = random.Random(5)
+    for trial in range(10):
+        n = rnd.randrange(2, 30)
+        g = graph(nodes=[goal(str(i)) for i in range(n)])
+        m = GraphMutator(g, acyclic=True)
+        edges = {}
+        for k in range(n * 3):
+            if edges and rnd.random() < 0.2:
+                eid = rnd.choice(list(edges))
+                del edges[eid]
+                m.delete_edge(eid)
+            u, v = rnd.randrange(n), rnd.randrange(n)
+            closes = u == v or u in _reach(n, list(edges.values()))[v]
+            try:
+                m.upsert_edge(dep(f"e{k}", str(u), str(v)))
+            except CycleError as e:
+                assert closes and e.edge_id == f"e{k}"
+                assert e.path[0] == e.path[-1] == str(u) and e.path[1] == str(v)
+                present = {(str(a), str(b)) for a, b in edges.values()}
+                assert all(step in present for step in zip(e.path[1:], e.path[2:]))
+                continue
+            assert not closes
+            edges[f"e{k}"] = (u, v)
+        order = m.topo().order()
+        pos = {x: i for i, x in enumerate(order)}
+        assert sorted(order, key=int) == [str(i) for i in range(n)]
+        assert all(pos[str(u)] < pos[str(v)] for u, v in edges.values())
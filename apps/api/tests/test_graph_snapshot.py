@@ -0,0 +1,78 @@
+import random
+
+from src.services.graph_index import GraphIndex
+from src.services.graph_ops import GraphOps
+from src.services.graph_snapshot import SnapshotIndex, open_snapshot, write_snapshot
+
+from tests.factories import contrib, dep, goal, graph
+
+
+def _random_graph(seed: int, n: int = 40):
+    rng = random.Random(seed)
+    nodes = [goal(f"n{i}", hours=rng.randint(0, 5), metrics=[{"metric_id": "m", "value": rng.randint(0, 9), "target": 9}])
+             for i in range(n)]
+    for i in range(1, n, 4):  # some nesting
+        nodes[i - 1].nodes.append(nodes[i].model_copy(update={"parent": f"n{i - 1}"}))
+    roots = [x for i, x in enumerate(nodes) if i % 4 != 1]
+    edges = []
+    for k in range(3 * n):
+        u, v = sorted(rng.sample(range(n), 2))
+        edges.append(dep(f"d{k}", f"n{u}", f"n{v}", lag_hours=rng.randint(0, 3)))
+    owned = [contrib(f"c{k}", f"n{k + 1}", f"n{k}", weight=0.5) for k in range(0, n - 1, 3)]
+    roots[0].edges.extend(owned)
+    g = graph("g", nodes=roots, edges=edges)
+    g.edges.append(dep("dangling", "n0", "ghost"))  # bypasses the invariant check: interned, not a node
+    return g
+
+
+def test_mapped_snapshot_answers_like_the_live_index(tmp_path):
+    for seed in range(3):
+        g = _random_graph(seed)
+        live = GraphIndex.from_graph(g)
+        path = str(tmp_path / f"{seed}.lhgs")
+        write_snapshot(live, "g", path)
+        mapped = open_snapshot(path)
+        a, b = GraphOps(live), GraphOps(mapped)
+
+        assert b.topological_order() == a.topological_order()
+        assert b.bfs("n0", {"dependency"}) == a.bfs("n0", {"dependency"})
+        pairs = [(f"n{i}", f"n{j}") for i in range(0, 40, 3) for j in range(0, 40, 5)] + [("n0", "ghost")]
+        assert b.reachable(pairs) == a.reachable(pairs)
+        assert b.shortest_path("n0", "n39") == a.shortest_path("n0", "n39")
+        assert not mapped._nodes and not mapped._edges      # structure only: nothing decoded yet
+
+        assert b.rollup_all(vectorized=False) == a.rollup_all(vectorized=False)
+        assert b.critical_path().project_hours == a.critical_path().project_hours
+        for nid in ("n0", "n2", "n39"):
+            assert mapped.id_to_node[nid].model_dump(serialize_as_any=True) == \
+                live.id_to_node[nid].model_dump(serialize_as_any=True)
+        assert "ghost" not in mapped.id_to_node and len(mapped.id_to_node) == len(live.id_to_node)
+
+
+def test_sqlite_store_serves_cold_reads_from_the_mapped_snapshot(tmp_path):
+    from src.services.graph_store_sqlite import SqliteGraphStore
+
+    def open_store():
+        return SqliteGraphStore(str(tmp_path / "graphs.db"), flush_interval=60, snapshot_dir=str(tmp_path / "snaps"))
+
+    store = open_store()
+    store.create(graph("a", nodes=[goal("x", nodes=[goal("y", parent="x")])], edges=[dep("e", "x", "y")]))
+    store.flush()
+    assert store.compact() == 1                            # writes the binary snapshot
+    store.close()
+
+    store = open_store()
+    with store.read("a", mapped=True) as snap:
+        assert snap.graph is None and isinstance(snap.ops.idx, SnapshotIndex)
+        assert snap.ops.topological_order() == ["x", "y"]
+        assert snap.node("y").parent == "x"
+
+    with store.write("a") as m:                            # logged op: the mapping is stale now
+        m.delete_edge("e")
+        m.upsert_edge(dep("e2", "y", "x"))
+    store.flush()
+    store._by_id.clear()
+    with store.read("a", mapped=True) as snap:
+        assert snap.graph is not None
+        assert snap.ops.topological_order() == ["y", "x"]
+    store.close()
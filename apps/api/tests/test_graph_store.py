@@ -0,0 +1,463 @@
+import gzip
+import json
+import threading
+
+from src.schemas.graph import Graph
+from src.services.graph_store import GraphSession, GraphStore
+from src.services.graph_validation import ISSUE_CODES, GraphValidator
+from src.services.index_cache import IndexCache
+
+from tests.factories import contrib, dep, goal, graph
+
+
+def test_save_bumps_version_monotonically():
+    store = GraphStore()
+    store.save(graph("a"))
+    v1 = store.version("a")
+    store.save(store.load("a"))
+    assert store.version("a") > v1
+
+
+def test_index_cache_reuses_unchanged_graph_and_rebuilds_on_save():
+    store = GraphStore()
+    g = graph("a", nodes=[goal("x"), goal("y")], edges=[dep("e1", "x", "y")])
+    store.save(g)
+
+    first = store.index_cache.get("a", store.version("a"), g)
+    assert store.index_cache.get("a", store.version("a"), g) is first
+
+    store.save(g)
+    second = store.index_cache.get("a", store.version("a"), g)
+    assert second is not first
+    assert len(store.index_cache) == 1
+
+
+def test_index_cache_evicts_lru_and_respects_weight_cap():
+    cache = IndexCache(max_entries=2, max_weight=10)
+    small = [graph(gid, nodes=[goal("x")]) for gid in ("a", "b", "c")]
+    for v, g in enumerate(small, start=1):
+        cache.get(g.graph_id, v, g)
+    assert cache.peek("a", 1) is None
+    assert cache.peek("c", 3) is not None
+
+    big = graph("big", nodes=[goal(f"n{i}") for i in range(20)])
+    cache.get("big", 9, big)
+    assert cache.peek("big", 9) is None
+    assert cache.weight <= 10
+
+
+def test_body_cache_serves_one_version_until_the_next_save():
+    store = GraphStore()
+    store.save(graph("a", nodes=[goal(f"n{i}") for i in range(20)]))
+    with store.read("a") as snap:
+        first = snap.body()
+        assert snap.body() is first
+        assert gzip.decompress(first.gzipped) == first.body
+        assert json.loads(first.body)["nodes"][3]["nodeId"] == "n3"
+
+    with store.write("a") as m:
+        m.upsert_node(goal("extra"))
+    with store.read("a") as snap:
+        second = snap.body()
+    assert second.etag != first.etag and second.version > first.version
+    assert len(store.body_cache) == 1
+
+    with store.write("a") as m:                    # same content again: same strong ETag
+        m.delete_node("extra")
+    with store.read("a") as snap:
+        assert snap.body().etag == first.etag
+
+
+def test_validator_reports_every_code_and_is_kept_per_version():
+    store = GraphStore()
+    m_ok = [{"metric_id": "m", "value": 0, "target": 1}]
+    # writes cannot introduce a duplicate id (GraphMutator rejects it): start from one
+    store.save(Graph.model_construct(
+        graph_id="v",
+        nodes=[goal("a", metrics=m_ok), goal("b"), goal("h", nodes=[goal("b")])],
+        edges=[dep("d1", "a", "b"), dep("d2", "b", "a")],
+    ))
+    with store.read("v") as snap:
+        live = snap.validator()
+        reports = snap.reports()
+        assert [v.code for v in live.report(snap.ops)[0]] == ["duplicate-node", "cycle-detected"]
+
+    with store.write("v") as m:
+        m.attach_edge("a", dep("x", "a", "ghost"))   # node-owned: root edges to unknown nodes are rejected
+        m.attach_edge("b", contrib("c", "b", "a", metric_ids=["m", "nope"]))
+        m.upsert_node(goal("k"))
+        m.upsert_node(goal("k", parent="zz"))       # replaced in place, claiming an unknown parent
+    with store.read("v") as snap:
+        assert snap.validator() is live                 # carried over by the in-place write
+        assert snap.reports() is not reports and snap.reports() is snap.reports()
+        issues, truncated = live.report(snap.ops)
+        assert [v.code for v in issues] == list(ISSUE_CODES) and not truncated
+        assert [v.message for v in issues] == [v.message for v in GraphValidator.from_graph(snap.graph).report(snap.ops)[0]]
+
+        first_two, truncated = live.report(snap.ops, max_issues=2)
+        assert [v.code for v in first_two] == ["unknown-node", "duplicate-node"] and truncated
+        audit = GraphValidator()
+        assert len(audit.audit(snap.graph, max_issues=1)) == 1 and audit.truncated
+
+
+def test_write_edits_in_place_unless_a_reader_holds_the_graph():
+    store = GraphStore()
+    store.create(graph("a", nodes=[goal("x")]))
+    live = store.load("a")
+    idx = store.index_cache.get("a", store.version("a"), live)
+
+    with store.write("a") as m:                  # nobody pinned: in place, index kept in step
+        m.upsert_node(goal("y"))
+    assert store.load("a") is live
+    assert store.index_cache.peek("a", store.version("a")) is idx
+    assert "y" in idx.index.id_to_node
+
+    with store.read("a") as snap:                # pinned: the writer publishes a copy
+        with store.write("a") as m:
+            m.upsert_node(goal("z"))
+        assert [n.node_id for n in snap.graph.nodes] == ["x", "y"]
+        assert snap.ops.bfs("x", {"dependency"}) == ["x"]
+        assert store.version("a") > snap.version
+    assert [n.node_id for n in store.load("a").nodes] == ["x", "y", "z"]
+    assert store.load("a") is not live and not store.create(graph("a"))
+
+
+def test_store_keeps_the_locator_with_the_graph_between_writes():
+    store = GraphStore()
+    store.create(graph("l", nodes=[goal("a")]))
+    with store.write("l") as m:
+        m.upsert_node(goal("b"))
+    loc = m.locator(build=False)
+    with store.write("l") as m:
+        m.upsert_node(goal("c", parent="b"))
+    assert m.locator(build=False) is loc and loc.node("c") is not None
+    with store.read("l") as snap:
+        assert snap.locator() is loc
+        with store.write("l") as m:               # pinned: the copy gets its own
+            m.delete_node("c")
+        assert m.locator(build=False) is not loc
+    with store.read("l") as snap:
+        assert snap.locator() is m.locator(build=False) and snap.locator().node("c") is None
+
+
+def test_store_keeps_the_maintained_order_with_the_graph_between_writes():
+    store = GraphStore()
+    store.create(graph("t", nodes=[goal(n) for n in "abc"]))
+    with store.write("t") as m:
+        m.upsert_edge(dep("1", "b", "c"))
+    topo = m.topo(build=False)
+    with store.write("t") as m:
+        m.upsert_edge(dep("2", "a", "b"))
+    assert topo is not None and m.topo(build=False) is topo
+    with store.read("t") as snap:
+        assert snap.topo() is topo and snap.topo().order() == ["a", "b", "c"]
+
+
+def test_graph_schema_does_not_import_services():
+    import subprocess
+    import sys
+
+    code = "import sys, src.schemas.graph; sys.exit(any(m.startswith('src.services') for m in sys.modules))"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_store_writes_reject_dependency_cycles_before_any_edit():
+    import pytest
+    from src.services.graph_topo import CycleError
+
+    store = GraphStore()
+    store.create(graph("c", nodes=[goal(n) for n in "abcd"], edges=[dep("1", "a", "b"), dep("2", "b", "c")]))
+    before = store.load("c").model_dump_json()
+
+    with pytest.raises(CycleError) as err:
+        with store.write("c") as m:
+            m.upsert_edge(dep("3", "c", "a"))
+    assert err.value.edge_id == "3" and err.value.path == ["c", "a", "b", "c"]
+    with pytest.raises(CycleError):             # all or nothing: "4" is fine on its own
+        with store.write("c") as m:
+            m.upsert_edges([dep("4", "c", "d"), dep("5", "d", "a")])
+    with pytest.raises(CycleError):             # edges carried by a node are checked too
+        with store.write("c") as m:
+            m.upsert_node(goal("d", edges=[dep("6", "d", "a"), dep("7", "c", "d")]))
+    assert store.load("c").model_dump_json() == before
+
+    with store.write("c") as m:                 # replacing an edge frees its old direction
+        m.upsert_edge(dep("2", "c", "b"))
+        m.upsert_edges([dep("3", "b", "d"), dep("4", "c", "d")])
+        m.delete_edge("1")
+        m.upsert_edge(dep("5", "b", "a"))
+    with store.read("c") as snap:
+        order = snap.topo().order()
+        assert order[:2] == ["c", "b"] and sorted(order[2:]) == ["a", "d"]
+
+
+def test_concurrent_writers_and_pinned_readers_see_consistent_graphs():
+    store = GraphStore()
+    store.create(graph("a"))
+    errors = []
+
+    def writer(w):
+        for i in range(50):
+            with store.write("a") as m:
+                m.upsert_node(goal(f"w{w}-{i}"))
+
+    def reader():
+        for _ in range(100):
+            session = GraphSession(store)
+            snap = session.read("a")
+            before = [n.node_id for n in snap.graph.nodes]
+            if len(snap.ops.idx.id_to_node) != len(before):
+                errors.append("index and graph disagree")
+            if [n.node_id for n in snap.graph.nodes] != before:
+                errors.append("snapshot changed while pinned")
+            session.close()
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(3)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(store.load("a").nodes) == 150
+
+
+def _sqlite(tmp_path, **kw):
+    from src.services.graph_store_sqlite import SqliteGraphStore
+
+    kw.setdefault("flush_interval", 60)  # flush explicitly in tests
+    return SqliteGraphStore(str(tmp_path / "graphs.db"), **kw)
+
+
+def test_sqlite_store_round_trips_graphs_across_reopen(tmp_path):
+    store = _sqlite(tmp_path)
+    g = graph("a", nodes=[goal("x", edges=[contrib("c", "x", "y", weight=0.5)]), goal("y")], edges=[dep("e1", "x", "y")])
+    store.save(g)
+    assert store.load("a") is g and store.exists("a")
+    store.close()
+
+    reopened = _sqlite(tmp_path)
+    loaded = reopened.load("a")
+    assert loaded.model_dump(serialize_as_any=True) == g.model_dump(serialize_as_any=True)
+    assert type(loaded.nodes[0].edges[0]).__name__ == "ContributesToEdge"
+    assert reopened.version("a") > 0
+    reopened.delete("a")
+    assert not reopened.exists("a")
+    reopened.close()
+
+
+def test_sqlite_store_batches_writes_and_bounds_the_hot_cache(tmp_path):
+    store = _sqlite(tmp_path, cache_graphs=2, batch_size=3)
+    other = _sqlite(tmp_path)
+    store.save(graph("a"))
+    store.save(graph("b"))
+    assert not other.exists("a")             # still batched
+    store.save(graph("c"))                   # third dirty graph triggers the batch
+    assert other.exists("a") and other.exists("c")
+    assert len(store._by_id) == 2            # "a" was evicted from the hot cache
+    assert store.load("a").graph_id == "a"   # cold load from disk
+
+    g = other.load("b")
+    g.nodes.append(goal("z"))
+    other.save(g)
+    other.flush()
+    assert [n.node_id for n in store.load("b").nodes] == ["z"]  # sees the other writer
+    store.close()
+    other.close()
+
+
+def test_sqlite_store_does_not_overwrite_a_snapshot_another_process_flushed(tmp_path):
+    import pytest
+    from src.services.graph_store_sqlite import WriteConflict
+
+    a, b = _sqlite(tmp_path), _sqlite(tmp_path)
+    a.save(graph("s", nodes=[goal("x")]))
+    a.flush()
+    ga, gb = a.load("s"), b.load("s")
+    gb.nodes.append(goal("fromB"))
+    b.save(gb)
+    b.flush()
+    ga.nodes.append(goal("fromA"))
+    a.save(ga)                                   # based on the rev B has moved past
+    with pytest.raises(WriteConflict) as err:
+        a.flush()
+    assert err.value.graph_ids == ["s"]
+    assert [n.node_id for n in b.load("s").nodes] == ["x", "fromB"]
+    assert [n.node_id for n in a.load("s").nodes] == ["x", "fromB"]   # cache dropped, disk reread
+    a.close()
+    b.close()
+
+
+def test_sqlite_store_does_not_append_ops_onto_a_rev_another_process_wrote(tmp_path):
+    import pytest
+    from src.services.graph_store_sqlite import WriteConflict
+
+    a, b = _sqlite(tmp_path), _sqlite(tmp_path)
+    a.create(graph("s", nodes=[goal("a")]))
+    a.flush()
+    b.load("s")
+    with a.write("s") as m:                      # logged, not yet flushed
+        m.upsert_node(goal("fromA"))
+    with b.write("s") as m:
+        m.upsert_node(goal("fromB"))
+    b.flush()
+    with pytest.raises(WriteConflict) as err:
+        a.flush()
+    assert err.value.graph_ids == ["s"]
+    assert a._db.execute("SELECT COUNT(*) FROM graph_ops").fetchone()[0] == 1
+    assert [n.node_id for n in a.load("s").nodes] == ["a", "fromB"]   # replayed from disk
+    assert [n.node_id for n in b.load("s").nodes] == ["a", "fromB"]
+    a.close()
+    b.close()
+
+
+def test_sqlite_store_never_persists_a_graph_it_cannot_load_again(tmp_path):
+    import pytest
+
+    store = _sqlite(tmp_path)
+    store.create(graph("r", nodes=[goal("a")]))
+    with pytest.raises(ValueError, match="unknown node"):
+        with store.write("r") as m:
+            m.upsert_edge(dep("e1", "a", "ghost"))
+    with pytest.raises(ValueError, match="Duplicate node_id: a"):
+        with store.write("r") as m:
+            m.upsert_node(goal("b", nodes=[goal("a", parent="b")]))
+    with store.write("r") as m:
+        m.upsert_node(goal("a", nodes=[goal("a1", parent="a")]))   # a replaced subtree may keep its ids
+        m.upsert_edge(dep("e1", "a", "a1"))
+    store.close()
+
+    for _ in range(2):                            # replayed from the op log, then from a compacted body
+        reopened = _sqlite(tmp_path)
+        g = reopened.load("r")
+        assert [n.node_id for n in g.flatten_nodes()] == ["a", "a1"] and [e.edge_id for e in g.edges] == ["e1"]
+        reopened.compact("r")
+        reopened.close()
+
+
+def test_sqlite_store_logs_edits_as_ops_and_replays_them(tmp_path):
+    store = _sqlite(tmp_path)
+    store.create(graph("a", nodes=[goal("x"), goal("y")]))
+    store.flush()
+    with store.write("a") as m:
+        m.upsert_node(goal("z", parent="x"))
+        m.attach_edge("x", contrib("c", "x", "y", weight=0.5))
+        m.upsert_edge(dep("e1", "x", "y"))
+        m.reparent("z", "y")
+        m.delete_node("missing")                 # no-op: not logged
+    store.flush()
+    db = store._db
+    assert db.execute("SELECT COUNT(*) FROM graph_ops").fetchone()[0] == 4
+    expected = store.load("a").model_dump(serialize_as_any=True)
+    store.close()
+
+    reopened = _sqlite(tmp_path)
+    replayed = reopened.load("a")
+    assert replayed.model_dump(serialize_as_any=True) == expected
+    assert type(replayed.nodes[0].edges[0]).__name__ == "ContributesToEdge"
+    reopened.close()
+
+
+def test_sqlite_store_compacts_the_op_log_into_a_snapshot(tmp_path):
+    store = _sqlite(tmp_path, compact_after=5)
+    store.create(graph("a"))
+    store.flush()
+    for i in range(7):
+        with store.write("a") as m:
+            m.upsert_node(goal(f"n{i}"))
+    store.flush()
+    assert store.compact() == 1
+    db = store._db
+    assert db.execute("SELECT COUNT(*) FROM graph_ops").fetchone()[0] == 0
+    assert db.execute("SELECT seq FROM graphs").fetchone()[0] == 7
+
+    with store.write("a") as m:                  # logging resumes after the snapshot
+        m.delete_edge("none")
+        m.delete_node("n0")
+    store.close()
+    reopened = _sqlite(tmp_path)
+    assert [n.node_id for n in reopened.load("a").nodes] == [f"n{i}" for i in range(1, 7)]
+    reopened.close()
+
+
+def test_batch_applies_all_ops_in_one_write_or_none_of_them(tmp_path):
+    import pytest
+    from src.schemas.api_graph import BatchRequest
+    from src.services import graph_batch
+
+    def ops(*items):
+        return BatchRequest.model_validate({"ops": list(items)}).ops
+
+    def j(m):
+        return m.model_dump(mode="json", by_alias=True)
+
+    store = _sqlite(tmp_path)
+    store.create(graph("b", nodes=[goal("a", nodes=[goal("a1", parent="a")]), goal("c")], edges=[dep("e", "a1", "c")]))
+    base = store.version("b")
+    with store.write("b") as m:
+        results = graph_batch.apply_ops(m, ops(
+            {"op": "upsert_node", "node": j(goal("d"))},
+            {"op": "upsert_edge", "edge": j(dep("e", "c", "d"))},
+            {"op": "reparent", "nodeId": "a1", "parentId": "d"},
+            {"op": "delete_node", "nodeId": "a"},
+            {"op": "delete_edge", "edgeId": "gone"},
+        ))
+    assert [r.status for r in results] == ["created", "updated", "moved", "deleted", "not_found"]
+    assert store.version("b") == m.version and m.base_version == base    # one published version
+    after = store.load("b").model_dump()
+
+    with pytest.raises(graph_batch.BatchError) as err:
+        with store.write("b") as m:
+            graph_batch.apply_ops(m, ops(
+                {"op": "delete_node", "nodeId": "c"},
+                {"op": "upsert_node", "node": j(goal("x", parent="d"))},
+                {"op": "upsert_edge", "edge": j(dep("f", "a1", "x"))},
+                {"op": "reparent", "nodeId": "d", "parentId": "a1"},     # into its own subtree
+            ))
+    assert err.value.index == 3 and err.value.op == "reparent"
+    assert store.load("b").model_dump() == after
+    store.close()
+    reopened = _sqlite(tmp_path)                                      # the journal holds no trace of it
+    assert reopened.load("b").model_dump() == after
+    reopened.close()
+
+
+def test_failed_bulk_upsert_leaves_graph_and_version_unchanged_with_or_without_a_pin():
+    import pytest
+
+    store = GraphStore()
+    store.create(graph("f", nodes=[goal("a")], edges=[dep("e", "a", "a")]))
+    live = store.load("f")
+    idx = store.index_cache.get("f", store.version("f"), live).index
+    before, version = live.model_dump(), store.version("f")
+
+    def bulk():
+        with pytest.raises(ValueError):
+            with store.write("f") as m:
+                for n in [goal("p"), goal("q", parent="missing")]:
+                    m.upsert_node(n)
+
+    bulk()                                        # in place: undone, nothing published
+    assert store.load("f") is live and live.model_dump() == before
+    assert store.version("f") == version and "p" not in idx.id_to_node
+    with store.read("f") as snap:                 # pinned: the copy is discarded
+        bulk()
+        assert snap.graph.model_dump() == before
+    assert store.load("f").model_dump() == before and store.version("f") == version
+
+
+def test_write_that_edits_nothing_publishes_no_version_with_or_without_a_pin():
+    store = GraphStore()
+    store.create(graph("n", nodes=[goal("a")]))
+    live, version = store.load("n"), store.version("n")
+    with store.write("n") as m:
+        assert m.delete_node("missing") is None and m.delete_edge("missing") == []
+    assert m.version == m.base_version == version and store.version("n") == version
+    with store.read("n") as snap:                 # pinned: the untouched copy is not published
+        with store.write("n") as m:
+            m.delete_node("missing")
+        assert m.graph is snap.graph and m.version == version
+    assert store.load("n") is live and store.version("n") == version
+    with store.write("n") as m:
+        m.delete_node("a")
+    assert m.version != version and store.version("n") == m.version